@@ -0,0 +1,113 @@
+"""
+Content-hash manifest for incremental cve4to5up.py directory runs.
+
+For every input file the manifest keeps the input hash, a hash of the
+per-record data the conversion read (history rows and IDR entry), the
+output file and its hash, and the statistics the record added to the job
+report. The manifest also stores the hashes of the files every record
+depends on (schemas, mapping files and the converter itself). When any of
+those change, every record is converted again.
+
+Stored statistics are replayed for records that are skipped, so the job
+report of an incremental run matches a full run.
+"""
+import hashlib
+import json
+import os
+
+MANIFEST_VERSION = 1
+
+
+def fileDigest(path):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def dataDigest(value):
+    return hashlib.sha256(json.dumps(value, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+class ConversionManifest:
+    def __init__(self, path, dependencyFiles):
+        """
+        :param path: manifest file, created on save if missing
+        :param dependencyFiles: files whose change invalidates every record
+        """
+        self.path = path
+        self.dependencies = {}
+        for depFile in dependencyFiles:
+            self.dependencies[depFile] = fileDigest(depFile) if os.path.isfile(depFile) else None
+        self.records = {}
+        self.previous = {}
+        try:
+            with open(path) as mf:
+                saved = json.load(mf)
+            if saved.get("version") == MANIFEST_VERSION and saved.get("dependencies") == self.dependencies:
+                self.previous = saved.get("records", {})
+            elif saved.get("version") == MANIFEST_VERSION:
+                print("Manifest dependencies changed, converting every record")
+        except FileNotFoundError:
+            pass
+        except ValueError as err:
+            print("Ignoring unreadable manifest " + path + " -- " + str(err))
+
+    def unchanged(self, inputfile, outputDir, recordDigest):
+        """
+        :param inputfile: input file of the record
+        :param outputDir: directory this run writes the record's output file to
+        :param recordDigest: function giving the per-record data hash for a CVE ID
+        :return: the saved manifest entry if the record can be skipped, else None
+        """
+        entry = self.previous.get(inputfile)
+        if not entry or entry.get("error"):
+            return None
+        if not self._fileMatches(inputfile, entry["input"]):
+            return None
+        if entry.get("recordData") != recordDigest(entry.get("cveId")):
+            return None
+        if entry.get("output"):
+            # output written by a run with another -o does not count
+            outputfile = entry["output"]["file"]
+            if os.path.dirname(os.path.abspath(outputfile)) != os.path.abspath(outputDir):
+                return None
+            if not self._fileMatches(outputfile, entry["output"]):
+                return None
+        self.records[inputfile] = entry
+        return entry
+
+    def update(self, inputfile, cveId, recordData, outputfile, error, stats):
+        entry = {
+            "cveId": cveId,
+            "recordData": recordData,
+            "input": self._fileState(inputfile),
+            "output": self._fileState(os.path.abspath(outputfile)) if outputfile else None,
+            "error": error,
+            "stats": stats
+        }
+        self.records[inputfile] = entry
+
+    def save(self):
+        # records not seen in this run are dropped
+        tmp = self.path + ".tmp"
+        with open(tmp, "w") as mf:
+            json.dump({"version": MANIFEST_VERSION, "dependencies": self.dependencies, "records": self.records}, mf)
+        os.replace(tmp, self.path)
+
+    @staticmethod
+    def _fileState(path):
+        st = os.stat(path)
+        return {"file": path, "size": st.st_size, "mtime": st.st_mtime_ns, "sha256": fileDigest(path)}
+
+    @staticmethod
+    def _fileMatches(path, state):
+        try:
+            st = os.stat(path)
+        except OSError:
+            return False
+        if st.st_size != state["size"]:
+            return False
+        # only re-hash when the timestamp moved
+        return st.st_mtime_ns == state["mtime"] or fileDigest(path) == state["sha256"]
@@ -0,0 +1,246 @@
+"""
+Long running conversion and validation service.
+
+Every cve4to5up.py, D7Validator.py or cmdlinejsonvalidator.py call pays for
+interpreter start up, the jsonschema / cvss / langcodes / dateutil imports,
+schema compilation and opening the history and IDR tables before it
+converts a single record. This server does all of that once and then
+answers over local HTTP, on a TCP port or a Unix socket:
+
+  POST /convert    a v4 record, or a JSON list of v4 records (a batch)
+                   -> {"record": v5 record or null, "diagnostics": {...}}, a list for a batch
+  POST /validate   a v5 record, or a JSON list of them, ?schema=<path> to use
+                   settings.v5schemafile instead of settings.v5schemafile_published,
+                   no other schema is loaded
+                   -> {"valid": ..., "errors": [{"path", "validator", "message"}]}, a list for a batch
+  GET  /stats      requests, records, errors and latency percentiles per endpoint,
+                   plus the per-stage conversion times
+  GET  /health     {"status": "ok"}
+
+diagnostics are those of record_converter.Converter.convert(). Like
+cve4to5up.py it reads settings.py, user_map.csv, ref_tag_map.json,
+cve_ids.json and cve_record_dates.json from the working directory; IDR
+data missing from the cache is fetched from the service and cached.
+Conversions can call CVE Services with the configured API key, so a Unix
+socket is created readable and writable by its owner only.
+
+USAGE python convert_server.py [--port <port>] [--host <address>] | [--socket <path>]
+                               [--history-preload] [--idr-cache <file>] [--idr-ttl <seconds>] [--verbose]
+
+  curl --unix-socket convert.sock -X POST --data-binary @CVE-2021-1234.json http://localhost/convert
+"""
+import getopt
+import http.server
+import os
+import socketserver
+import sys
+import threading
+import time
+import urllib.parse
+
+import jsonschema
+
+import cve4to5up
+import json_backend
+import schema_cache
+from stage_profile import StageProfile
+
+USAGE = ('USAGE python convert_server.py [--port <port>] [--host <address>] | [--socket <path>] '
+         '[--history-preload] [--idr-cache <file>] [--idr-ttl <seconds>] [--verbose]')
+
+
+class ServiceState:
+    # warm state shared by every request thread
+    def __init__(self):
+        self.started = time.time()
+        self.lock = threading.Lock()
+        self.latency = StageProfile()  # request latency per endpoint
+        self.stages = StageProfile()  # conversion time per stage, over all converted records
+        self.requests = {}
+        self.records = {}
+        self.errors = 0
+        self.converter = cve4to5up.getConverter()
+        self.defaultSchema = cve4to5up.v5SchemaPath_published
+        # clients may only pick one of the schemas configured in settings.py
+        self.schemas = {}
+        for schemaPath in [cve4to5up.v5SchemaPath_published, cve4to5up.v5SchemaPath]:
+            self.schemas.setdefault(schemaPath, schemaPath)
+            self.schemas.setdefault(os.path.realpath(schemaPath), schemaPath)
+            self.validator(schemaPath)
+
+    def allowedSchema(self, schemaPath):
+        """
+        :param schemaPath: schema path from the request
+        :return: the configured schema it names, or None
+        """
+        return self.schemas.get(schemaPath) or self.schemas.get(os.path.realpath(schemaPath))
+
+    def validator(self, schemaPath):
+        # compiled once per schema by schema_cache
+        schemaDoc = schema_cache.loadSchema(schemaPath)
+        return schema_cache.getValidator(schemaPath, jsonschema.validators.validator_for(schemaDoc))
+
+    def convert(self, record):
+        cveId = record.get("CVE_data_meta", {}).get("ID") if isinstance(record, dict) else None
+        v5, diagnostics = self.converter.convert(record, cveId or "request")
+        stages = diagnostics.pop("stageProfile", {})
+        with self.lock:
+            self.stages.merge(stages)
+        return {"record": v5, "diagnostics": diagnostics}
+
+    def validate(self, record, schemaPath):
+        errors = [{"path": error.json_path, "validator": error.validator, "message": error.message}
+                  for error in sorted(self.validator(schemaPath).iter_errors(record), key=lambda e: e.path)]
+        return {"valid": not errors, "errors": errors}
+
+    def done(self, endpoint, records, seconds, failed):
+        with self.lock:
+            self.requests[endpoint] = self.requests.get(endpoint, 0) + 1
+            self.records[endpoint] = self.records.get(endpoint, 0) + records
+            if failed:
+                self.errors += 1
+            self.latency.sample(endpoint, self.requests[endpoint], seconds)
+
+    def stats(self):
+        with self.lock:
+            return {
+                "uptime": round(time.time() - self.started, 3),
+                "requests": dict(self.requests),
+                "records": dict(self.records),
+                "errors": self.errors,
+                "latency": self.latency.summary(),
+                "conversionStages": self.stages.summary()
+            }
+
+
+class RequestHandler(http.server.BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, batch callers reuse the connection
+    verbose = False
+
+    def address_string(self):
+        # Unix socket clients have no address
+        return self.client_address[0] if isinstance(self.client_address, tuple) else "unix"
+
+    def log_message(self, format, *args):
+        if self.verbose:
+            super().log_message(format, *args)
+
+    def reply(self, status, body):
+        data = json_backend.dumpCompact(body)
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        path = urllib.parse.urlsplit(self.path).path
+        if path == "/stats":
+            self.reply(200, self.server.state.stats())
+        elif path == "/health":
+            self.reply(200, {"status": "ok"})
+        else:
+            self.reply(404, {"error": "unknown endpoint " + path})
+
+    def do_POST(self):
+        start = time.perf_counter()
+        url = urllib.parse.urlsplit(self.path)
+        state = self.server.state
+        if url.path not in ("/convert", "/validate"):
+            self.reply(404, {"error": "unknown endpoint " + url.path})
+            return
+        records = 0
+        status = 200
+        schemaPath = None
+        if url.path == "/validate":
+            requested = urllib.parse.parse_qs(url.query).get("schema", [state.defaultSchema])[0]
+            schemaPath = state.allowedSchema(requested)
+            if schemaPath is None:
+                self.reply(400, {"error": "schema is not one of the schemas configured in settings.py"})
+                state.done("POST " + url.path, records, time.perf_counter() - start, True)
+                return
+        try:
+            body = json_backend.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+            batch = isinstance(body, list)
+            items = body if batch else [body]
+            records = len(items)
+            if url.path == "/convert":
+                results = [state.convert(item) for item in items]
+            else:
+                results = [state.validate(item, schemaPath) for item in items]
+            result = results if batch else results[0]
+        except ValueError as err:
+            status = 400
+            result = {"error": "request is not JSON -- " + str(err)}
+        except Exception as err:
+            status = 500
+            result = {"error": str(type(err)) + " -- " + str(err)}
+        self.reply(status, result)
+        state.done("POST " + url.path, records, time.perf_counter() - start, status != 200)
+
+
+class ThreadingUnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+def main(argv):
+    host = "127.0.0.1"
+    port = 8765
+    socketPath = ''
+    historyPreload = False
+    try:
+        opts, args = getopt.getopt(argv, "h", ["port=", "host=", "socket=", "history-preload", "idr-cache=", "idr-ttl=", "verbose"])
+    except getopt.GetoptError:
+        print(USAGE)
+        sys.exit(2)
+    for opt, arg in opts:
+        if opt == '-h':
+            print(USAGE)
+            sys.exit()
+        elif opt == "--port":
+            port = int(arg)
+        elif opt == "--host":
+            host = arg
+        elif opt == "--socket":
+            socketPath = arg
+        elif opt == "--history-preload":
+            historyPreload = True
+        elif opt == "--idr-cache":
+            cve4to5up.IDRCachePath = arg
+        elif opt == "--idr-ttl":
+            cve4to5up.IDRCacheTTL = float(arg)
+        elif opt == "--verbose":
+            RequestHandler.verbose = True
+
+    sTime = time.perf_counter()
+    cve4to5up.loadCVEHistory(historyPreload)
+    cve4to5up.loadIDRCache()
+    state = ServiceState()
+    print("Warm up finished in " + '{0:.2f}'.format(time.perf_counter() - sTime) + " seconds")
+
+    if socketPath:
+        if os.path.exists(socketPath):
+            os.remove(socketPath)
+        # created 0600, other local users must not convert with this server's API key
+        umask = os.umask(0o177)
+        try:
+            server = ThreadingUnixHTTPServer(socketPath, RequestHandler)
+        finally:
+            os.umask(umask)
+        print("Listening on " + socketPath)
+    else:
+        server = http.server.ThreadingHTTPServer((host, port), RequestHandler)
+        print("Listening on http://" + host + ":" + str(server.server_address[1]))
+    server.state = state
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        if socketPath and os.path.exists(socketPath):
+            os.remove(socketPath)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
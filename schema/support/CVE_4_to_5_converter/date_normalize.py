@@ -0,0 +1,86 @@
+"""
+Date normalization for cve4to5up.py.
+
+v5 dates are written as midnight of the date given in the v4 record
+("2021-03-04T00:00:00"). Nearly every v4 date is ISO-8601 (a plain date, or
+a date and time with an optional fraction and offset), and so are the
+history dates; those are matched with a precompiled pattern. Anything else
+falls back to dateutil's parser, which gives the same result the converter
+always produced. Results, including parse errors, are memoized per input
+string.
+"""
+import datetime
+import functools
+import re
+
+from dateutil.parser import parse as dateParse
+
+ISO_DATE = re.compile(r"(\d{4})-(\d{2})-(\d{2})"
+                      r"(?:[T ](\d{2}):(\d{2})(?::(\d{2})(?:\.\d{1,6})?)?(?:Z|[+-](\d{2})(?::?(\d{2}))?)?)?")
+
+
+def _fastDate(value):
+    # date of a strict ISO-8601 value, None if dateutil has to decide
+    m = ISO_DATE.fullmatch(value)
+    if not m:
+        return None
+    if m.group(4) is not None:
+        if int(m.group(4)) > 23 or int(m.group(5)) > 59 or (m.group(6) is not None and int(m.group(6)) > 59):
+            return None
+        if m.group(7) is not None and (int(m.group(7)) > 23 or (m.group(8) is not None and int(m.group(8)) > 59)):
+            return None
+    try:
+        return datetime.date(int(m.group(1)), int(m.group(2)), int(m.group(3)))
+    except ValueError:
+        return None
+
+
+@functools.lru_cache(maxsize=65536)
+def _parse(value):
+    # (date, None, slow) or (None, (exception type, args, message), slow)
+    d = _fastDate(value)
+    if d is not None:
+        return (d, None, False)
+    try:
+        return (dateParse(value).date(), None, True)
+    except Exception as err:
+        return (None, (type(err), err.args, str(err)), True)
+
+
+def parseDate(value, stats=None):
+    """
+    :param value: v4 date string
+    :param stats: optional dict counting "fast", "slow" and "memoized" calls
+    :return: datetime.date of value
+    :raises: the error dateutil raises for value
+    """
+    if not isinstance(value, str):
+        # not cacheable, let dateutil report it
+        if stats is not None:
+            stats["slow"] = stats.get("slow", 0) + 1
+        return dateParse(value).date()
+    hits = _parse.cache_info().hits
+    d, error, slow = _parse(value)
+    if stats is not None:
+        if _parse.cache_info().hits > hits:
+            stats["memoized"] = stats.get("memoized", 0) + 1
+        elif slow:
+            stats["slow"] = stats.get("slow", 0) + 1
+        else:
+            stats["fast"] = stats.get("fast", 0) + 1
+    if error is not None:
+        try:
+            exc = error[0](*error[1])
+        except Exception:
+            exc = ValueError(error[2])
+        raise exc
+    return d
+
+
+def normalizeDate(value, stats=None):
+    """
+    :param value: v4 date string
+    :param stats: optional dict counting "fast", "slow" and "memoized" calls
+    :return: ISO-8601 midnight of the date, e.g. 2021-03-04T00:00:00
+    """
+    return datetime.datetime.combine(parseDate(value, stats), datetime.datetime.min.time()).isoformat()
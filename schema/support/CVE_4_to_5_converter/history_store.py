@@ -0,0 +1,223 @@
+"""
+Indexed store for the CVE record change history (cve_record_dates.json).
+
+The history export is a single JSON array with one row per record change.
+Instead of loading it into memory, the rows are streamed once into a SQLite
+index next to the export, with every timestamp pre-parsed to an integer
+(microseconds since the epoch, naive UTC) and an index on the CVE ID. The
+index is rebuilt only when the export's size or modification time changes.
+The converter then asks the index for one CVE ID at a time, so startup is
+fast and memory use stays flat however large the export is.
+
+Each lookup returns a CVEHistory, the rows of one CVE as parallel tuples of
+type codes and epoch integers, so deriving the record dates is a handful of
+integer comparisons. preload() reads the whole index into CVEHistory objects
+for runs that prefer memory over per-record queries.
+"""
+import datetime
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+
+HISTORY_INDEX_VERSION = 1
+EPOCH = datetime.datetime(1970, 1, 1)
+HISTORY_DATETIME_FORMAT = '%Y-%m-%d %H:%M:%S.%f'
+HISTORY_DATE_FORMAT = '%Y-%m-%d'
+
+# HType values, stored as small integers
+HTYPE_CODES = {"Modified": 1, "Rejected": 2}
+HTYPE_OTHER = 0
+
+
+def toEpoch(dt):
+    return (dt - EPOCH) // datetime.timedelta(microseconds=1)
+
+
+def fromEpoch(us):
+    return EPOCH + datetime.timedelta(microseconds=us)
+
+
+def parseHistoryTime(value, fmt):
+    # null, "null" and empty values are stored as NULL
+    if value is None or value == "null" or value == "":
+        return None
+    return toEpoch(datetime.datetime.strptime(value, fmt))
+
+
+def iterJSONArray(path, chunkSize=1 << 20):
+    # yields the items of a top level JSON array without loading the whole file
+    decoder = json.JSONDecoder()
+    with open(path, encoding="utf-8") as f:
+        buf = f.read(chunkSize)
+        pos = buf.index("[") + 1
+        eof = False
+        while True:
+            # skip separators
+            while True:
+                while pos < len(buf) and buf[pos] in " \t\r\n,":
+                    pos += 1
+                if pos < len(buf) or eof:
+                    break
+                buf = f.read(chunkSize)
+                pos = 0
+                eof = not buf
+            if pos >= len(buf) or buf[pos] == "]":
+                return
+            try:
+                item, end = decoder.raw_decode(buf, pos)
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+                more = f.read(chunkSize)
+                eof = not more
+                buf = buf[pos:] + more
+                pos = 0
+                continue
+            yield item
+            pos = end
+
+
+class CVEHistory:
+    # history rows of one CVE as parallel columns, None marks a missing timestamp
+    __slots__ = ("htypes", "historyDates", "populatedDates", "reservedDates")
+
+    def __init__(self, rows=()):
+        if rows:
+            self.htypes, self.historyDates, self.populatedDates, self.reservedDates = zip(*rows)
+        else:
+            self.htypes = self.historyDates = self.populatedDates = self.reservedDates = ()
+
+    def __bool__(self):
+        return len(self.htypes) > 0
+
+    def rows(self):
+        return list(zip(self.htypes, self.historyDates, self.populatedDates, self.reservedDates))
+
+    def minPopulated(self):
+        return min((d for d in self.populatedDates if d is not None), default=None)
+
+    def minReserved(self):
+        return min((d for d in self.reservedDates if d is not None), default=None)
+
+    def minHistory(self, htype):
+        return min((d for t, d in zip(self.htypes, self.historyDates) if t == htype and d is not None), default=None)
+
+    def maxHistory(self, htypes):
+        return max((d for t, d in zip(self.htypes, self.historyDates) if t in htypes and d is not None), default=None)
+
+
+NO_HISTORY = CVEHistory()
+
+
+class HistoryStore:
+    def __init__(self, jsonPath, indexPath=None):
+        """
+        :param jsonPath: history export, may be missing if the index already exists
+        :param indexPath: SQLite index, defaults to the export path with a .sqlite suffix
+        """
+        self.jsonPath = jsonPath
+        self.indexPath = indexPath or os.path.splitext(jsonPath)[0] + ".sqlite"
+        self._local = threading.local()
+        self._preloaded = None
+        if not self.isCurrent():
+            self.build()
+
+    def sourceState(self):
+        st = os.stat(self.jsonPath)
+        return str(HISTORY_INDEX_VERSION) + ":" + str(st.st_size) + ":" + str(st.st_mtime_ns)
+
+    def isCurrent(self):
+        if not os.path.isfile(self.indexPath):
+            return False
+        if not os.path.isfile(self.jsonPath):
+            # ship the index without the export
+            return True
+        try:
+            conn = sqlite3.connect(self.indexPath)
+            try:
+                row = conn.execute("SELECT value FROM meta WHERE key = 'source'").fetchone()
+            finally:
+                conn.close()
+        except sqlite3.Error:
+            return False
+        return row is not None and row[0] == self.sourceState()
+
+    def build(self):
+        # a temp file of its own, the converter and the server may build at the same time
+        fd, tmpPath = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(self.indexPath)),
+                                       prefix=os.path.basename(self.indexPath) + ".", suffix=".tmp")
+        os.close(fd)
+        conn = sqlite3.connect(tmpPath)
+        try:
+            conn.execute("PRAGMA journal_mode = OFF")
+            conn.execute("PRAGMA synchronous = OFF")
+            conn.execute("CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT)")
+            conn.execute("CREATE TABLE history (cve_id TEXT NOT NULL, htype INTEGER NOT NULL,"
+                         " history_date INTEGER, populated_date INTEGER, reserved_date INTEGER)")
+            batch = []
+            for ch in iterJSONArray(self.jsonPath):
+                batch.append((
+                    ch["cve_identifier"],
+                    HTYPE_CODES.get(ch.get("HType"), HTYPE_OTHER),
+                    parseHistoryTime(ch.get("history_date"), HISTORY_DATETIME_FORMAT),
+                    parseHistoryTime(ch.get("populated_date"), HISTORY_DATETIME_FORMAT),
+                    parseHistoryTime(ch.get("reserved_date"), HISTORY_DATE_FORMAT)
+                ))
+                if len(batch) >= 50000:
+                    conn.executemany("INSERT INTO history VALUES (?, ?, ?, ?, ?)", batch)
+                    batch = []
+            conn.executemany("INSERT INTO history VALUES (?, ?, ?, ?, ?)", batch)
+            conn.execute("CREATE INDEX history_cve_id ON history (cve_id)")
+            conn.execute("INSERT INTO meta VALUES ('source', ?)", (self.sourceState(),))
+            conn.commit()
+        except:
+            conn.close()
+            os.remove(tmpPath)
+            raise
+        conn.close()
+        os.replace(tmpPath, self.indexPath)
+
+    def connection(self):
+        # one read-only connection per process and thread, forked workers must not share the parent's
+        local = self._local
+        if getattr(local, "conn", None) is None or local.pid != os.getpid():
+            local.conn = sqlite3.connect("file:" + self.indexPath + "?mode=ro", uri=True)
+            local.pid = os.getpid()
+        return local.conn
+
+    def record(self, cveId):
+        """
+        :return: CVEHistory for cveId, empty if the CVE has no history
+        """
+        if self._preloaded is not None:
+            return self._preloaded.get(cveId, NO_HISTORY)
+        rows = self.connection().execute(
+            "SELECT htype, history_date, populated_date, reserved_date FROM history WHERE cve_id = ? ORDER BY rowid",
+            (cveId,)).fetchall()
+        return CVEHistory(rows) if rows else NO_HISTORY
+
+    def rows(self, cveId):
+        """
+        :return: list of (htype, history_date, populated_date, reserved_date) for cveId
+        """
+        return self.record(cveId).rows()
+
+    def preload(self):
+        # convert every row once into per-CVE CVEHistory objects held in memory
+        preloaded = {}
+        cveId = None
+        rows = []
+        for row in self.connection().execute(
+                "SELECT cve_id, htype, history_date, populated_date, reserved_date FROM history ORDER BY cve_id, rowid"):
+            if row[0] != cveId:
+                if rows:
+                    preloaded[cveId] = CVEHistory(rows)
+                cveId = row[0]
+                rows = []
+            rows.append(row[1:])
+        if rows:
+            preloaded[cveId] = CVEHistory(rows)
+        self._preloaded = preloaded
+        return len(preloaded)
@@ -0,0 +1,123 @@
+"""
+Persistent IDR lookup cache for cve4to5up.py.
+
+The bulk CVE ID export (cve_ids.json, one JSON object per line) is loaded
+once into a SQLite table keyed by CVE ID, and loaded again only when the
+export's size or modification time changes. Records that are missing from
+the export are fetched from CVE Services and written through to the same
+table, so reruns and worker processes share them instead of fetching
+them again.
+
+Every entry records when it was fetched (the export's modification time
+for seeded rows) and where it came from. With a TTL, entries older than
+the TTL are treated as misses and fetched again.
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+
+IDR_CACHE_VERSION = 1
+SOURCE_EXPORT = "export"
+SOURCE_SERVICE = "service"
+
+
+class IDRCache:
+    def __init__(self, path, seedPath=None, ttl=0):
+        """
+        :param path: SQLite cache file, created if missing
+        :param seedPath: bulk export to seed the cache from, may be missing
+        :param ttl: seconds an entry stays fresh, 0 keeps entries forever
+        """
+        self.path = path
+        self.seedPath = seedPath
+        self.ttl = ttl
+        self._local = threading.local()
+        conn = self.connection()
+        with conn:
+            conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+            conn.execute("CREATE TABLE IF NOT EXISTS idr (cve_id TEXT PRIMARY KEY, data TEXT NOT NULL,"
+                         " fetched_at REAL NOT NULL, source TEXT NOT NULL)")
+        if seedPath:
+            self.seed()
+
+    def connection(self):
+        # one connection per process and thread, forked workers must not share the parent's
+        local = self._local
+        if getattr(local, "conn", None) is None or local.pid != os.getpid():
+            local.conn = sqlite3.connect(self.path, timeout=60, isolation_level=None)
+            local.conn.execute("PRAGMA journal_mode = WAL")
+            local.pid = os.getpid()
+        return local.conn
+
+    def seedState(self):
+        st = os.stat(self.seedPath)
+        return str(IDR_CACHE_VERSION) + ":" + str(st.st_size) + ":" + str(st.st_mtime_ns)
+
+    def seed(self):
+        """
+        (re)load the bulk export if it changed since the last seed
+        :return: number of export lines loaded, 0 if the cache was current
+        """
+        try:
+            state = self.seedState()
+        except OSError as e:
+            if self.count() == 0:
+                print("bulk IDR ERROR: " + str(e))
+            return 0
+        conn = self.connection()
+        count = 0
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            # checked inside the write lock so concurrent processes seed only once
+            row = conn.execute("SELECT value FROM meta WHERE key = 'seed'").fetchone()
+            if row is None or row[0] != state:
+                fetchedAt = os.stat(self.seedPath).st_mtime
+                batch = []
+                with open(self.seedPath) as cveids:
+                    for line in cveids:
+                        line = line.strip()
+                        if not line:
+                            continue
+                        jline = json.loads(line)
+                        batch.append((jline["cve_id"], line, fetchedAt, SOURCE_EXPORT))
+                        if len(batch) >= 50000:
+                            count += self._upsert(conn, batch)
+                            batch = []
+                count += self._upsert(conn, batch)
+                conn.execute("INSERT OR REPLACE INTO meta VALUES ('seed', ?)", (state,))
+            conn.execute("COMMIT")
+        except Exception as e:
+            conn.execute("ROLLBACK")
+            print("bulk IDR ERROR: " + str(e))
+        return count
+
+    @staticmethod
+    def _upsert(conn, rows):
+        # a newer service fetch is kept over an older export row
+        conn.executemany("INSERT INTO idr VALUES (?, ?, ?, ?) ON CONFLICT (cve_id) DO UPDATE SET"
+                         " data = excluded.data, fetched_at = excluded.fetched_at, source = excluded.source"
+                         " WHERE excluded.fetched_at >= idr.fetched_at", rows)
+        return len(rows)
+
+    def count(self):
+        return self.connection().execute("SELECT COUNT(*) FROM idr").fetchone()[0]
+
+    def get(self, cveId, fresh=True):
+        """
+        :param cveId: CVE ID to look up
+        :param fresh: ignore entries older than the TTL
+        :return: the IDR record, or None on a miss
+        """
+        row = self.connection().execute("SELECT data, fetched_at FROM idr WHERE cve_id = ?", (cveId,)).fetchone()
+        if row is None:
+            return None
+        if fresh and self.ttl and time.time() - row[1] > self.ttl:
+            return None
+        return json.loads(row[0])
+
+    def put(self, data):
+        # write through, visible to every other process using the cache
+        self.connection().execute("INSERT OR REPLACE INTO idr VALUES (?, ?, ?, ?)",
+                                  (data["cve_id"], json.dumps(data), time.time(), SOURCE_SERVICE))
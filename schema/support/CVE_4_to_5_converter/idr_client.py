@@ -0,0 +1,139 @@
+"""
+Pooled client for the CVE Services (IDR) API used by cve4to5up.py.
+
+All calls share one requests.Session per process, so connections are kept
+alive and reused instead of opening a new TCP/TLS connection per call.
+Failed calls are retried with capped exponential backoff and full jitter,
+and client errors other than 408/429 are not retried at all.
+
+CVE Services has no endpoint for fetching a list of IDs, so fetchCVEIds()
+issues the /cve-id/<id> lookups concurrently, with at most `concurrency`
+requests in flight, and yields results as they complete.
+
+Point settings.AWG_IDR_SERVICE_URL at a local server (for example
+schema/support/benchmarks/idr_stub.py) to exercise the client offline.
+"""
+import concurrent.futures
+import json
+import os
+import random
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+RETRYABLE_STATUS = (408, 429)
+
+
+class IDRServiceError(Exception):
+    def __init__(self, status, message):
+        self.status = status
+        self.message = message
+        super().__init__("IDR Error: " + str(message))
+
+    def retryable(self):
+        return self.status in RETRYABLE_STATUS or self.status >= 500
+
+
+class IDRClient:
+    def __init__(self, baseUrl, headers, timeout=30, concurrency=8, retries=14, backoff=2.0, maxBackoff=300.0):
+        """
+        :param baseUrl: IDR service URL, e.g. settings.AWG_IDR_SERVICE_URL
+        :param headers: CVE-API-* headers sent with every call
+        :param timeout: seconds per request
+        :param concurrency: most requests in flight in fetchCVEIds()
+        :param retries: retries after the first failed attempt
+        :param backoff: base delay in seconds, doubled on every retry
+        :param maxBackoff: cap on a single delay in seconds
+        """
+        self.baseUrl = baseUrl
+        self.headers = headers
+        self.timeout = timeout
+        self.concurrency = max(1, concurrency)
+        self.retries = retries
+        self.backoff = backoff
+        self.maxBackoff = maxBackoff
+        self._session = None
+        self._pid = None
+
+    def session(self):
+        # one pool per process, forked workers must not share the parent's sockets
+        if self._session is None or self._pid != os.getpid():
+            self._session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.concurrency)
+            self._session.mount("http://", adapter)
+            self._session.mount("https://", adapter)
+            self._pid = os.getpid()
+        return self._session
+
+    def call(self, action, url, params=None, content=None, headers=None):
+        """
+        :param action: GET, POST or PUT
+        :return: response body of a 200 or 206 response
+        :raises: IDRServiceError for other status codes, Exception if no response was received
+        """
+        try:
+            response = self.session().request(
+                action.upper(),
+                url,
+                params=params,
+                headers=headers or self.headers,
+                json=content,
+                timeout=self.timeout)
+        except requests.exceptions.ConnectTimeout:
+            raise Exception(f"IDR service access failure: Connection timeout to: {url}")
+        except requests.exceptions.Timeout:
+            raise Exception("IDR service access failure: Request timeout from IDR request.")
+        except requests.exceptions.ConnectionError:
+            raise Exception("IDR service access failure: IDR ConnectionError occurred.")
+        except requests.exceptions.RequestException:
+            raise Exception("IDR service access failure: IDR Request error occurred.")
+
+        body = response.content.decode('utf-8')
+        # 200 = fully successful, 206 = partial success
+        if response.status_code == 200 or response.status_code == 206:
+            return body
+        try:
+            message = json.loads(body)["message"]
+        except (ValueError, KeyError, TypeError):
+            message = str(response.status_code) + " " + body[:200]
+        raise IDRServiceError(response.status_code, message)
+
+    def backoffDelay(self, attempt):
+        # full jitter, spreads retries from many workers over the whole window
+        return random.uniform(0, min(self.maxBackoff, self.backoff * (2 ** attempt)))
+
+    def getCVEId(self, cveId):
+        """
+        :return: IDR record for cveId, None if the service never returned a JSON object
+        :raises: the last error once retries are exhausted, or at once for client errors
+        """
+        url = self.baseUrl + '/cve-id/' + cveId
+        for attempt in range(self.retries + 1):
+            try:
+                body = self.call('get', url)
+                if body and body.startswith("{"):
+                    return json.loads(body)
+                if attempt == self.retries:
+                    return None
+            except IDRServiceError as e:
+                if not e.retryable() or attempt == self.retries:
+                    raise
+            except Exception:
+                if attempt == self.retries:
+                    raise
+            time.sleep(self.backoffDelay(attempt))
+        return None
+
+    def fetchCVEIds(self, cveIds):
+        """
+        :param cveIds: CVE IDs to look up
+        :return: generator of (cveId, record or None, exception or None) in completion order
+        """
+        with concurrent.futures.ThreadPoolExecutor(self.concurrency) as executor:
+            futures = {executor.submit(self.getCVEId, cveId): cveId for cveId in cveIds}
+            for future in concurrent.futures.as_completed(futures):
+                try:
+                    yield (futures[future], future.result(), None)
+                except Exception as e:
+                    yield (futures[future], None, e)
@@ -0,0 +1,148 @@
+"""
+Streaming job report for cve4to5up.py directory and stream runs.
+
+Every record outcome is written as one NDJSON event as soon as the record
+is done, so the report of a run that crashes is complete up to the crash.
+Schema errors and extra keys are only counted in memory; close() writes
+the counters with the run aggregates as a compact summary JSON next to the
+event file.
+
+Record events look like
+
+  {"event": "record", "input": "cvelist/2021/1xxx/CVE-2021-1234.json",
+   "cveId": "CVE-2021-1234", "status": "invalid", "output": "...",
+   "validationErrors": ["$.containers.cna -- validator = oneOf"]}
+
+with status one of converted, invalid (written with x_ValidationErrors),
+failed (not converted, see "error"), unchanged (skipped by an incremental
+run) or skipped (nothing to write, e.g. RESERVED). extraKeys, cvssErrors,
+scoringOther and unmappedRefsources are added when the record has any.
+"""
+import collections
+import datetime
+import json
+import os
+
+STATUSES = ["converted", "invalid", "failed", "unchanged", "skipped"]
+
+
+def _now():
+    return datetime.datetime.now(datetime.timezone.utc).isoformat()
+
+
+class JobReport:
+    def __init__(self, path, source=None, output=None):
+        """
+        :param path: NDJSON event file, the summary goes to <path without extension>.summary.json
+        :param source: input directory or stream, for the report header
+        :param output: output path, for the report header
+        """
+        self.path = path
+        self.summaryPath = os.path.splitext(path)[0] + ".summary.json"
+        self.started = _now()
+        self.source = source
+        self.output = output
+        self.statuses = collections.Counter()
+        self.validators = collections.Counter()  # failing schema keyword -> records
+        self.extraKeys = {}  # state -> Counter of v4 keys not converted
+        self.failed = 0  # records with a conversion error
+        self.invalid = 0  # records with schema errors, replayed ones included
+        self.cvssErrors = 0
+        self.scoringOther = 0
+        # line buffered, every finished record is on disk
+        self.out = open(path, "w", buffering=1)
+        self.write({"event": "start", "time": self.started, "source": source, "output": output})
+
+    def write(self, event):
+        self.out.write(json.dumps(event, sort_keys=True, separators=(',', ':')) + "\n")
+
+    def record(self, name, error, stats, output):
+        """
+        :param name: input file or stream record name
+        :param error: conversion error message or None
+        :param stats: run statistics of this record alone, as returned by convertFile
+        :param output: output file written, or the NDJSON line
+        :return: stats without the schema errors and extra keys, for merging into the run totals
+        """
+        stats = stats or {}
+        event = {"event": "record", "input": name}
+        if stats.get("cveId"):
+            event["cveId"] = stats["cveId"]
+        validationErrors = [e for errors in stats.get("ValidationFailures", {}).values() for e in errors]
+        if error:
+            status = "failed"
+            event["error"] = error
+        elif stats.get("replayed"):
+            status = "unchanged"
+        elif validationErrors:
+            status = "invalid"
+        elif output:
+            status = "converted"
+        else:
+            status = "skipped"
+        event["status"] = status
+        self.statuses[status] += 1
+        # counted like the run statistics, whatever the status of an incremental run
+        if error:
+            self.failed += 1
+        if validationErrors:
+            self.invalid += 1
+        if isinstance(output, str):
+            event["output"] = output
+        if validationErrors:
+            event["validationErrors"] = validationErrors
+            for validator in set(e.rsplit(" -- validator = ", 1)[-1] for e in validationErrors):
+                self.validators[validator] += 1
+        extraKeys = []
+        for state, keys in stats.get("extra_keys", {}).items():
+            counts = self.extraKeys.setdefault(state, collections.Counter())
+            for key in keys:
+                counts[key] += 1
+                extraKeys.append(key)
+        if extraKeys:
+            event["extraKeys"] = extraKeys
+        cvssErrors = [e for entry in stats.get("cvssErrorList", []) for e in entry.values()]
+        if cvssErrors:
+            event["cvssErrors"] = cvssErrors
+            self.cvssErrors += 1
+        scoringOther = [s for values in stats.get("scoring_other_exemplars", {}).values() for s in values]
+        if scoringOther:
+            event["scoringOther"] = scoringOther
+            self.scoringOther += 1
+        if stats.get("unmapped_refsources"):
+            event["unmappedRefsources"] = stats["unmapped_refsources"]
+        self.write(event)
+
+        # schema errors and extra keys are on disk now and counted here, the rest of
+        # the statistics is capped or small and still goes into the run totals
+        if not stats:
+            return None
+        return dict(stats, ValidationFailures={}, extra_keys={})
+
+    def close(self, totals):
+        """
+        :param totals: run aggregates from the converter, added to the summary
+        :return: the summary
+        """
+        summary = {
+            "started": self.started,
+            "finished": _now(),
+            "source": self.source,
+            "output": self.output,
+            "records": sum(self.statuses.values()),
+            "statuses": {s: self.statuses[s] for s in STATUSES},
+            "recordsFailed": self.failed,
+            "recordsWithValidationErrors": self.invalid,
+            "validationFailuresByValidator": dict(self.validators.most_common()),
+            "extraKeys": {state: dict(counts.most_common()) for state, counts in self.extraKeys.items()},
+            "recordsWithCvssErrors": self.cvssErrors,
+            "recordsWithScoringOther": self.scoringOther
+        }
+        summary.update(totals)
+        self.write({"event": "end", "time": summary["finished"], "records": summary["records"]})
+        self.out.close()
+        tmp = self.summaryPath + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump(summary, f, sort_keys=True, separators=(',', ':'))
+        os.replace(tmp, self.summaryPath)
+        return summary
@@ -0,0 +1,76 @@
+"""
+Language code conversion for cve4to5up.py.
+
+v4 records use ISO 639-2 codes ("eng") and v5 records use BCP-47 language
+subtags ("en"). The codes seen in the CVE corpus are in a static table
+that gives the same results as langcodes.Language.get(). Anything else
+(region subtags, rarer languages) goes to langcodes, imported on first
+use, and the result is memoized. A run that only sees common codes never
+loads the langcodes data tables.
+"""
+import functools
+
+# code -> (BCP-47 language subtag, ISO 639-2/T code), keys lower case
+LANG_CODES = {
+    "eng": ("en", "eng"), "en": ("en", "eng"),
+    "spa": ("es", "spa"), "es": ("es", "spa"),
+    "fra": ("fr", "fra"), "fre": ("fr", "fra"), "fr": ("fr", "fra"),
+    "deu": ("de", "deu"), "ger": ("de", "deu"), "de": ("de", "deu"),
+    "ita": ("it", "ita"), "it": ("it", "ita"),
+    "por": ("pt", "por"), "pt": ("pt", "por"),
+    "jpn": ("ja", "jpn"), "ja": ("ja", "jpn"),
+    "zho": ("zh", "zho"), "chi": ("zh", "zho"), "zh": ("zh", "zho"),
+    "kor": ("ko", "kor"), "ko": ("ko", "kor"),
+    "rus": ("ru", "rus"), "ru": ("ru", "rus"),
+    "nld": ("nl", "nld"), "dut": ("nl", "nld"), "nl": ("nl", "nld"),
+    "pol": ("pl", "pol"), "pl": ("pl", "pol"),
+    "tur": ("tr", "tur"), "tr": ("tr", "tur"),
+    "ara": ("ar", "ara"), "ar": ("ar", "ara"),
+    "heb": ("he", "heb"), "he": ("he", "heb"),
+    "swe": ("sv", "swe"), "sv": ("sv", "swe"),
+    "nor": ("no", "nor"), "no": ("no", "nor"),
+    "dan": ("da", "dan"), "da": ("da", "dan"),
+    "fin": ("fi", "fin"), "fi": ("fi", "fin"),
+    "ces": ("cs", "ces"), "cze": ("cs", "ces"), "cs": ("cs", "ces"),
+    "hun": ("hu", "hun"), "hu": ("hu", "hun"),
+    "ron": ("ro", "ron"), "rum": ("ro", "ron"), "ro": ("ro", "ron"),
+    "ell": ("el", "ell"), "gre": ("el", "ell"), "el": ("el", "ell"),
+    "ukr": ("uk", "ukr"), "uk": ("uk", "ukr"),
+    "vie": ("vi", "vie"), "vi": ("vi", "vie"),
+    "tha": ("th", "tha"), "th": ("th", "tha"),
+    "ind": ("id", "ind"), "id": ("id", "ind"),
+}
+
+
+@functools.lru_cache(maxsize=None)
+def _langcodesAlpha2(code):
+    from langcodes import Language
+    return Language.get(code).language
+
+
+@functools.lru_cache(maxsize=None)
+def _langcodesAlpha3(code):
+    from langcodes import Language
+    return Language.get(code).to_alpha3()
+
+
+def toAlpha2(code):
+    """
+    :param code: 2 or 3 letter language code, or a longer language tag
+    :return: BCP-47 language subtag
+    """
+    known = LANG_CODES.get(code) or LANG_CODES.get(code.lower())
+    if known:
+        return known[0]
+    return _langcodesAlpha2(code)
+
+
+def toAlpha3(code):
+    """
+    :param code: 2 or 3 letter language code, or a longer language tag
+    :return: ISO 639-2/T code
+    """
+    known = LANG_CODES.get(code) or LANG_CODES.get(code.lower())
+    if known:
+        return known[1]
+    return _langcodesAlpha3(code)
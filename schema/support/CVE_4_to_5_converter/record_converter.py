@@ -0,0 +1,1434 @@
+"""
+Up conversion of CVE JSON 4 records to CVE JSON 5.
+
+Converter holds everything a conversion needs: the org table, the
+reference tag map, the v5 schema validators and the cvss vector cache.
+Record history and IDR data (owning CNA) come from
+the history store and IDR lookup given to it, and convert() itself reads
+and writes no files, so one Converter can stay warm in a long running
+process, be shared by threads, or run side by side with another one.
+
+    converter = Converter(historyStore, idrCache.get, orgs, referenceTagMap, schemaPath, publishedSchemaPath)
+    v5, diagnostics = converter.convert(v4)
+
+diagnostics holds the record's statistics (see run_stats.py), its CVE ID
+and the conversion error if there was one. cve4to5up.py is the command
+line wrapper that reads, writes and reports on whole directories.
+"""
+import collections
+import collections.abc
+import datetime
+import os.path
+import sys
+import threading
+import time
+import traceback
+import urllib.parse
+import re
+from cvss import CVSS2, CVSS3
+from dateutil.parser import parse as dateParse
+from numbers import Number
+from requests.utils import requote_uri
+
+sys.path.insert(1, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "Python3.x_Validator"))
+import schema_cache
+from history_store import HTYPE_CODES, fromEpoch
+from lang_codes import toAlpha2, toAlpha3
+from date_normalize import normalizeDate, parseDate
+from stage_profile import StageProfile, TimedPattern
+from run_stats import RunStats
+
+MODIFIED = HTYPE_CODES["Modified"]
+REJECTED = HTYPE_CODES["Rejected"]
+CVSSCacheSize = 4096
+v5MaxTitleLength = 256  # update to pull from schema file
+maxV5VersionLength = 1024  # update to pull from schema file
+maxV5ProductLength = 2048  # update to pull from schema file
+
+# every pattern the per-record conversion uses, compiled once, matching time
+# goes to the "regex" stage of the stage profile
+REGEX = {
+    "cvssTemporal": TimedPattern(re.compile('/(E|RL|PC|RC):[A-Z]')),
+    "cvssEnvironmental": TimedPattern(re.compile('/(CDP|TD|M[A-Z]{1,2}|[CIA]R):')),
+    "cvss3Vector": TimedPattern(re.compile('(([A-Z]+:[A-Z310.]+/?)+)', re.IGNORECASE)),
+    "cvss2Vector": TimedPattern(re.compile('(([A-Z]+:[A-Z0123.]+/?)+)', re.IGNORECASE)),
+    "digit": TimedPattern(re.compile('[0-9]')),
+    "cweInText": TimedPattern(re.compile(r'\bCWE-[1-9]\d*\b', re.IGNORECASE)),
+    "cweId": TimedPattern(re.compile(r'^CWE-[1-9][0-9]+$')),
+}
+# leading characters of a v4 version_affected operator
+VERSION_OPERATORS = frozenset("!?<>=")
+
+
+def convert_VA(vd):
+    if not "version_affected" in vd and "affected" in vd:
+        vd["version_affected"] = vd["affected"]
+    if "version_affected" in vd and vd["version_affected"][:1] in VERSION_OPERATORS:
+        va = vd["version_affected"]
+        vstatus = "affected"
+        if "!" in va:
+            vstatus = "unaffected"
+            va = va.replace("!", "")
+        elif "?" in va:
+            vstatus = "unknown"
+            va = va.replace("?", "")
+        if len(va) == 0:
+            va = "="
+        return ([vstatus, va])
+    else:
+        return (["affected", "="])
+
+def eq_version(vd, status):
+    ver = vd["version_name"] + ' ' + vd["version_value"]
+    if vd["version_value"].startswith(vd["version_name"]):
+        ver = vd["version_value"]
+    return({
+        "version": ver,
+        "status": status
+    })
+
+def l_version(vd, status):
+    return({
+        "version": vd["version_name"],
+        "status": status,
+        "lessThan": vd["version_value"],
+        "versionType": "custom"
+    })
+
+def le_version(vd, status):
+    return({
+        "version": vd["version_name"],
+        "status": status,
+        "lessThanOrEqual": vd["version_value"],
+        "versionType": "custom"
+    })
+
+def negate(status):
+    if status == 'affected':
+        return "unaffected"
+    elif status == "unaffected":
+        return "affected"
+    else:
+        return status
+
+def nonEmpty(v):
+    if 'version' in v and v["version"] == "":
+        v["version"] = "unspecified"
+    return v
+
+def redux_CVSS(c, initvector):
+    tm = ['exploitCodeMaturity', 'exploitability', 'remediationLevel', 'reportConfidence', 'temporalScore', 'temporalSeverity']
+    em = ["collateralDamagePotential", "targetDistribution", "confidentialityRequirement", "integrityRequirement", "availabilityRequirement", "environmentalScore",
+        "modifiedAttackVector","modifiedAttackComplexity","modifiedPrivilegesRequired","modifiedUserInteraction","modifiedScope",
+        "modifiedConfidentialityImpact","modifiedIntegrityImpact","modifiedAvailabilityImpact","environmentalSeverity"]
+    if(not REGEX["cvssTemporal"].search(initvector)):
+        for m in tm:
+            if m in c:
+                del c[m]
+    if(not REGEX["cvssEnvironmental"].search(initvector)):
+        for m in em:
+            if m in c:
+                del c[m]
+    return c
+
+def IBM_score(cvss):
+    vec = "CVSS:3.0"
+    del cvss["BM"]["SCORE"]
+    for a in ["BM", "TM"]:
+        if a in cvss:
+            for k in cvss[a]:
+                vec = vec + "/" + k + ":" + cvss[a][k]
+    return vec
+
+class Converter:
+    def __init__(self, history, idrInfo, orgs, referenceTagMap, schemaPath, publishedSchemaPath, keepStats=True):
+        """
+        :param history: HistoryStore, or anything with record(cveId) returning the record's history
+        :param idrInfo: function returning the IDR data (with owning_cna) of a CVE ID, or None
+        :param orgs: org UUID -> CVE Services org, read but never modified
+        :param referenceTagMap: contents of ref_tag_map.json
+        :param schemaPath: v5 schema records are validated against
+        :param publishedSchemaPath: v5 schema PUBLISHED records are validated against
+        :param keepStats: add the statistics of every conversion to stats and profile
+        """
+        self.history = history
+        self.idrInfo = idrInfo
+        self.orgs = orgs
+        # casefolded v4 refsource -> v5 tags, the first mapping listed for a tag wins
+        self.referenceTags = {}
+        for tagMap in referenceTagMap["referenceMaps"]:
+            self.referenceTags.setdefault(tagMap["v4"].casefold(), tagMap["v5"])
+        self.validator = schema_cache.getValidator(schemaPath)
+        self.publishedValidator = schema_cache.getValidator(publishedSchemaPath)
+        self.cvssCache = collections.OrderedDict()  # (version, vector) -> (metric, None) or (None, error message)
+        self.lock = threading.Lock()
+        self.stats = RunStats() if keepStats else None
+        self.profile = StageProfile() if keepStats else None
+
+    def convert(self, record, name=None, profile=None):
+        """
+        :param record: v4 record as parsed JSON, kept as x_legacyV4Record without copying
+        :param name: names the record in error messages and the stage profile, e.g. its input file
+        :param profile: StageProfile of the caller, begun for this record, to time the conversion
+                        along with reading and writing it, the caller ends and keeps it
+        :return: (v5 record, or None if there is nothing to write, diagnostics)
+
+        diagnostics is the record's RunStats.toDict() plus "cveId", "error" (None,
+        or why the record failed to convert) and, when no profile was passed,
+        "stageProfile".
+        """
+        name = name or "record"
+        stats = RunStats()
+        ownProfile = profile is None
+        if ownProfile:
+            profile = StageProfile()
+            profile.begin(name)
+        diagnostics = {"cveId": None, "error": None}
+        jout = None
+        try:
+            jout = self.convertRecord(record, name, stats, profile, diagnostics)
+        except:
+            diagnostics["error"] = "" + str(sys.exc_info()[0]) + " -- " + str(sys.exc_info()[1]) + " -- "
+        if ownProfile:
+            profile.end()
+        if self.stats is not None:
+            with self.lock:
+                self.stats.merge(stats)
+                if ownProfile:
+                    self.profile.merge(profile.stages)
+        diagnostics.update(stats.toDict())
+        if ownProfile:
+            diagnostics["stageProfile"] = profile.stages
+        return jout, diagnostics
+
+    def orgShortName(self, org_uuid):
+        orgsn = None
+        if org_uuid in self.orgs:
+            if "short_name" in self.orgs[org_uuid]:
+                orgsn = self.orgs[org_uuid]["short_name"]
+        return orgsn
+
+    def v5ReferenceTags(self, v4Tag, stats):
+        v5Tags = self.referenceTags.get(v4Tag.casefold())
+        if v5Tags is None:
+            stats.unmappedRefsources[v4Tag] += 1
+        return v5Tags
+
+    def parseCVSS(self, cvssClass, vector, stats):
+        """
+        :param cvssClass: CVSS3 or CVSS2
+        :param vector: vector string as passed to cvssClass
+        :param stats: RunStats of the record, counts cache hits and misses
+        :return: a new copy of the reduced v5 metric object
+        :raises: Exception with the parse error message, invalid vectors are cached too
+        """
+        key = (cvssClass.__name__, vector)
+        with self.lock:
+            cached = self.cvssCache.get(key)
+            if cached is not None:
+                self.cvssCache.move_to_end(key)
+        if cached is not None:
+            stats.cvssCache["hits"] += 1
+            metric, error = cached
+        else:
+            stats.cvssCache["misses"] += 1
+            try:
+                metric, error = redux_CVSS(cvssClass(vector).as_json(), vector), None
+            except Exception as err:
+                metric, error = None, str(err)
+            with self.lock:
+                self.cvssCache[key] = (metric, error)
+                if len(self.cvssCache) > CVSSCacheSize:
+                    self.cvssCache.popitem(last=False)
+        if error is not None:
+            raise Exception(error)
+        # the record may modify its metric, never hand out the cached one
+        return metric.copy()
+
+    def convertRecord(self, data, inputfile, stats, profile, diagnostics):
+        # up convert one v4 record, returns the v5 record or None if there is nothing to write
+        # inputfile only names the source in error messages, stats and profile are the record's own
+        writeout = False
+        jout = {}
+        jout["dataType"] = "CVE_RECORD"
+        jout["dataVersion"] = "5.0"
+    
+        converter_errors = {}
+        # v4 root keys this record converted, the others are reported as extra keys
+        keysUsed = set()
+        # each stage's time goes to profile, stageStart is the start of the current stage
+        stageStart = time.perf_counter()
+    
+        # up convert meta
+        o_meta = {}
+        try:
+            if "CVE_data_meta" in data and "STATE" in data["CVE_data_meta"]:
+                i_meta = data["CVE_data_meta"]
+                keysUsed.add("CVE_data_meta")
+
+
+                if "STATE" in i_meta:
+                    if i_meta["STATE"] == 'RESERVED':
+                        o_meta['state'] = 'RESERVED'
+                    elif i_meta["STATE"] == 'PUBLIC':
+                        o_meta['state'] = 'PUBLISHED'
+                    elif i_meta["STATE"] == 'REJECT':
+                        o_meta['state'] = 'REJECTED'
+                    else:
+                        o_meta['state'] = i_meta["STATE"]
+                    stats.statesProcessed.add(o_meta["state"])
+
+                if "ID" in i_meta: 
+                    o_meta["cveId"] = i_meta["ID"]
+
+                # all history rows for the record, fetched once as pre-parsed columns
+                recordHistory = self.history.record(o_meta["cveId"])
+
+                o_meta["assignerOrgId"] = "Not found"
+                o_meta["assignerShortName"] = "Not found"
+                if i_meta["STATE"] != 'RESERVED':
+                    pTime = time.perf_counter()
+                
+                    recData = self.idrInfo( o_meta["cveId"] )   
+                
+                    setTime = time.perf_counter() - pTime
+                    # print("idrInfo took:"  + str(setTime))
+                    stats.idrWaitTime += setTime
+                
+                    if recData and "owning_cna" in recData:
+                        org_uuid = recData["owning_cna"]
+                        org_short_name = self.orgShortName(org_uuid)
+                        # org_short_name = recData["owning_cna"]
+                        # org_uuid = getOrgUUID(org_short_name)
+
+                        o_meta["assignerOrgId"] = org_uuid
+                        if org_short_name:
+                            o_meta["assignerShortName"] = org_short_name
+                    else:
+                        print("Record with data issue: " + o_meta["cveId"])
+                        raise Exception("ERROR - no CNA for record ID - " + o_meta["cveId"])
+                
+                if "DATE_PUBLIC" in i_meta and i_meta["DATE_PUBLIC"] != "": 
+                    o_meta["datePublished"] = i_meta["DATE_PUBLIC"]
+                    try:
+                        if not isinstance(o_meta["datePublished"], datetime.datetime):
+                            o_meta["datePublished"] = normalizeDate(o_meta["datePublished"], stats.dates)
+
+                        keysUsed.add("DATE_PUBLIC")
+                    except Exception as err:
+                        del o_meta["datePublished"]
+                        converter_errors["DATE_PUBLIC"] = {}
+                        converter_errors["DATE_PUBLIC"]["error"] = "v4 DATE_PUBLIC is invalid"
+                        converter_errors["DATE_PUBLIC"]["message"] = str(err)
+                        pass
+                elif o_meta["state"] == "PUBLISHED":
+                    o_meta["datePublished"] = str(getDatePublished(o_meta["cveId"], recordHistory))
+                    
+                if "datePublished" in o_meta and o_meta["datePublished"] == "":
+                    del o_meta["datePublished"]
+                elif "datePublished" in o_meta:
+                    try:
+                        parseDate(o_meta["datePublished"], stats.dates)
+                    except:
+                        del o_meta["datePublished"]
+
+                if "DATE_REQUESTED" in i_meta and i_meta["DATE_REQUESTED"] != "":
+                    try:
+                        o_meta["dateReserved"] = i_meta["DATE_REQUESTED"]
+                        if not isinstance(o_meta["dateReserved"], datetime.datetime):
+                            o_meta["dateReserved"] = normalizeDate(o_meta["dateReserved"], stats.dates)
+                        keysUsed.add("DATE_REQUESTED")
+                    except Exception as err:
+                        converter_errors["DATE_REQUESTED"] = {}
+                        converter_errors["DATE_REQUESTED"]["error"] = "v4 DATE_REQUESTED is invalid"
+                        converter_errors["DATE_REQUESTED"]["message"] = str(err)
+                else:
+                    o_meta["dateReserved"] = str(getReservedDate(o_meta["cveId"], recordHistory))
+                    if not isinstance(o_meta["dateReserved"], datetime.datetime):
+                        o_meta["dateReserved"] = normalizeDate(o_meta["dateReserved"], stats.dates)
+                
+            else:
+                raise MissingRequiredPropertyValue(inputfile, "CVE_data_meta no STATE")
+        except Exception as e:
+            print( inputfile + " :: " + str(e) )
+            print( traceback.format_exc() )
+            if type(e) is not MissingRequiredPropertyValue:
+                raise MissingRequiredPropertyValue(inputfile, "CVE_data_meta structure error")
+            else:
+                raise e
+
+        ludate = getLastUpdated(o_meta["cveId"], recordHistory)
+        if ludate:
+            o_meta["dateUpdated"] = str(ludate)
+        else:
+            o_meta["dateUpdated"] = str(datetime.datetime.combine(datetime.date.today(), datetime.datetime.min.time()).isoformat())
+
+        jout["cveMetadata"] = o_meta
+        # slowest record lists name the record by its CVE ID rather than the input file
+        profile.record = o_meta["cveId"]
+        diagnostics["cveId"] = o_meta["cveId"]
+
+        # public up convert
+        if o_meta["state"].upper() == "PUBLISHED":
+            o_cna = {}
+            if "TITLE" in i_meta and i_meta["TITLE"] != "": 
+                o_cna["title"] = i_meta["TITLE"]
+                stats.maxTitle = max(stats.maxTitle, len(o_cna["title"]))
+                if len(o_cna["title"]) > v5MaxTitleLength:
+                    o_cna["title"] = (o_cna["title"][:(v5MaxTitleLength - 5)] + " ...")
+                    converter_errors["TITLE"] = {"error": "TITLE too long. Truncating in v5 record.", "message": "Truncated!"}
+
+                keysUsed.add("TITLE")
+            if "DATE_PUBLIC" in i_meta:
+                o_cna["datePublic"] = i_meta["DATE_PUBLIC"]
+                try:
+                    if not isinstance(o_cna["datePublic"], datetime.datetime):
+                        o_cna["datePublic"] = normalizeDate(o_cna["datePublic"], stats.dates)
+                    keysUsed.add("DATE_PUBLIC")
+                except Exception as err:
+                    del o_cna["datePublic"]
+                    pass
+            
+                if "datePublic" in o_cna and o_cna["datePublic"] == "":
+                    del o_cna["datePublic"]
+                elif "datePublic" in o_cna:
+                    try:
+                        parseDate(o_cna["datePublic"], stats.dates)
+                    except:
+                        print("removing datePublic")
+                        del o_cna["datePublic"]
+
+            
+            if "DATE_ASSIGNED" in i_meta:
+                try:
+                    o_cna["dateAssigned"] = i_meta["DATE_ASSIGNED"]
+                    if not isinstance(o_cna["dateAssigned"], datetime.datetime):
+                        o_cna["dateAssigned"] = normalizeDate(o_cna["dateAssigned"], stats.dates)
+
+                    keysUsed.add("DATE_ASSIGNED")
+                except Exception as err:
+                    converter_errors["DATE_ASSIGNED"] = {}
+                    converter_errors["DATE_ASSIGNED"]["error"] = "v4 DATE_ASSIGNED is invalid"
+                    converter_errors["DATE_ASSIGNED"]["message"] = str(err)
+
+            # get org info
+            o_cna["providerMetadata"] = {}
+            o_cna["providerMetadata"]["orgId"] = o_meta["assignerOrgId"]
+            o_cna["providerMetadata"]["shortName"] = o_meta["assignerShortName"]
+            try:
+                o_cna["providerMetadata"]["dateUpdated"] = o_meta["dateUpdated"]
+                if not isinstance(o_cna["providerMetadata"]["dateUpdated"], datetime.datetime):
+                    o_cna["providerMetadata"]["dateUpdated"] = normalizeDate(o_cna["providerMetadata"]["dateUpdated"], stats.dates)
+            except:
+                o_cna["providerMetadata"]["dateUpdated"] = str(datetime.datetime.combine(dateParse(datetime.now(), datetime.datetime.min.time()).isoformat()))
+            stageStart = profile.lap("meta", stageStart)
+
+            if "description" in data and "description_data" in data["description"]:
+                keysUsed.add("description")
+                o_cna["descriptions"] = []
+                for i_desc in data["description"]["description_data"]:
+                    o_desc = {}
+                    if "lang" in i_desc: 
+                        o_desc["lang"] = lang_code_2_from_3(i_desc["lang"])
+                
+                    newDesc = i_desc["value"]
+                                        
+                    # find and convert description tags - DISPUTED, UNSUPPORTED WHEN ASSIGNED
+                    if i_desc["value"].casefold().startswith("** disputed"):
+                        if "tags" not in o_cna:
+                            o_cna["tags"] = []
+                        if "disputed" not in o_cna["tags"]:
+                            o_cna["tags"].append("disputed")
+                        newDesc = newDesc[14:-1].strip()
+                
+                    
+                    if i_desc["value"].casefold().startswith("** unsupported when assigned"):
+                        tagval = "unsupported-when-assigned"
+                        if "tags" not in o_cna:
+                            o_cna["tags"] = []
+                        if tagval not in o_cna["tags"]:
+                            o_cna["tags"].append(tagval)
+                        newDesc = newDesc[31:-1].strip()
+
+                    if "value" in i_desc: o_desc["value"] = newDesc
+                    o_cna["descriptions"].append(o_desc)
+            stageStart = profile.lap("descriptions", stageStart)
+                
+
+            if "affects" in data:
+                keysUsed.add("affects")
+                o_cna["affected"] = {}
+                i_affects = data["affects"]
+                o_affected = []
+                #vendors
+                if "vendor" in i_affects:
+                    for i_vd in i_affects["vendor"]["vendor_data"]:
+                        if "product" in i_vd and "product_data" in i_vd["product"]:
+                            for vd_pd in i_vd["product"]["product_data"]:
+                                if "version" in vd_pd and "version_data" in vd_pd["version"]:
+                                    v_agg_hash = {}
+                                    v_agg_list = {}
+                                    product_name = vd_pd["product_name"]
+                                    for pd_vd in vd_pd["version"]["version_data"]:
+                                        if not "version_value" in pd_vd: 
+                                            # throw invalid version_data, must have version_value value
+                                            raise MissingRequiredPropertyValue(o_meta["cveId"], "AFFECT.vendor.product  missing a version_value for ("+i_vd["vendor_name"]+" - "+vd_pd["product_name"]+")")
+                                        platform = ""
+                                        if "platform" in pd_vd:
+                                            platform = pd_vd["platform"]
+                                        if not platform in v_agg_hash:
+                                            v_agg_hash[platform] = {}
+                                            v_agg_list[platform] = []
+                                        vn_hash = v_agg_hash[platform]
+                                        v_list = v_agg_list[platform]
+                                        if "version_name" in pd_vd:  # vulnogram generated                                           
+                                            vn = pd_vd["version_name"]
+                                            if product_name.casefold() is not vn.casefold():
+                                                [vstatus, va] = convert_VA(pd_vd)
+                                                if va == '=':
+                                                    v_list.append(nonEmpty(eq_version(pd_vd, vstatus)))
+                                                elif vn in vn_hash:
+                                                    if va == '<':
+                                                        vstatus = negate(vstatus)
+                                                    if va == '<=':
+                                                        vstatus = negate(vstatus)
+                                                        pd_vd["version_value"] = pd_vd["version_value"] + ' +1'
+                                                    else:
+                                                        if not "changes" in vn_hash[vn]:
+                                                            vn_hash[vn]["changes"] = []
+                                                        # duplicates are removed once the product is done
+                                                        vn_hash[vn]["changes"].append({
+                                                            "at": pd_vd["version_value"],
+                                                            "status": vstatus
+                                                        })
+                                                elif va == '<':
+                                                    vn_hash[vn] = nonEmpty(l_version(pd_vd, vstatus))
+                                                elif va == '<=':
+                                                    vn_hash[vn] = nonEmpty(le_version(pd_vd, vstatus))
+                                                else:
+                                                    vn_hash[vn] = {
+                                                        "version": pd_vd["version_value"],
+                                                        "status": vstatus,
+                                                        "lessThan": pd_vd["version_name"] + '*',
+                                                        "versionType": "custom"
+                                                    }
+                                            # end if product_name is not version_name
+                                        else:
+                                            [vstatus, va] = convert_VA(pd_vd)
+                                            version_value = pd_vd["version_value"]
+                                            if version_value:
+                                                version_value = version_value.strip()
+                                        
+                                            if not version_value or len(version_value) < 1:
+                                                version_value = "undefined"
+                                        
+                                            if va == '=':
+                                                v_list.append(nonEmpty({
+                                                    "version": pd_vd["version_value"],
+                                                    "status": vstatus
+                                                }))
+                                            elif va == '<':
+                                                v_list.append(nonEmpty({
+                                                    "version": 'unspecified',
+                                                    "lessThan": version_value,
+                                                    "status": vstatus,
+                                                    "versionType": "custom"
+                                                }))
+                                            elif va == '<=':
+                                                v_list.append(nonEmpty({
+                                                    "version": 'unspecified',
+                                                    "lessThanOrEqual": version_value,
+                                                    "status": vstatus,
+                                                    "versionType": "custom"
+                                                }))
+                                            elif va == '>':
+                                                v_list.append(nonEmpty({
+                                                    "version": "next of " + pd_vd["version_value"],
+                                                    "status": vstatus,
+                                                    "lessThan": "unspecified",
+                                                    "versionType": "custom"
+                                                }))
+                                            elif va == '>=':
+                                                v_list.append(nonEmpty({
+                                                    "version": pd_vd["version_value"],
+                                                    "status": vstatus,
+                                                    "lessThan": "unspecified",
+                                                    "versionType": "custom"
+                                                }))
+                                            else:
+                                                v_list.append(nonEmpty({
+                                                    "version": pd_vd["version_value"],
+                                                    "status": "affected",
+                                                }))                                                
+                                    
+                                            # check for blank version and defailt to "unspecified"
+                                            #if len(version_item["version"]) < 1:
+                                            #    version_item["version"] = "unspecified"
+                                        # end if version_name in pd_vd
+
+                                    for platform in v_agg_hash:
+                                        # build affected item here:
+                                        affected_item = {}
+                                        affected_item["vendor"] = i_vd["vendor_name"]
+                                        affected_item["product"] = vd_pd["product_name"]
+                                        affected_item["versions"] = []
+                                        if platform != "":
+                                            affected_item["platforms"] = [platform]
+                                        if len(v_agg_list[platform]) > 0:
+                                            affected_item["versions"].extend(v_agg_list[platform])
+                                        if v_agg_hash[platform]:
+                                            for vn_item in v_agg_hash[platform].values():
+                                                if "changes" in vn_item:
+                                                    vn_item["changes"] = uniqueList(vn_item["changes"])
+                                            affected_item["versions"].extend(v_agg_hash[platform].values())
+
+                                        #remove duplicates
+                                        y = uniqueList(affected_item["versions"])
+                                        if len(y) > 0:
+                                            affected_item["versions"] = y
+                                        else:
+                                            del affected_item["versions"]
+
+                                        # defaultStatus is new, default to 'unknown' if versions is empty
+                                        if not "versions" in affected_item:
+                                            affected_item['defaultStatus'] = "unknown"
+                            
+                                        # end for loop of version_data
+                                        o_affected.append(affected_item)
+
+                # clean affect before adding
+                # - truncate long fields                
+                # - populate missing required fields
+                for o in o_affected:
+                    if "vendor" not in o or not o["vendor"]:
+                        o["vendor"] = "unspecified"
+
+                    if "product" not in o or not o["product"]:
+                        o["product"] = "unspecified"
+
+                    for vo in o["versions"]:
+                        if len(vo["version"]) > maxV5VersionLength:
+                            vo["version"] = (vo["version"][:(maxV5VersionLength-16)] + " ...[truncated*]")
+                            converter_errors["version_name"] = {"error": "version_name too long. Use array of versions to record more than one version.", "message": "Truncated!"}
+
+                    if len(o["product"]) > maxV5ProductLength:
+                        o["product"] = (o["product"][:(maxV5ProductLength-16)] + " ...[truncated*]")
+                        converter_errors["product_name"] = {"error": "product_name too long. Use array of products to recond more than one product.", "message": "Truncated!"}
+
+                o_cna["affected"] = o_affected
+            # done with affected up convert
+        
+            stageStart = profile.lap("affects", stageStart)
+
+            if "references" in data and "reference_data" in data["references"]:
+                keysUsed.add("references")
+                o_cna["references"] = []
+                for i_ref in data["references"]["reference_data"]:
+                    if "refsource" in i_ref and i_ref["refsource"] == "url":
+                        # drop references of resource type == 'url'
+                        pass
+                    else:
+                        o_ref = {}
+                        #ignore name if empty or if same as URL
+                        if "name" in i_ref and i_ref["name"] != "" and i_ref["name"] != i_ref["url"] : o_ref["name"] = i_ref["name"]
+                        if "refsource" in i_ref:
+                            # convert to new reference tags
+                            v5Tag_values = self.v5ReferenceTags(i_ref["refsource"], stats) or []
+                            
+                            # preserve legacy tag value
+                            refSourceTag = "x_refsource_"+i_ref["refsource"]
+                            o_ref["tags"] = uniqueList(v5Tag_values + [refSourceTag])
+
+                        if "url" in i_ref: o_ref["url"] = i_ref["url"]
+
+                        # decode then encode URL, to clear issue with AJV URL validations
+                        o_ref["url"] = reEncodeUrl(o_ref["url"])
+
+                        # duplicates are removed once all references are converted
+                        if o_ref["url"]:
+                            o_cna["references"].append(o_ref)
+                    # end if resource != 'url'
+                o_cna["references"] = uniqueList(o_cna["references"])
+            # end of reference up convert    
+            stageStart = profile.lap("references", stageStart)
+
+            if "credit" in data: # may be a list, or a string
+                keysUsed.add("credit")
+                if isinstance(data["credit"], list):
+                    for i_credit in data["credit"]:
+                        if isinstance(i_credit, dict):
+                            o_credit = {}
+                            if "lang" in i_credit and "value" in i_credit:
+                                o_credit["lang"] = lang_code_2_from_3(i_credit["lang"])
+                            else:
+                                o_credit["lang"] = "en"
+                        
+                            if "value" in i_credit:
+                                if "credits" not in o_cna:
+                                    o_cna["credits"] = []
+                                o_credit["value"] = i_credit["value"]                        
+                                o_cna["credits"].append(o_credit)
+                        elif isinstance(i_credit, list):
+                            for citem in i_credit:
+                                o_credit = {}
+                                o_credit["lang"] = "en"
+                                if "credits" not in o_cna:
+                                    o_cna["credits"] = []
+                                o_credit["value"] = citem                        
+                                o_cna["credits"].append(o_credit)
+                        else:
+                            o_credit = {}
+                            o_credit["lang"] = "en"
+                            o_credit["value"] = i_credit                        
+                            if "credits" not in o_cna:
+                                o_cna["credits"] = []
+                            o_cna["credits"].append(o_credit)
+                    
+                else:
+                    # convert value content to string
+                    o_cna["credits"] = []
+                    o_credit = {}
+                    o_credit["lang"] = "en"
+                    o_credit["value"] = str(data["credit"])
+                    o_cna["credits"].append(o_credit)
+            # end of credit up convert    
+            stageStart = profile.lap("credits", stageStart)
+                    
+            if "impact" in data and data["impact"] and not(data["impact"] is None): # impact is an unofficial community added property under CVE 4.0 that maps to metrics array in CVE 5
+                keysUsed.add("impact")
+                try:
+                    o_cna["metrics"] = []
+                    for i_impact in data["impact"]:
+                        o_impact = {}
+                    
+                        iver = "other"
+                        iobj = {}
+                        if isinstance(data["impact"], collections.abc.Mapping):  # if impact is a JSON object
+                            # check key value, try to match on recognized versions
+                            if i_impact == "cvss" and "version" in data["impact"][i_impact]:                            
+                                if data["impact"][i_impact]["version"] == "3.1":
+                                    iver = "cvssV3_1"
+                                elif data["impact"][i_impact]["version"] == "3.0":
+                                    iver = "cvssV3_0"
+                                elif data["impact"][i_impact]["version"] == "2.0":
+                                    iver = "cvssV2_0"                            
+                                else:
+                                    pass
+                                iobj = data["impact"][i_impact]
+                            elif i_impact == "cvssv3":
+                                iver = "cvssV3_0"
+                                iobj = data["impact"][i_impact]
+                            elif i_impact == "cvss" and isinstance(data["impact"][i_impact], list):
+                                for tc in data["impact"][i_impact]: # array of arrays
+                                    if ( isinstance(tc, list) ): # list in list
+                                        for ic in tc: # inner array
+                                            lver = "other"
+                                            iver = "skip" #skip the external o_impact because we found an array instead of a object                                            
+                                            if "version" in ic:
+                                                if ic["version"] == "3.1":
+                                                    lver = "cvssV3_1"
+                                                elif ic["version"] == "3.0":
+                                                    lver = "cvssV3_0"
+                                                elif ic["version"] == "2.0":
+                                                    lver = "cvssV2_0"
+                                                else:
+                                                    bv = i_impact + "-" + str(ic["version"])
+                                                    stats.invalidImpactVersions[bv] += 1
+                                                    pass
+                                            else:
+                                                # print("didn't find version")
+                                                # print(ic)
+                                                raise MissingRequiredPropertyValue(i_meta["ID"], "IMPACT.version from cvss[[{}]]" )
+                                        
+                                            if lver == "other":
+                                                o_impact[lver] = {}
+                                                o_impact[lver]["type"] = "unknown"
+                                                o_impact[lver]["content"] = ic
+                                            else:
+                                                o_impact[lver] = ic.copy() 
+                                    elif (isinstance(tc, collections.abc.Mapping)): # array of objects
+                                            lver = "other"
+                                            iver = "skip" #skip the external o_impact because we found an array instead of a object                                            
+                                            if "version" in tc:
+                                                if tc["version"] == "3.1":
+                                                    lver = "cvssV3_1"
+                                                elif tc["version"] == "3.0":
+                                                    lver = "cvssV3_0"
+                                                elif tc["version"] == "2.0":
+                                                    lver = "cvssV2_0"
+                                                else:
+                                                    bv = i_impact + "-" + str(tc["version"])
+                                                    stats.invalidImpactVersions[bv] += 1
+                                                    pass
+                                            else:
+                                                # print("didn't find version")
+                                                # print(tc)
+                                                raise MissingRequiredPropertyValue(i_meta["ID"], "IMPACT.version from cvss[{}]" )
+                                        
+                                            if lver == "other":
+                                                o_impact[lver] = {}
+                                                o_impact[lver]["type"] = "unknown"
+                                                o_impact[lver]["content"] = tc
+                                            else:
+                                                o_impact[lver] = tc.copy() 
+                                    else:
+                                        raise UnexpectedPropertyValue( i_meta["ID"], "Impact - cvss structure not recognized")
+
+                            else: # impact not an object, or property name not recognized
+                                pass
+                                
+                            if iver == "other":
+                                # ensure content is an object
+                                o_impact[iver] = buildImpactOther(i_impact, data["impact"][i_impact])
+                                
+                            elif iver == "skip":
+                                pass
+                            else:
+                                o_impact[iver] = data["impact"][i_impact].copy()
+                        else:  # impact was not a JSON object, just copy the content and mark type as unknown
+                            c_i_impact = clean_empty(i_impact)
+                            if c_i_impact:
+                                o_impact[iver] = buildImpactOther(i_impact, c_i_impact)
+                        
+
+                        # record if a scoring element landed in "other"
+                        # just upconversion tracking log
+                        if o_impact and i_impact != "other":
+                            # print("have impact")
+                            if "other" in o_impact:
+                                # print("have converted other impact:" + str(i_impact))
+                                # print(json.dumps(o_impact, indent=2))
+                                if "content" in o_impact["other"]:
+                                    stats.addScoringOther(i_meta["ID"], o_impact["other"]["content"])
+
+                        # repair cvss data conversion
+                        # if any property is missing replace with generated object
+                        try:
+                            if "cvssV3_1" in o_impact and "vectorString" in o_impact["cvssV3_1"]:
+                                vStrMatch = REGEX["cvss3Vector"].search(o_impact["cvssV3_1"]["vectorString"])
+                                if vStrMatch:
+                                    try:
+                                        vStr = vStrMatch.group(1)
+                                        if not vStr.startswith("CVSS:3."):
+                                                vStr = "CVSS:3.1/"+vStr
+                                        o_impact["cvssV3_1"] = self.parseCVSS(CVSS3, vStr, stats)
+                                        # fix mismatched CVSS versions
+                                        if o_impact["cvssV3_1"]["version"] == "3.0":
+                                            o_impact["cvssV3_0"] = o_impact["cvssV3_1"]
+                                            del o_impact["cvssV3_1"]
+                                    except Exception as err:
+                                        del o_impact["cvssV3_1"]
+                                        converter_errors["cvssV3_1"] = {}
+                                        converter_errors["cvssV3_1"]["error"] = "CVSSV3_1 data from v4 record is invalid"
+                                        converter_errors["cvssV3_1"]["message"] = str(err)
+
+
+                            if "cvssV3_0" in o_impact:
+                                if "BM" in o_impact["cvssV3_0"]:
+                                    o_impact["cvssV3_0"]["vectorString"] = IBM_score(o_impact["cvssV3_0"])
+                                if "vectorString" in o_impact["cvssV3_0"]:
+                                    vStrMatch = REGEX["cvss3Vector"].search(o_impact["cvssV3_0"]["vectorString"])
+                                    if vStrMatch:
+                                        try:
+                                            vStr = vStrMatch.group(1)
+                                            if not vStr.startswith("CVSS:3."):
+                                                    vStr = "CVSS:3.0/"+vStr                                        
+                                            o_impact["cvssV3_0"] = self.parseCVSS(CVSS3, vStr, stats)
+                                            #fix mismatched CVSS versions
+                                            if o_impact["cvssV3_0"]["version"] == "3.1":
+                                                o_impact["cvssV3_1"] = o_impact["cvssV3_0"]
+                                                del o_impact["cvssV3_0"]
+                                        except Exception as err:
+                                            del o_impact["cvssV3_0"]
+                                            # print("error cvssV3_0")
+                                            # print(err) 
+                                            converter_errors["cvssV3_0"] = {}
+                                            converter_errors["cvssV3_0"]["error"] = "CVSSV3_0 data from v4 record is invalid"
+                                            converter_errors["cvssV3_0"]["message"] = str(err)
+                                            pass
+
+                            if "cvssV2_0" in o_impact and "vectorString" in o_impact["cvssV2_0"]:
+                                vStr = REGEX["cvss2Vector"].search(o_impact["cvssV2_0"]["vectorString"])
+                                if vStr:
+                                    try:
+                                        o_impact["cvssV2_0"] = self.parseCVSS(CVSS2, vStr.group(1), stats)
+                                    except Exception as err:
+                                        del o_impact["cvssV2_0"]
+                                        converter_errors["cvssV2_0"] = {}
+                                        converter_errors["cvssV2_0"]["error"] = "CVSSV2_0 data from v4 record is invalid"
+                                        converter_errors["cvssV2_0"]["message"] = str(err)
+
+                            # delete garbage cvss entries from impact,
+                            # check and purge once after all source formats are converted
+                            vers = ["cvssV3_1", "cvssV3_0", "cvssV2_0"]
+                            for cVer in vers:
+                                deleteMe = False
+                                if cVer in o_impact:
+                                    # delete garbage cvss scores        
+                                    if ("vectorString" not in o_impact[cVer]
+                                            or not o_impact[cVer]["vectorString"] 
+                                            or not REGEX["digit"].search(o_impact[cVer]['vectorString']) ):
+                                        deleteMe = True
+
+                                    if ("baseScore" not in o_impact[cVer]
+                                            or not o_impact[cVer]["baseScore"]):
+                                        deleteMe = True
+            
+                                    if deleteMe:
+                                        del o_impact[cVer]
+                                    else:
+                                        if ( o_impact[cVer] 
+                                                and "baseScore" in o_impact[cVer]
+                                                and not isinstance(o_impact[cVer]["baseScore"], Number) ):
+                                            o_impact[cVer]["baseScore"] = float(o_impact[cVer]["baseScore"])
+
+                        except Exception as err:
+                            print("error")
+                            print(err) 
+                            traceback.print_exc()
+                            converter_errors["impact_cvss"] = {}
+                            converter_errors["impact_cvss"]["error"] = "CVSS data from v4 record is invalid"
+                            converter_errors["impact_cvss"]["message"] = str(err)
+                            pass
+
+                        # only add if not empty
+                        if o_impact:
+                            o_cna["metrics"].append(o_impact)
+                    # end for impact
+                except Exception as e:
+                    raise UnexpectedPropertyValue(i_meta["ID"], "IMPACT", str(e))
+            
+                # if metrics is empty, remove it now, to avoid later cleanup    
+                if not o_cna["metrics"]:
+                    del o_cna["metrics"]
+            # end of impact up convert    
+            stageStart = profile.lap("impact", stageStart)
+
+            if "problemtype" in data and "problemtype_data" in data["problemtype"]:
+                keysUsed.add("problemtype")
+                o_cna["problemTypes"] = []
+                i_pds = data["problemtype"]["problemtype_data"]
+                for i_pd in i_pds:
+                    o_pt_desc = []
+                    if "description" in i_pd:
+                        for i_desc in i_pd["description"]:                        
+                            o_pd = {}
+                            o_pd["type"] = "text"
+                            for dk in i_desc:
+                                if dk == "lang":
+                                    o_pd["lang"] = lang_code_2_from_3(i_desc[dk])
+                                elif dk == "value":
+                                    o_pd["description"] = i_desc[dk]
+                                    # If description mentions CWEs pick the first as the CWE ID
+                                    cwe = REGEX["cweInText"].search(i_desc[dk])
+                                    if cwe:
+                                        o_pd["type"] = "CWE"
+                                        o_pd["cweId"] = cwe.group(0).upper()
+                                else:
+                                    o_pd[dk] = i_desc[dk]
+                            if "lang" not in o_pd or not o_pd["lang"]:
+                                o_pd["lang"] = "en"
+                            if ("description" in o_pd 
+                                    and o_pd["description"] != ""):
+                                o_pt_desc.append(o_pd)                
+                    if "CWE-ID" in i_pd:
+                        # extract all id by regex pattern, copy 
+                        ids = REGEX["cweId"].findall(i_pd["CWE-ID"])
+                        for c in ids:
+                            o_pd = {}
+                            o_pd["description"] = i_pd["CWE-ID"]
+                            o_pd["lang"] = "eng"
+                            o_pd["type"] = "CWE"
+                            o_pd["cweId"]  = c
+                            o_pt_desc.append(o_pd)                
+                                            
+                    o_pt_descs = {}
+                    if len(o_pt_desc)>0 and hasVal(o_pt_desc):
+                        o_pt_descs["descriptions"] = o_pt_desc
+                        o_cna["problemTypes"].append( o_pt_descs)
+            # end of problem_type up convert    
+            stageStart = profile.lap("problemtype", stageStart)
+
+            if "generator" in data: #community field
+                keysUsed.add("generator")
+                try:
+                    o_cna["x_generator"] = data["generator"]
+                except:
+                    raise UnexpectedPropertyValue(o_meta["cveId"], "generator", "JSON not convertable")
+            # end of generator up convert    
+
+            if "source" in data: #community field
+                keysUsed.add("source")
+                try:
+                    o_cna["source"] = data["source"]
+                except:
+                    raise UnexpectedPropertyValue(o_meta["cveId"], "source", "JSON not convertable")
+            # end of source up convert    
+
+            if "configuration" in data:
+                keysUsed.add("configuration")
+                try:
+                    if isinstance(data["configuration"], list):                
+                        o_cna["configurations"] = data["configuration"]
+                    else:
+                        o_cna["configurations"] = []
+                        o_cna["configurations"].append(data["configuration"])
+                    o_cna["configurations"] = convertLangInArray(o_cna["configurations"])  # language code conversion
+                    if len(o_cna["configurations"]) < 1:
+                        del o_cna["configurations"]
+                except:
+                    raise UnexpectedPropertyValue(o_meta["cveId"], "configuration", "JSON not convertable")
+            # end of configuration up convert    
+
+            if "work_around" in data:
+                keysUsed.add("work_around")
+                try:
+                    if isinstance(data["work_around"], list):                
+                        o_cna["workarounds"] = data["work_around"]
+                    else:
+                        o_cna["workarounds"] = []
+                        o_cna["workarounds"].append(data["work_around"])
+                    
+                    o_cna["workarounds"] = convertLangInArray(o_cna["workarounds"])  # language code conversion
+                    if len(o_cna["workarounds"]) < 1:
+                        del o_cna["workarounds"]
+                except:
+                    raise UnexpectedPropertyValue(o_meta["cveId"], "work_around", "JSON not convertable")
+            # end of work_around up convert    
+
+            if "workaround" in data:
+                keysUsed.add("workaround")
+                try:
+                    if isinstance(data["workaround"], list):                
+                        o_cna["workarounds"] = data["workaround"]
+                    else:
+                        o_cna["workarounds"] = []
+                        o_cna["workarounds"].append(data["workaround"])
+                    
+                    o_cna["workarounds"] = convertLangInArray(o_cna["workarounds"])  # language code conversion
+                    if len(o_cna["workarounds"]) < 1:
+                        del o_cna["workarounds"]
+                except:
+                    raise UnexpectedPropertyValue(o_meta["cveId"], "work_around", "JSON not convertable")
+            # end of work_around up convert    
+
+            if "exploit" in data:
+                keysUsed.add("exploit")
+                try:
+                    if isinstance(data["exploit"], list):                
+                        o_cna["exploits"] = data["exploit"]
+                    else:
+                        o_cna["exploits"] = []
+                        o_cna["exploits"].append(data["exploit"])
+                    o_cna["exploits"] = convertLangInArray(o_cna["exploits"])  # language code conversion
+                    if len(o_cna["exploits"]) < 1:
+                        del o_cna["exploits"]                   
+                except:
+                    raise UnexpectedPropertyValue(o_meta["cveId"], "exploit", "JSON not convertable")
+            # end of exploit up convert    
+
+            if "timeline" in data:
+                # v4 time is supposed to be an array of object with time, lang, value properties
+                keysUsed.add("timeline")
+                try:
+                    if isinstance(data["timeline"], list):                
+                        o_cna["timeline"] = data["timeline"]
+                    else:
+                        o_cna["timeline"] = []
+                        o_cna["timeline"].append(data["timeline"])
+                    o_cna["timeline"] = convertLangInArray(o_cna["timeline"])  # language code conversion
+                    if len(o_cna["timeline"]) < 1:
+                        del o_cna["timeline"]
+                except:
+                    raise UnexpectedPropertyValue(o_meta["cveId"], "timeline", "JSON not convertable")
+                
+                # clean up, remove missing value, convert to datetime for time
+                if "timeline" in o_cna:
+                    for t in o_cna["timeline"]:
+                        if ("value" not in t or not t["value"]
+                                or "time" not in t or not t["time"]):
+                            o_cna["timeline"].remove(t)
+                        else:
+                            # ensure a lang is present default to en
+                            if "lang" not in t:
+                                t["lang"] = "en"
+                            # ensure time is in datetime format
+                            if not isinstance(t["time"], datetime.datetime):
+                                t["time"] = normalizeDate(t["time"], stats.dates)
+            # end of timeline up convert    
+
+            if "solution" in data:
+                keysUsed.add("solution")
+                try:
+                    if isinstance(data["solution"], list):                
+                        o_cna["solutions"] = data["solution"]
+                    else:
+                        o_cna["solutions"] = []
+                        o_cna["solutions"].append(data["solution"])
+                    o_cna["solutions"] = convertLangInArray(o_cna["solutions"])  # language code conversion
+                    if len(o_cna["solutions"]) < 1:
+                        del o_cna["solutions"]
+                except:
+                    raise UnexpectedPropertyValue(o_meta["cveId"], "source", "JSON not convertable")
+                
+                # purge incomplete entries from solutions, and set lang if missing
+                if "solutions" in o_cna:
+                    for s in o_cna["solutions"]:
+                        if ("value" not in s
+                                or not s["value"]):
+                            o_cna["solutions"].remove(s)
+                        else:
+                            if "lang" not in s:
+                                s["lang"] = "en"
+            # end of solution up convert    
+
+            stageStart = profile.lap("other", stageStart)
+
+            # drop empty propteries
+            if not "affected" in o_cna:
+                o_cna["affected"] = [{"vendor": "unspecified", "product": "unspecified", "defaultStatus": "unknown"}]
+                converter_errors["affects"] = {"error": "Missing affected product. Using unspecified instead.", "message": "Marking it unspecified!"}
+            o_cna = clean_empty(o_cna)
+
+            # insert source record                                                 
+            o_cna["x_legacyV4Record"] = data
+
+            jout["containers"] = {}
+            jout["containers"]["cna"] = o_cna
+            writeout = True
+            stageStart = profile.lap("cleanup", stageStart)
+        
+        elif o_meta["state"].upper() == "RESERVED":
+            writeout = False            
+            stageStart = profile.lap("meta", stageStart)
+        
+        elif o_meta["state"].upper() == "REJECTED":
+            o_cna = {}
+            o_cna["providerMetadata"] = {}
+            o_cna["providerMetadata"]["orgId"] = o_meta["assignerOrgId"]
+            o_cna["providerMetadata"]["shortName"] = o_meta["assignerShortName"]
+            try:
+                o_cna["providerMetadata"]["dateUpdated"] = o_meta["dateUpdated"]
+                if not isinstance(o_cna["providerMetadata"]["dateUpdated"], datetime.datetime):
+                    o_cna["providerMetadata"]["dateUpdated"] = normalizeDate(o_cna["providerMetadata"]["dateUpdated"], stats.dates)
+            except:
+                o_cna["providerMetadata"]["dateUpdated"] = str(datetime.datetime.combine(dateParse(datetime.now(), datetime.datetime.min.time()).isoformat()))
+    
+            # o_meta['dateRejected'] = o_meta["dateUpdated"]
+            o_meta['dateRejected'] = str(getRejectedDate(o_meta["cveId"], recordHistory))
+
+            if not isinstance(o_meta["dateRejected"], datetime.datetime):
+                o_meta["dateRejected"] = normalizeDate(o_meta["dateRejected"], stats.dates)
+            stageStart = profile.lap("meta", stageStart)
+
+            if "description" in data and "description_data" in data["description"]:
+                keysUsed.add("description")
+                o_cna["rejectedReasons"] = []
+                for i_desc in data["description"]["description_data"]:
+                    o_desc = {}
+                    if "lang" in i_desc:
+                        o_desc["lang"] = lang_code_2_from_3(i_desc["lang"])
+                    if "value" in i_desc: 
+                        o_desc["value"] = i_desc["value"]
+        
+                    # find and convert description tags - DISPUTED, UNSUPPORTED WHEN ASSIGNED
+                    if o_desc["value"].casefold().startswith("** disputed"):
+                        if "tags" not in o_cna:
+                            o_cna["tags"] = []
+                        if "disputed" not in o_cna["tags"]:
+                            o_cna["tags"].append("disputed")
+                        o_desc["value"] = o_desc["value"][14:-1].strip()
+                    
+                    if o_desc["value"].casefold().startswith("** unsupported when assigned"):
+                        tagval = "unsupported-when-assigned"
+                        if "tags" not in o_cna:
+                            o_cna["tags"] = []
+                        if tagval not in o_cna["tags"]:
+                            o_cna["tags"].append(tagval)
+                        o_desc["value"] = o_desc["value"][31:-1].strip()
+
+                    if o_desc["value"].casefold().startswith("** reject"):
+                        o_desc["value"] = o_desc["value"][13:-1].strip()
+
+                    o_cna["rejectedReasons"].append(o_desc)
+        
+                
+            # if replaced by present
+            if "REPLACED_BY" in i_meta:
+                rep_ids = i_meta["REPLACED_BY"].split(',')
+                for ri in rep_ids:
+                    if not "replacedBy" in o_meta: o_meta["replacedBy"] = []
+                    o_meta["resplacedBy"].append(ri)
+            stageStart = profile.lap("descriptions", stageStart)
+
+            # drop empty propteries
+            o_cna = clean_empty(o_cna)
+
+            jout["containers"] = {}
+            jout["containers"]["cna"] = o_cna
+            writeout = True
+            stageStart = profile.lap("cleanup", stageStart)
+            pass
+        else:
+            writeout = False
+            raise UnexpectedPropertyValue("STATE", o_meta["state"])
+
+        # if there were converter errors, add them to the result now
+        # this will force a validation error
+        if len(converter_errors) > 0:
+            jout["containers"]["cna"]["x_ConverterErrors"] = converter_errors      
+            if "impact_cvss" in converter_errors:
+                stats.addCvssErrors(o_meta["cveId"], converter_errors["impact_cvss"])
+
+
+        if writeout:
+            #attempt JSON validation
+            valErrors = None
+            if jout["cveMetadata"]["state"] == "PUBLISHED":
+                valErrors = self.publishedValidator.iter_errors(jout)
+            elif jout["cveMetadata"]["state"] == "REJECTED":
+                valErrors = self.validator.iter_errors(jout)
+            elif jout["cveMetadata"]["state"] == "RESERVED":
+                # print(jout["cveMetadata"]["cveId"] + " state = " + jout["cveMetadata"]["state"]) 
+                # valErrors = self.validator.iter_errors(jout)
+                pass
+            else:
+                print(jout["cveMetadata"]["cveId"] + " state = " + jout["cveMetadata"]["state"]) 
+                valErrors = self.validator.iter_errors(jout)
+        
+            if valErrors:
+                errors = []
+                for error in valErrors:
+                    errors.append( str(error.json_path) + " -- validator = "+ str(error.validator)) 
+                               
+                if len(errors) > 0:
+                    jout["containers"]["cna"]["x_ValidationErrors"] = errors
+                    # ValidationFailures.append( jout["cveMetadata"]["cveId"] )
+                    stats.validationFailures[jout["cveMetadata"]["cveId"]] = jout["containers"]["cna"]["x_ValidationErrors"]
+            stageStart = profile.lap("validation", stageStart)
+
+        for i_key in data:
+            if (i_key in keysUsed or
+                i_key in ['data_type', 'data_version', 'data_format']
+                or i_meta["STATE"] == "RESERVED"):
+                #root key was converted
+                pass
+            else:
+                #found a key that was not explicitly converted
+                #these CVEs should be reviewed for validity.
+                stats.addExtraKey(o_meta["state"], i_key, o_meta["cveId"])
+
+        if writeout:
+            return jout
+        return None
+
+
+class UnexpectedPropertyValue(Exception):
+    def __init__(self, cveid, propertyname, message="unexpected value in property"):
+        self.propertyname = propertyname
+        self.cveid = cveid
+        self.message = message
+        super().__init__(self.message)
+    def __str__(self):
+        return self.cveid + " - " + self.propertyname + " - " + self.message 
+
+class MissingRequiredPropertyValue(Exception):
+    def __init__(self, cveid, propertyname, message="Required property missing from CVE"):
+        self.propertyname = propertyname
+        self.cveid = cveid
+        self.message = message
+        super().__init__(self.message)
+    def __str__(self):
+        return self.cveid + " - " + self.propertyname + " - " + self.message 
+
+
+def lang_code_3_from_2(lang_code):
+    """
+    :param: 2 letter language code to convert
+    :return: 3 letter language code
+    :raises:
+
+    """
+    if lang_code:
+        return toAlpha3(lang_code)
+    else:
+        raise Exception("No language code provided")
+
+
+def lang_code_2_from_3(lang_code):
+    """
+    convert to BCP-47 standard
+    :param: 3 letter language code to convert
+    :return: 2 letter language code
+    :raises:
+
+    """
+    if lang_code:
+        return toAlpha2(lang_code)
+    else:
+        raise Exception("No language code provided")
+
+
+def convertLangInArray(sArray):
+    na = []
+    for aval in sArray:
+        if "lang" in aval:
+            # sArray[aval]["lang"] = lang_code_2_from_3(aval["lang"])
+            aval["lang"] = lang_code_2_from_3(aval["lang"])
+            na.append(aval)
+        # end if "lang"
+    # end if aval
+    return na
+
+
+def canonicalKey(v):
+    # hashable form of a JSON value, equal exactly when the values compare equal
+    if isinstance(v, dict):
+        return frozenset((k, canonicalKey(val)) for k, val in v.items())
+    if isinstance(v, list):
+        return tuple(canonicalKey(val) for val in v)
+    return v
+
+
+def uniqueList(items):
+    """
+    :param items: list of JSON values
+    :return: items without duplicates, in first-seen order, in linear time
+    """
+    seen = set()
+    unique = []
+    for item in items:
+        key = canonicalKey(item)
+        if key not in seen:
+            seen.add(key)
+            unique.append(item)
+    return unique
+
+
+def isEmptyEnglishText(d):
+    # {"lang": "en"} or {"lang": "en", "value": ""}
+    return d.get("lang") == "en" and (len(d) == 1 or (len(d) == 2 and d.get("value") == ""))
+
+
+def hasVal(v):
+    # same result as comparing against "", {}, [], {"lang": "en"}, {"lang": "en", "value": ""}
+    # and single item lists of the last two, without building those literals per call
+    if isinstance(v, str):
+        return v != ""
+    if isinstance(v, dict):
+        return len(v) > 0 and not isEmptyEnglishText(v)
+    if isinstance(v, list):
+        return len(v) > 0 and not (len(v) == 1 and isinstance(v[0], dict) and isEmptyEnglishText(v[0]))
+    return True
+
+
+class CleanFrame:
+    # one container on the clean_empty stack
+    __slots__ = ("node", "children", "kept", "changed", "pendingKey", "pendingChild")
+
+    def __init__(self, node):
+        self.node = node
+        self.children = iter(node.items()) if isinstance(node, dict) else enumerate(node)
+        self.kept = []
+        self.changed = False
+
+    def add(self, k, cleaned, original):
+        if hasVal(cleaned):
+            self.kept.append((k, cleaned))
+            if cleaned is not original:
+                self.changed = True
+        else:
+            self.changed = True
+
+    def result(self):
+        if not self.changed:
+            return self.node
+        if isinstance(self.node, dict):
+            return dict(self.kept)
+        return [v for k, v in self.kept]
+
+
+def clean_empty(d):
+    # drop empty values (see hasVal) from nested dicts and lists, bottom up and without recursion,
+    # containers are copied only when something below them was dropped, d itself is never modified
+    if not isinstance(d, (dict, list)) or not d:
+        return d
+    stack = [CleanFrame(d)]
+    while True:
+        frame = stack[-1]
+        for k, v in frame.children:
+            if isinstance(v, (dict, list)) and v:
+                frame.pendingKey = k
+                frame.pendingChild = v
+                stack.append(CleanFrame(v))
+                break
+            frame.add(k, v, v)
+        else:
+            cleaned = frame.result()
+            stack.pop()
+            if not stack:
+                return cleaned
+            parent = stack[-1]
+            parent.add(parent.pendingKey, cleaned, parent.pendingChild)
+
+
+def reEncodeUrl(inRef):
+    # use requote_uri to quote most chars, then urllib.parse.quote to encode any remaining unsafe chars
+    return urllib.parse.quote(requote_uri(inRef), safe=':/=&?#%+')
+
+
+def buildImpactOther(key_str, content):
+    o_impact = {}
+    o_impact["type"] = "unknown"
+    if isinstance(content, dict):
+        o_impact["content"] = content.copy()
+    elif isinstance(content, list):
+        o_impact["content"] = content.copy()
+    else:
+        # wrap value in object
+        o_impact["content"] = {key_str:content}
+    return o_impact
+
+
+def getRejectedDate(cveId, recordHistory):
+    # first Rejected history date, else the first Modified date, capped at today
+    firstRejected = datetime.datetime.combine(datetime.date.today(), datetime.datetime.min.time())
+    lastUpdated = firstRejected
+
+    rejected = recordHistory.minHistory(REJECTED)
+    if rejected is not None:
+        firstRejected = min(fromEpoch(rejected), firstRejected)
+    else:
+        modified = recordHistory.minHistory(MODIFIED)
+        if modified is not None:
+            lastUpdated = min(fromEpoch(modified), lastUpdated)
+        firstRejected = lastUpdated
+    return firstRejected
+
+
+def getLastUpdated(cveId, recordHistory):
+    # latest Modified or Rejected history date, today if the record has no history
+    if recordHistory:
+        lastUpdated = datetime.datetime.min
+        latest = recordHistory.maxHistory((MODIFIED, REJECTED))
+        if latest is not None:
+            lastUpdated = max(fromEpoch(latest), lastUpdated)
+    else:
+        lastUpdated = datetime.datetime.combine(datetime.date.today(), datetime.datetime.min.time())
+    return lastUpdated
+
+
+def getDatePublished(cveId, recordHistory):
+    pubDate = datetime.datetime.now()
+    populated = recordHistory.minPopulated()
+    if populated is not None:
+        pubDate = min(fromEpoch(populated), pubDate)
+    return pubDate
+
+
+def getReservedDate(cveId, recordHistory):
+    resDate = datetime.datetime.now()
+    reserved = recordHistory.minReserved()
+    if reserved is not None:
+        resDate = min(fromEpoch(reserved), resDate)
+    return resDate
@@ -0,0 +1,131 @@
+"""
+Run statistics of cve4to5up.py conversions.
+
+Every accumulator costs O(1) per record: CVE IDs are collected in sets,
+per-value tallies are Counters, and the bulky per-record details the job
+report only counts (scoring data remapped into 'other', cvss errors) keep
+a count plus a capped list of exemplars.
+
+The statistics of a worker process travel as a plain dict (toDict), which
+is also what the conversion manifest stores, and merge() adds them to the
+run totals in the main process.
+"""
+import collections
+
+EXEMPLARS = 20
+
+
+class RunStats:
+    def __init__(self, exemplars=EXEMPLARS):
+        """
+        :param exemplars: number of records kept for details that are only counted
+        """
+        self.exemplars = exemplars
+        self.validationFailures = {}  # CVE ID -> schema errors
+        self.extraKeys = {}  # v5 state -> v4 key not converted -> set of CVE IDs
+        self.defaultedUsers = {}  # user -> CVE IDs re-assigned to the default user
+        self.userErrors = collections.Counter()  # user -> orgs seen after the first
+        self.statesProcessed = set()
+        self.scoringOther = collections.Counter()  # CVE ID -> scoring entries remapped into 'other'
+        self.scoringOtherExemplars = {}  # CVE ID -> remapped scoring data, capped
+        self.invalidImpactVersions = collections.Counter()  # "<impact>-<version>" -> occurrences
+        self.cvssErrorCount = 0
+        self.cvssErrors = []  # {CVE ID: cvss errors}, capped
+        self.unmappedRefsources = collections.Counter()  # v4 refsource -> references with no v5 tag mapping
+        self.cvssCache = collections.Counter(hits=0, misses=0)
+        self.dates = collections.Counter(fast=0, slow=0, memoized=0)  # date_normalize.py paths taken
+        self.minShortName = 100
+        self.maxShortName = 0
+        self.maxTitle = 0
+        self.idrWaitTime = 0.00
+
+    def addExtraKey(self, state, key, cveId):
+        self.extraKeys.setdefault(state, {}).setdefault(key, set()).add(cveId)
+
+    def addScoringOther(self, cveId, content):
+        self.scoringOther[cveId] += 1
+        if cveId in self.scoringOtherExemplars or len(self.scoringOtherExemplars) < self.exemplars:
+            self.scoringOtherExemplars.setdefault(cveId, []).append(content)
+
+    def addCvssErrors(self, cveId, errors):
+        self.cvssErrorCount += 1
+        if len(self.cvssErrors) < self.exemplars:
+            self.cvssErrors.append({cveId: errors})
+
+    def merge(self, other):
+        """
+        :param other: RunStats of one record or worker, merged in input order to match a serial run
+        """
+        self.validationFailures.update(other.validationFailures)
+        for state, keys in other.extraKeys.items():
+            merged = self.extraKeys.setdefault(state, {})
+            for key, cveIds in keys.items():
+                merged.setdefault(key, set()).update(cveIds)
+        for user, cveIds in other.defaultedUsers.items():
+            self.defaultedUsers.setdefault(user, []).extend(cveIds)
+        self.userErrors.update(other.userErrors)
+        self.statesProcessed.update(other.statesProcessed)
+        self.scoringOther.update(other.scoringOther)
+        for cveId, contents in other.scoringOtherExemplars.items():
+            if cveId in self.scoringOtherExemplars or len(self.scoringOtherExemplars) < self.exemplars:
+                self.scoringOtherExemplars.setdefault(cveId, []).extend(contents)
+        self.invalidImpactVersions.update(other.invalidImpactVersions)
+        self.cvssErrorCount += other.cvssErrorCount
+        self.cvssErrors.extend(other.cvssErrors[:self.exemplars - len(self.cvssErrors)])
+        self.unmappedRefsources.update(other.unmappedRefsources)
+        self.cvssCache.update(other.cvssCache)
+        self.dates.update(other.dates)
+        self.minShortName = min(self.minShortName, other.minShortName)
+        self.maxShortName = max(self.maxShortName, other.maxShortName)
+        self.maxTitle = max(self.maxTitle, other.maxTitle)
+        self.idrWaitTime += other.idrWaitTime
+
+    def toDict(self):
+        # JSON serializable, sets become sorted lists
+        return {
+            "ValidationFailures": self.validationFailures,
+            "extra_keys": {state: {key: sorted(cveIds) for key, cveIds in keys.items()}
+                           for state, keys in self.extraKeys.items()},
+            "defaulted_users": self.defaultedUsers,
+            "user_errors": dict(self.userErrors),
+            "states_processed": sorted(self.statesProcessed),
+            "scoring_other": dict(self.scoringOther),
+            "scoring_other_exemplars": self.scoringOtherExemplars,
+            "invalid_impact_versions": dict(self.invalidImpactVersions),
+            "cvssErrorCount": self.cvssErrorCount,
+            "cvssErrorList": self.cvssErrors,
+            "unmapped_refsources": dict(self.unmappedRefsources),
+            "cvssCacheStats": dict(self.cvssCache),
+            "dateStats": dict(self.dates),
+            "minShortName": self.minShortName,
+            "maxShortName": self.maxShortName,
+            "maxTitle": self.maxTitle,
+            "IDRWaitTime": self.idrWaitTime
+        }
+
+    @classmethod
+    def fromDict(cls, stats, exemplars=EXEMPLARS):
+        """
+        :param stats: dict as returned by toDict, keys missing from older manifests are left empty
+        :return: a new RunStats
+        """
+        r = cls(exemplars)
+        r.validationFailures = dict(stats.get("ValidationFailures", {}))
+        r.extraKeys = {state: {key: set(cveIds) for key, cveIds in keys.items()}
+                       for state, keys in stats.get("extra_keys", {}).items()}
+        r.defaultedUsers = {user: list(cveIds) for user, cveIds in stats.get("defaulted_users", {}).items()}
+        r.userErrors.update(stats.get("user_errors", {}))
+        r.statesProcessed.update(stats.get("states_processed", []))
+        r.scoringOther.update(stats.get("scoring_other", {}))
+        r.scoringOtherExemplars = {cveId: list(contents) for cveId, contents in stats.get("scoring_other_exemplars", {}).items()}
+        r.invalidImpactVersions.update(stats.get("invalid_impact_versions", {}))
+        r.cvssErrors = list(stats.get("cvssErrorList", []))
+        r.cvssErrorCount = stats.get("cvssErrorCount", len(r.cvssErrors))
+        r.unmappedRefsources.update(stats.get("unmapped_refsources", {}))
+        r.cvssCache.update(stats.get("cvssCacheStats", {}))
+        r.dates.update(stats.get("dateStats", {}))
+        r.minShortName = stats.get("minShortName", r.minShortName)
+        r.maxShortName = stats.get("maxShortName", r.maxShortName)
+        r.maxTitle = stats.get("maxTitle", r.maxTitle)
+        r.idrWaitTime = stats.get("IDRWaitTime", r.idrWaitTime)
+        return r
@@ -0,0 +1,189 @@
+"""
+Per-stage timing of cve4to5up.py conversions.
+
+The converter takes a lap at the end of every conversion stage (reading the
+v4 file, meta and IDR lookup, descriptions, affects, ...). The laps of one
+record are kept until the record is done, then added to a histogram per
+stage along with the record's total. Histogram buckets are 1/8 of a power
+of two wide, so percentiles are accurate to a few percent whatever the run
+length, and the slowest records of every stage are kept in a small heap.
+
+Time spent inside the stages, like regular expression matching through
+the TimedPattern objects of record_converter.REGEX, is added to inner
+stages of the record the thread is timing. Inner stages are reported like
+the others but not added to the record's total.
+
+The collected data is a plain dict (see StageProfile.stages) so it can
+travel in the run statistics of worker processes and be merged in the main
+process. write() saves percentiles in milliseconds as JSON.
+"""
+import heapq
+import json
+import math
+import threading
+import time
+
+SLOWEST_RECORDS = 10
+BUCKETS_PER_OCTAVE = 8
+TOTAL = "total"
+REGEX = "regex"
+
+_timing = threading.local()  # the StageProfile timing a record in this thread
+
+
+def _bucketValue(bucket):
+    # geometric middle of a histogram bucket, in seconds
+    return 2.0 ** ((bucket + 0.5) / BUCKETS_PER_OCTAVE)
+
+
+def _newStage():
+    return {"count": 0, "total": 0.0, "max": 0.0, "buckets": {}, "slowest": []}
+
+
+class StageProfile:
+    def __init__(self, stages=None, slowest=SLOWEST_RECORDS):
+        """
+        :param stages: collected data to continue from, as returned by stages
+        :param slowest: number of slowest records kept per stage
+        """
+        self.stages = stages if stages is not None else {}
+        self.slowest = slowest
+        self.record = None
+        self.pending = {}
+        self.pendingInner = {}
+
+    def begin(self, record):
+        # start timing a record, laps are kept until end()
+        self.record = record
+        self.pending = {}
+        self.pendingInner = {}
+        _timing.profile = self
+
+    def lap(self, stage, start):
+        """
+        :param stage: name of the stage that ran since start
+        :param start: time.perf_counter() at the start of the stage
+        :return: time.perf_counter() now, the start of the next stage
+        """
+        now = time.perf_counter()
+        self.pending[stage] = self.pending.get(stage, 0.0) + now - start
+        return now
+
+    def inner(self, stage, seconds):
+        # time spent inside the current stage, not added to the record's total
+        self.pendingInner[stage] = self.pendingInner.get(stage, 0.0) + seconds
+
+    def end(self):
+        # add the laps of the current record to the histograms
+        if self.pending:
+            for stage, seconds in self.pending.items():
+                self.sample(stage, self.record, seconds)
+            self.sample(TOTAL, self.record, sum(self.pending.values()))
+        for stage, seconds in self.pendingInner.items():
+            self.sample(stage, self.record, seconds)
+        self.pending = {}
+        self.pendingInner = {}
+        if getattr(_timing, "profile", None) is self:
+            _timing.profile = None
+
+    def sample(self, stage, record, seconds):
+        s = self.stages.get(stage)
+        if s is None:
+            s = self.stages[stage] = _newStage()
+        s["count"] += 1
+        s["total"] += seconds
+        if seconds > s["max"]:
+            s["max"] = seconds
+        bucket = math.floor(math.log2(max(seconds, 1e-9)) * BUCKETS_PER_OCTAVE)
+        s["buckets"][bucket] = s["buckets"].get(bucket, 0) + 1
+        if len(s["slowest"]) < self.slowest:
+            heapq.heappush(s["slowest"], [seconds, str(record)])
+        elif seconds > s["slowest"][0][0]:
+            heapq.heapreplace(s["slowest"], [seconds, str(record)])
+
+    def merge(self, stages):
+        """
+        :param stages: data collected by another StageProfile, e.g. in a worker process
+        """
+        for stage, other in stages.items():
+            s = self.stages.get(stage)
+            if s is None:
+                s = self.stages[stage] = _newStage()
+            s["count"] += other["count"]
+            s["total"] += other["total"]
+            s["max"] = max(s["max"], other["max"])
+            for bucket, count in other["buckets"].items():
+                # keys are strings once the data went through JSON
+                bucket = int(bucket)
+                s["buckets"][bucket] = s["buckets"].get(bucket, 0) + count
+            for entry in other["slowest"]:
+                if len(s["slowest"]) < self.slowest:
+                    heapq.heappush(s["slowest"], list(entry))
+                elif entry[0] > s["slowest"][0][0]:
+                    heapq.heapreplace(s["slowest"], list(entry))
+
+    def percentile(self, stage, q):
+        """
+        :param stage: stage name
+        :param q: percentile as a fraction, e.g. 0.95
+        :return: seconds, within one histogram bucket of the exact value
+        """
+        s = self.stages[stage]
+        rank = max(1, math.ceil(q * s["count"]))
+        seen = 0
+        for bucket in sorted(s["buckets"]):
+            seen += s["buckets"][bucket]
+            if seen >= rank:
+                return min(_bucketValue(bucket), s["max"])
+        return s["max"]
+
+    def summary(self):
+        # per stage count, total, mean and percentiles in milliseconds, stages in first seen order
+        result = {}
+        for stage, s in self.stages.items():
+            if not s["count"]:
+                continue
+            result[stage] = {
+                "count": s["count"],
+                "total_ms": round(s["total"] * 1000, 3),
+                "mean_ms": round(s["total"] / s["count"] * 1000, 3),
+                "p50_ms": round(self.percentile(stage, 0.50) * 1000, 3),
+                "p95_ms": round(self.percentile(stage, 0.95) * 1000, 3),
+                "p99_ms": round(self.percentile(stage, 0.99) * 1000, 3),
+                "max_ms": round(s["max"] * 1000, 3),
+                "slowest": [{"record": record, "ms": round(seconds * 1000, 3)}
+                            for seconds, record in sorted(s["slowest"], reverse=True)]
+            }
+        return result
+
+    def write(self, path):
+        with open(path, "w") as f:
+            json.dump({"stages": self.summary()}, f, indent=2)
+
+
+class TimedPattern:
+    # compiled regular expression whose matching time goes to the inner stage "regex"
+    # of the record this thread is timing, free of timing when no record is
+    __slots__ = ("pattern",)
+
+    def __init__(self, pattern):
+        self.pattern = pattern
+
+    def _timed(self, method, args):
+        profile = getattr(_timing, "profile", None)
+        if profile is None:
+            return method(*args)
+        start = time.perf_counter()
+        try:
+            return method(*args)
+        finally:
+            profile.inner(REGEX, time.perf_counter() - start)
+
+    def search(self, *args):
+        return self._timed(self.pattern.search, args)
+
+    def match(self, *args):
+        return self._timed(self.pattern.match, args)
+
+    def findall(self, *args):
+        return self._timed(self.pattern.findall, args)
@@ -0,0 +1,63 @@
+"""
+uniqueList (record_converter.py) must give the same result as the list
+membership dedup the converter used before it: the same items, in the
+same order, as the same objects, so the written JSON keeps each
+first-seen item's key order.
+
+USAGE python -m pytest test_unique_list.py, or python test_unique_list.py
+"""
+import json
+
+from record_converter import uniqueList
+
+CASES = [
+    [],
+    ["a", "b", "a", "", "b", ""],
+    [{"version": "1.0", "status": "affected"}, {"status": "affected", "version": "1.0"}],
+    [{"version": "1.0", "changes": [{"at": "1.1", "status": "unaffected"}]},
+     {"changes": [{"status": "unaffected", "at": "1.1"}], "version": "1.0"},
+     {"version": "1.0", "changes": [{"at": "1.2", "status": "unaffected"}]}],
+    [{"a": {"b": {"c": [1, 2]}}}, {"a": {"b": {"c": [2, 1]}}}, {"a": {"b": {"c": [1, 2]}}}],
+    [[{"a": 1}, {"b": 2}], [{"b": 2}, {"a": 1}], [{"a": 1}, {"b": 2}]],
+    [{"tags": ["x", "y"]}, {"tags": ["y", "x"]}, {"tags": ["x", "y"]}],
+    [{"a": []}, {"a": {}}, {"a": ""}, {"a": None}, {"a": []}, {"a": None}],
+    [1, 1.0, True, "1", 0, False, None, 0.0],
+    [{"n": 1}, {"n": True}, {"n": 1.0}, [1], [True], [1.0]],
+    [{"url": "https://example.com", "tags": ["vendor-advisory"]}, {"url": "https://example.com"},
+     {"tags": ["vendor-advisory"], "url": "https://example.com"}],
+]
+
+
+def legacyUnique(items):
+    # the dedup loop record_converter.py used before uniqueList
+    y = []
+    for x in items:
+        if not x in y:
+            y.append(x)
+    return y
+
+
+def assertSameResult(items):
+    expected = legacyUnique(items)
+    result = uniqueList(items)
+    assert result == expected, items
+    assert json.dumps(result) == json.dumps(expected), items
+    assert [id(x) for x in result] == [id(x) for x in expected], items
+
+
+def test_cases():
+    for items in CASES:
+        assertSameResult(items)
+
+
+def test_duplicates_with_other_key_order():
+    items = [{"version": str(v % 5), "status": "affected", "lessThan": str(v % 5 + 1)} for v in range(20)]
+    items += [{"lessThan": str(v % 5 + 1), "status": "affected", "version": str(v % 5)} for v in range(20)]
+    assertSameResult(items)
+    assert len(uniqueList(items)) == 5
+
+
+if __name__ == "__main__":
+    test_cases()
+    test_duplicates_with_other_key_order()
+    print("uniqueList matches the list membership dedup for " + str(len(CASES)) + " cases")
@@ -1,16 +1,16 @@
 from jsonschema import *
-import json
 import sys
+import json_backend
+import schema_cache
 
 jsource = None
 jschema = None
 
 if len(sys.argv) == 3:
   argv = sys.argv  
-  jsource = json.load(open(argv[1])) #'cve502example.json'
-  jschema = json.load(open(argv[2])) #'cve502.schema'
-
-  D7validator = Draft7Validator(jschema)
+  jsource = json_backend.loadFile(argv[1]) #'cve502example.json'
+  # resolves file: $refs relative to the schema and reuses the cached result
+  D7validator = schema_cache.getValidator(argv[2]) #'cve502.schema'
   hasErrors = 0
   for error in sorted(D7validator.iter_errors(jsource), key=str):
     hasErrors += 1
@@ -0,0 +1,162 @@
+"""
+JSON reading and writing for the converter and the validators.
+
+orjson is used when it is installed, otherwise the standard library json
+module. Set CVE_JSON_BACKEND=json to force the standard library.
+
+Inputs are read as bytes (large files through mmap) and handed to the
+parser without decoding them to text first.
+
+dumpCanonical() gives exactly the bytes of
+json.dumps(obj, sort_keys=True, indent=4) with either backend, so existing
+output trees still diff clean. orjson writes 2 space indents and UTF-8,
+which are widened and escaped afterwards (other indents than 2 and 4 use
+the standard library). It also writes floats below 1e-4
+or with an exponent differently ("0.00002", "1e-7"), so the rare document
+with such a float, an integer orjson cannot hold, non-string keys or a
+NaN / Infinity (null in orjson, NaN / Infinity in json.dumps) is written
+by the standard library instead. dumpCompact() is the fast
+non-canonical form: sorted keys, no whitespace, UTF-8.
+"""
+import codecs
+import json
+import math
+import mmap
+import os
+import re
+
+BACKEND = "json"
+orjson = None
+if os.environ.get("CVE_JSON_BACKEND", "orjson") != "json":
+    try:
+        import orjson
+        BACKEND = "orjson"
+    except ImportError:
+        pass
+
+MMAP_THRESHOLD = 1 << 20  # files at least this large are parsed from a memory map
+
+_EXPONENT = re.compile(rb"[eE][-+]?[0-9]")
+_WIDE_INDENT = [b" " * (n * 2) for n in range(256)]  # 2 space indent of n levels, doubled
+
+
+def _escapeNonASCII(err):
+    # codec error handler, writes the characters json.dumps escapes with ensure_ascii
+    out = []
+    for ch in err.object[err.start:err.end]:
+        c = ord(ch)
+        if c < 0x10000:
+            out.append("\\u{0:04x}".format(c))
+        else:
+            c -= 0x10000
+            out.append("\\u{0:04x}\\u{1:04x}".format(0xd800 | (c >> 10), 0xdc00 | (c & 0x3ff)))
+    return ("".join(out), err.end)
+
+
+codecs.register_error("cvejsonescape", _escapeNonASCII)
+
+
+def _differentFloat(out):
+    # floats the standard library writes with an exponent, orjson with a different one or none
+    if b"0.0000" in out:
+        return True
+    for m in _EXPONENT.finditer(out):
+        if out[m.start() - 1:m.start()].isdigit():
+            return True
+    return False
+
+
+def _hasNonFinite(obj):
+    # NaN and +-Infinity, which orjson writes as null
+    if isinstance(obj, float):
+        return not math.isfinite(obj)
+    if isinstance(obj, dict):
+        return any(_hasNonFinite(v) for v in obj.values())
+    if isinstance(obj, (list, tuple)):
+        return any(_hasNonFinite(v) for v in obj)
+    return False
+
+
+def _widen(out):
+    # 2 to 4 space indents, only structural newlines are unescaped in orjson output
+    return b"\n".join([_WIDE_INDENT[len(line) - len(text)] + text
+                       for line in out.split(b"\n") for text in (line.lstrip(b" "),)])
+
+
+def loads(data):
+    """
+    :param data: JSON document as bytes, bytearray, memoryview or str
+    :return: the parsed document
+    """
+    if orjson:
+        return orjson.loads(data)
+    if isinstance(data, memoryview):
+        data = data.tobytes()
+    return json.loads(data)
+
+
+def loadFile(path):
+    """
+    :param path: JSON file
+    :return: the parsed document
+    :raises: OSError, or ValueError if the file is not valid JSON
+    """
+    with open(path, "rb") as f:
+        if orjson and os.fstat(f.fileno()).st_size >= MMAP_THRESHOLD:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                with memoryview(mm) as view:
+                    return orjson.loads(view)
+        return loads(f.read())
+
+
+def _orjsonCanonical(obj, indent):
+    # orjson output made equal to json.dumps, None where the standard library has to write it
+    if indent not in (None, 2, 4):
+        return None
+    try:
+        out = orjson.dumps(obj, option=orjson.OPT_SORT_KEYS | (0 if indent is None else orjson.OPT_INDENT_2))
+    except TypeError:
+        return None
+    if _differentFloat(out) or b"null" in out and _hasNonFinite(obj):
+        return None
+    if indent == 4:
+        try:
+            out = _widen(out)
+        except IndexError:
+            # nested deeper than the indent table
+            return None
+    if b"\x7f" in out:
+        out = out.replace(b"\x7f", b"\\u007f")
+    if not out.isascii():
+        out = out.decode("utf-8").encode("ascii", "cvejsonescape")
+    return out
+
+
+def dumpCanonical(obj, indent=4):
+    """
+    :param obj: document to write
+    :param indent: spaces per level, None for a single line with separators (',', ':')
+    :return: UTF-8 bytes equal to json.dumps(obj, sort_keys=True, indent=indent)
+    """
+    if orjson:
+        out = _orjsonCanonical(obj, indent)
+        if out is not None:
+            return out
+    if indent is not None:
+        return json.dumps(obj, sort_keys=True, indent=indent).encode("ascii")
+    return json.dumps(obj, sort_keys=True, separators=(',', ':')).encode("ascii")
+
+
+def dumpCompact(obj):
+    """
+    :param obj: document to write
+    :return: UTF-8 bytes with sorted keys and no whitespace, non-ASCII characters unescaped
+    """
+    if orjson:
+        try:
+            out = orjson.dumps(obj, option=orjson.OPT_SORT_KEYS)
+            if b"null" not in out or not _hasNonFinite(obj):
+                return out
+        except TypeError:
+            pass
+    return json.dumps(obj, sort_keys=True, separators=(',', ':'), ensure_ascii=False).encode("utf-8")
@@ -0,0 +1,215 @@
+"""
+Shared loader for the CVE JSON 5.0 schema and compiled validators.
+
+The CVE schema pulls in the tag and CVSS schemas through relative "file:"
+$refs. Resolving those on every validation is slow and only works when the
+current directory is the schema directory, so the loader inlines them once
+(the same way schema2markmap/schema-bundle.js bundles the schema for ajv),
+keeps one compiled validator per schema path, and persists the resolved
+schema as JSON in a cache that is reused while the source files are unchanged.
+
+Draft 7 validators are compiled further into generated Python checks (see
+schema_codegen.py) whose source is cached next to the resolved schemas.
+Errors still come from jsonschema. Set CVE_SCHEMA_FAST_VALIDATOR=0 to
+validate with jsonschema alone.
+
+The cache directory is per user, $XDG_CACHE_HOME/cve_schema or
+~/.cache/cve_schema, and can be moved with the CVE_SCHEMA_CACHE_DIR
+environment variable. It is created private (0700); a directory or cache
+file owned by another user or writable by group or others is not used.
+"""
+import hashlib
+import json
+import os
+import stat
+import tempfile
+
+import jsonschema
+
+import json_backend
+import schema_codegen
+
+SCHEMA_CACHE_VERSION = 3
+FILE_REF_PREFIX = "file:"
+
+_schemas = {}  # resolved schema documents indexed by absolute path
+_validators = {}  # compiled validators indexed by (absolute path, validator class, fast)
+
+
+def getCacheDir():
+    """
+    :return: private cache directory, created when missing, or None when it is not safe to use
+    """
+    cache_dir = os.environ.get("CVE_SCHEMA_CACHE_DIR")
+    if not cache_dir:
+        base = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+        cache_dir = os.path.join(base, "cve_schema")
+    try:
+        os.makedirs(cache_dir, mode=0o700, exist_ok=True)
+        if isPrivate(os.stat(cache_dir)):
+            return cache_dir
+    except OSError:
+        pass
+    print("WARNING: not caching schemas, " + cache_dir + " is not a private directory of this user")
+    return None
+
+
+def isPrivate(st):
+    # cached files are loaded as trusted, so only the current user may have written them
+    if not hasattr(os, "getuid"):
+        return True  # Windows, the default directory is inside the user profile
+    return st.st_uid == os.getuid() and not st.st_mode & (stat.S_IWGRP | stat.S_IWOTH)
+
+
+def fileDigest(path):
+    with open(path, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def resolveSchema(schema_path):
+    """
+    :param schema_path: path to a JSON schema file
+    :return: (schema with every "file:" $ref inlined, list of files it was built from)
+    """
+    schema_path = os.path.abspath(schema_path)
+    with open(schema_path) as f:
+        schema = json.load(f)
+    files = [schema_path]
+    _inlineFileRefs(schema, os.path.dirname(schema_path), "#", files)
+    return schema, files
+
+
+def _escapePointer(key):
+    # RFC 6901 escaping, and % since $ref fragments are unquoted when resolved
+    return key.replace("~", "~0").replace("/", "~1").replace("%", "%25")
+
+
+def _inlineFileRefs(node, base_dir, pointer, files):
+    if isinstance(node, dict):
+        for k in list(node):
+            v = node[k]
+            if isinstance(v, dict) and isinstance(v.get("$ref"), str) and v["$ref"].startswith(FILE_REF_PREFIX):
+                node[k] = _loadFileRef(v["$ref"], base_dir, pointer + "/" + _escapePointer(k), files)
+            else:
+                _inlineFileRefs(v, base_dir, pointer + "/" + _escapePointer(k), files)
+    elif isinstance(node, list):
+        for i, v in enumerate(node):
+            if isinstance(v, dict) and isinstance(v.get("$ref"), str) and v["$ref"].startswith(FILE_REF_PREFIX):
+                node[i] = _loadFileRef(v["$ref"], base_dir, pointer + "/" + str(i), files)
+            else:
+                _inlineFileRefs(v, base_dir, pointer + "/" + str(i), files)
+
+
+def _loadFileRef(ref, base_dir, pointer, files):
+    ref_path = os.path.normpath(os.path.join(base_dir, ref[len(FILE_REF_PREFIX):]))
+    with open(ref_path) as f:
+        sub = json.load(f)
+    if ref_path not in files:
+        files.append(ref_path)
+    # drop the imported document's own id so it does not change the base URI,
+    # then point its local refs at the place it now lives in the bundle
+    sub.pop("$id", None)
+    sub.pop("id", None)
+    _rebaseLocalRefs(sub, pointer)
+    _inlineFileRefs(sub, os.path.dirname(ref_path), pointer, files)
+    return sub
+
+
+def _rebaseLocalRefs(node, pointer):
+    if isinstance(node, dict):
+        ref = node.get("$ref")
+        if isinstance(ref, str) and ref.startswith("#"):
+            node["$ref"] = pointer + ref[1:]
+        for v in node.values():
+            _rebaseLocalRefs(v, pointer)
+    elif isinstance(node, list):
+        for v in node:
+            _rebaseLocalRefs(v, pointer)
+
+
+def _cachePath(cache_dir, schema_path):
+    key = hashlib.sha256(schema_path.encode("utf-8")).hexdigest()[:32]
+    return os.path.join(cache_dir, key + ".json")
+
+
+def _cacheIsCurrent(entry):
+    if entry.get("version") != SCHEMA_CACHE_VERSION:
+        return False
+    for path, (mtime, digest) in entry["files"].items():
+        try:
+            if os.stat(path).st_mtime_ns != mtime and fileDigest(path) != digest:
+                return False
+        except OSError:
+            return False
+    return True
+
+
+def loadSchema(schema_path, use_cache=True):
+    """
+    :param schema_path: path to a JSON schema file
+    :param use_cache: read and refresh the on-disk resolved schema cache
+    :return: resolved schema document, shared between callers - do not modify
+    """
+    schema_path = os.path.abspath(schema_path)
+    if schema_path in _schemas:
+        return _schemas[schema_path]
+
+    schema = None
+    cache_dir = getCacheDir() if use_cache else None
+    if cache_dir:
+        cache_file = _cachePath(cache_dir, schema_path)
+        try:
+            with open(cache_file, "rb") as f:
+                if isPrivate(os.fstat(f.fileno())):
+                    entry = json_backend.loads(f.read())
+                    if entry.get("path") == schema_path and _cacheIsCurrent(entry):
+                        schema = entry["schema"]
+        except Exception:
+            schema = None
+
+    if schema is None:
+        schema, files = resolveSchema(schema_path)
+        if cache_dir:
+            entry = {
+                "version": SCHEMA_CACHE_VERSION,
+                "path": schema_path,
+                "files": {p: (os.stat(p).st_mtime_ns, fileDigest(p)) for p in files},
+                "schema": schema
+            }
+            try:
+                # write then rename, parallel workers may refresh the cache at the same time
+                fd, tmp = tempfile.mkstemp(dir=cache_dir)
+                with os.fdopen(fd, "wb") as f:
+                    f.write(json_backend.dumpCompact(entry))
+                os.replace(tmp, cache_file)
+            except OSError:
+                pass
+
+    _schemas[schema_path] = schema
+    return schema
+
+
+def useFastValidator():
+    return os.environ.get("CVE_SCHEMA_FAST_VALIDATOR", "1") != "0"
+
+
+def getValidator(schema_path, validator_class=jsonschema.Draft7Validator, fast=None):
+    """
+    :param schema_path: path to a JSON schema file
+    :param validator_class: jsonschema validator class to compile with
+    :param fast: check records with code generated from the schema, defaults to useFastValidator()
+    :return: memoized validator for the resolved schema
+    """
+    if fast is None:
+        fast = useFastValidator()
+    key = (os.path.abspath(schema_path), validator_class, fast)
+    if key not in _validators:
+        validator = validator_class(loadSchema(schema_path))
+        if fast:
+            try:
+                validator = schema_codegen.compileValidator(validator, getCacheDir())
+            except schema_codegen.UnsupportedSchema:
+                # e.g. another draft or remote $refs, jsonschema validates alone
+                pass
+        _validators[key] = validator
+    return _validators[key]
@@ -0,0 +1,469 @@
+"""
+Code generated validators for Draft 7 JSON schemas.
+
+jsonschema validates by walking the schema for every record: each keyword
+is looked up, dispatched through a generator and wrapped in error objects,
+even when the record is valid. Like ajv, this module instead compiles a
+resolved schema (see schema_cache.loadSchema) once into plain Python, one
+function per subschema, each a straight run of isinstance, len, set and
+regex checks returning True or False.
+
+The generated code only decides validity. A record it rejects is run
+through the jsonschema validator it was built from, so error objects
+(path, validator keyword, message, context) are exactly those of
+jsonschema. Valid records, the bulk of any corpus, never reach the tree
+walker.
+
+Generated sources are cached as validator_<schema hash>.py in the schema
+cache directory and reused by every process validating against the same
+schema content. A cached source is only compiled when it is owned by the
+current user and not writable by group or others.
+"""
+import hashlib
+import json
+import numbers
+import os
+import re
+import stat
+import tempfile
+import urllib.parse
+
+import jsonschema
+
+CODEGEN_VERSION = 1
+
+TYPE_CHECKS = {
+    "array": "isinstance({x}, list)",
+    "boolean": "isinstance({x}, bool)",
+    # Draft 4 and later count 1.0 as an integer
+    "integer": "(isinstance({x}, int) and not isinstance({x}, bool) or isinstance({x}, float) and {x}.is_integer())",
+    "null": "{x} is None",
+    "number": "(isinstance({x}, _Number) and not isinstance({x}, bool))",
+    "object": "isinstance({x}, dict)",
+    "string": "isinstance({x}, str)",
+}
+OBJECT_KEYWORDS = ["required", "minProperties", "maxProperties", "properties", "patternProperties",
+                   "additionalProperties", "dependencies", "propertyNames"]
+ARRAY_KEYWORDS = ["minItems", "maxItems", "items", "additionalItems", "uniqueItems", "contains"]
+STRING_KEYWORDS = ["minLength", "maxLength", "pattern"]
+NUMBER_KEYWORDS = ["minimum", "maximum", "exclusiveMinimum", "exclusiveMaximum", "multipleOf"]
+# keywords without a fast path, checked by the jsonschema keyword function
+DELEGATED_KEYWORDS = ["multipleOf", "format"]
+
+
+class UnsupportedSchema(Exception):
+    pass
+
+
+def schemaDigest(schema, formats=False):
+    """
+    :param schema: resolved schema document
+    :param formats: whether "format" is checked
+    :return: hex digest naming the generated source for this schema
+    """
+    h = hashlib.sha256()
+    h.update(("codegen-" + str(CODEGEN_VERSION) + "-formats-" + str(bool(formats)) + "\n").encode("utf-8"))
+    h.update(json.dumps(schema, sort_keys=True, separators=(',', ':')).encode("utf-8"))
+    return h.hexdigest()
+
+
+def _pointerNode(root, pointer):
+    # JSON pointer below root, e.g. "/definitions/cveId"
+    node = root
+    for part in pointer.split("/")[1:]:
+        part = urllib.parse.unquote(part).replace("~1", "/").replace("~0", "~")
+        node = node[int(part)] if isinstance(node, list) else node[part]
+    return node
+
+
+def _escapePointer(key):
+    # % too, pointers are unquoted when resolved like $ref fragments
+    return str(key).replace("~", "~0").replace("/", "~1").replace("%", "%25")
+
+
+class _Generator:
+    def __init__(self, root, formats):
+        self.root = root
+        self.formats = formats
+        self.lines = []
+        self.constants = []
+        self.functions = {}  # id(subschema) -> function name
+        self.pending = []
+        self.keep = []  # subschemas named in self.functions, kept alive so ids stay unique
+
+    def constant(self, prefix, expression):
+        name = "_" + prefix + str(len(self.constants))
+        self.constants.append(name + " = " + expression)
+        return name
+
+    def resolve(self, node, pointer, seen=()):
+        # a $ref replaces the whole subschema in Draft 7, siblings are ignored
+        while isinstance(node, dict) and "$ref" in node:
+            ref = node["$ref"]
+            if not isinstance(ref, str) or not ref.startswith("#"):
+                raise UnsupportedSchema("non local $ref " + str(ref) + " at " + pointer)
+            if ref in seen:
+                raise UnsupportedSchema("$ref loop through " + ref)
+            seen = seen + (ref,)
+            pointer = ref
+            try:
+                node = _pointerNode(self.root, ref[1:])
+            except (KeyError, IndexError, ValueError):
+                raise UnsupportedSchema("unresolvable $ref " + ref)
+        return node, pointer
+
+    def function(self, node, pointer):
+        """
+        :return: name of the function validating node, generated later
+        """
+        node, pointer = self.resolve(node, pointer)
+        if node is True or (isinstance(node, dict) and not self.checked(node)):
+            return "_valid"
+        if node is False:
+            return "_invalid"
+        if not isinstance(node, dict):
+            raise UnsupportedSchema("schema at " + pointer + " is not an object")
+        if id(node) not in self.functions:
+            self.functions[id(node)] = "_v" + str(len(self.functions))
+            self.keep.append(node)
+            self.pending.append((node, pointer))
+        return self.functions[id(node)]
+
+    def checked(self, node):
+        # keywords of node that validate anything
+        keywords = [k for k in node if k in jsonschema.Draft7Validator.VALIDATORS]
+        if not self.formats:
+            keywords = [k for k in keywords if k != "format"]
+        return keywords
+
+    def generate(self):
+        check = self.function(self.root, "#")
+        while self.pending:
+            node, pointer = self.pending.pop(0)
+            self.body(node, pointer)
+        header = [
+            "# generated by schema_codegen.py version " + str(CODEGEN_VERSION) + ", do not edit",
+            "",
+        ]
+        return "\n".join(header + self.constants + [""] + self.lines + ["", "check = " + check, ""])
+
+    def emit(self, indent, line):
+        self.lines.append("    " * indent + line)
+
+    def body(self, node, pointer):
+        if node is not self.root and "$id" in node:
+            # a nested id changes how $refs below it resolve
+            raise UnsupportedSchema("nested $id at " + pointer)
+        self.emit(0, "")
+        self.emit(0, "def " + self.functions[id(node)] + "(x):")
+        self.emit(1, "# " + pointer)
+        keywords = set(self.checked(node))
+
+        known = None
+        if "type" in node:
+            types = node["type"] if isinstance(node["type"], list) else [node["type"]]
+            if any(t not in TYPE_CHECKS for t in types):
+                raise UnsupportedSchema("unknown type " + str(types) + " at " + pointer)
+            self.emit(1, "if not (" + " or ".join(TYPE_CHECKS[t].format(x="x") for t in types) + "):")
+            self.emit(2, "return False")
+            if len(types) == 1:
+                known = types[0]
+
+        node_ref = None
+        if keywords & set(DELEGATED_KEYWORDS) or self.needsNode(node):
+            node_ref = self.constant("S", "_node(" + repr(pointer[1:]) + ")")
+
+        self.generic(node, pointer, keywords, node_ref)
+        for kind, names, method in (("object", OBJECT_KEYWORDS, self.objectKeywords),
+                                    ("array", ARRAY_KEYWORDS, self.arrayKeywords),
+                                    ("string", STRING_KEYWORDS, self.stringKeywords),
+                                    ("number", NUMBER_KEYWORDS, self.numberKeywords)):
+            if not keywords & set(names):
+                continue
+            if known == kind or (kind == "number" and known == "integer"):
+                method(node, pointer, 1, node_ref)
+            elif known is None:
+                self.emit(1, "if " + TYPE_CHECKS[kind].format(x="x") + ":")
+                mark = len(self.lines)
+                method(node, pointer, 2, node_ref)
+                if len(self.lines) == mark:
+                    self.emit(2, "pass")
+            # a known type of another kind makes these keywords no-ops
+        self.emit(1, "return True")
+
+    def needsNode(self, node):
+        # enum, const and uniqueItems fall back to jsonschema for anything but strings
+        if "enum" in node and not all(isinstance(e, str) for e in node["enum"]):
+            return True
+        if "const" in node and not isinstance(node["const"], str):
+            return True
+        return node.get("uniqueItems") is True
+
+    def generic(self, node, pointer, keywords, node_ref):
+        if "enum" in keywords:
+            if all(isinstance(e, str) for e in node["enum"]):
+                values = self.constant("E", "frozenset(" + repr(sorted(set(node["enum"]))) + ")")
+                self.emit(1, "if not (isinstance(x, str) and x in " + values + "):")
+            else:
+                self.emit(1, "if _fails('enum', " + node_ref + ", x):")
+            self.emit(2, "return False")
+        if "const" in keywords:
+            if isinstance(node["const"], str):
+                self.emit(1, "if not (isinstance(x, str) and x == " + repr(node["const"]) + "):")
+            else:
+                self.emit(1, "if _fails('const', " + node_ref + ", x):")
+            self.emit(2, "return False")
+        if "format" in keywords:
+            self.emit(1, "if _fails('format', " + node_ref + ", x):")
+            self.emit(2, "return False")
+        if "allOf" in keywords:
+            for i, sub in enumerate(node["allOf"]):
+                self.emit(1, "if not " + self.function(sub, pointer + "/allOf/" + str(i)) + "(x):")
+                self.emit(2, "return False")
+        if "anyOf" in keywords:
+            calls = [self.function(sub, pointer + "/anyOf/" + str(i)) + "(x)" for i, sub in enumerate(node["anyOf"])]
+            self.emit(1, "if not (" + " or ".join(calls) + "):")
+            self.emit(2, "return False")
+        if "oneOf" in keywords:
+            calls = [self.function(sub, pointer + "/oneOf/" + str(i)) + "(x)" for i, sub in enumerate(node["oneOf"])]
+            self.emit(1, "if " + " + ".join(calls) + " != 1:")
+            self.emit(2, "return False")
+        if "not" in keywords:
+            self.emit(1, "if " + self.function(node["not"], pointer + "/not") + "(x):")
+            self.emit(2, "return False")
+        if "if" in keywords:
+            self.emit(1, "if " + self.function(node["if"], pointer + "/if") + "(x):")
+            if "then" in node:
+                self.emit(2, "if not " + self.function(node["then"], pointer + "/then") + "(x):")
+                self.emit(3, "return False")
+            else:
+                self.emit(2, "pass")
+            if "else" in node:
+                self.emit(1, "elif not " + self.function(node["else"], pointer + "/else") + "(x):")
+                self.emit(2, "return False")
+
+    def objectKeywords(self, node, pointer, indent, node_ref):
+        for name in node.get("required", []):
+            self.emit(indent, "if " + repr(name) + " not in x:")
+            self.emit(indent + 1, "return False")
+        if "minProperties" in node:
+            self.emit(indent, "if len(x) < " + repr(node["minProperties"]) + ":")
+            self.emit(indent + 1, "return False")
+        if "maxProperties" in node:
+            self.emit(indent, "if len(x) > " + repr(node["maxProperties"]) + ":")
+            self.emit(indent + 1, "return False")
+        for name, sub in node.get("properties", {}).items():
+            fn = self.function(sub, pointer + "/properties/" + _escapePointer(name))
+            if fn != "_valid":
+                self.emit(indent, "if " + repr(name) + " in x and not " + fn + "(x[" + repr(name) + "]):")
+                self.emit(indent + 1, "return False")
+        for pattern, sub in node.get("patternProperties", {}).items():
+            fn = self.function(sub, pointer + "/patternProperties/" + _escapePointer(pattern))
+            if fn != "_valid":
+                regex = self.constant("R", "_re.compile(" + repr(pattern) + ")")
+                self.emit(indent, "for k, v in x.items():")
+                self.emit(indent + 1, "if " + regex + ".search(k) and not " + fn + "(v):")
+                self.emit(indent + 2, "return False")
+        if "additionalProperties" in node:
+            self.additionalProperties(node, pointer, indent)
+        for name, dependency in node.get("dependencies", {}).items():
+            if isinstance(dependency, list):
+                test = " and ".join(repr(d) + " in x" for d in dependency) or "True"
+                self.emit(indent, "if " + repr(name) + " in x and not (" + test + "):")
+            else:
+                fn = self.function(dependency, pointer + "/dependencies/" + _escapePointer(name))
+                self.emit(indent, "if " + repr(name) + " in x and not " + fn + "(x):")
+            self.emit(indent + 1, "return False")
+        if "propertyNames" in node:
+            fn = self.function(node["propertyNames"], pointer + "/propertyNames")
+            if fn != "_valid":
+                self.emit(indent, "for k in x:")
+                self.emit(indent + 1, "if not " + fn + "(k):")
+                self.emit(indent + 2, "return False")
+
+    def additionalProperties(self, node, pointer, indent):
+        aP = node["additionalProperties"]
+        if aP is True:
+            return
+        # the same test as jsonschema's find_additional_properties
+        known = self.constant("P", "frozenset(" + repr(sorted(node.get("properties", {}))) + ")")
+        test = "k not in " + known
+        if node.get("patternProperties"):
+            regex = self.constant("R", "_re.compile(" + repr("|".join(node["patternProperties"])) + ")")
+            test += " and not " + regex + ".search(k)"
+        if isinstance(aP, dict):
+            fn = self.function(aP, pointer + "/additionalProperties")
+            if fn == "_valid":
+                return
+            self.emit(indent, "for k, v in x.items():")
+            self.emit(indent + 1, "if " + test + " and not " + fn + "(v):")
+        else:
+            self.emit(indent, "for k in x:")
+            self.emit(indent + 1, "if " + test + ":")
+        self.emit(indent + 2, "return False")
+
+    def arrayKeywords(self, node, pointer, indent, node_ref):
+        if "minItems" in node:
+            self.emit(indent, "if len(x) < " + repr(node["minItems"]) + ":")
+            self.emit(indent + 1, "return False")
+        if "maxItems" in node:
+            self.emit(indent, "if len(x) > " + repr(node["maxItems"]) + ":")
+            self.emit(indent + 1, "return False")
+        items = node.get("items", {})
+        if isinstance(items, list):
+            for i, sub in enumerate(items):
+                fn = self.function(sub, pointer + "/items/" + str(i))
+                if fn != "_valid":
+                    self.emit(indent, "if len(x) > " + str(i) + " and not " + fn + "(x[" + str(i) + "]):")
+                    self.emit(indent + 1, "return False")
+            aI = node.get("additionalItems", True)
+            if aI is False:
+                self.emit(indent, "if len(x) > " + str(len(items)) + ":")
+                self.emit(indent + 1, "return False")
+            elif isinstance(aI, dict):
+                fn = self.function(aI, pointer + "/additionalItems")
+                if fn != "_valid":
+                    self.emit(indent, "for v in x[" + str(len(items)) + ":]:")
+                    self.emit(indent + 1, "if not " + fn + "(v):")
+                    self.emit(indent + 2, "return False")
+        else:
+            if not isinstance(items, dict) and "additionalItems" in node:
+                raise UnsupportedSchema("additionalItems with boolean items at " + pointer)
+            fn = self.function(items, pointer + "/items")
+            if fn != "_valid":
+                self.emit(indent, "for v in x:")
+                self.emit(indent + 1, "if not " + fn + "(v):")
+                self.emit(indent + 2, "return False")
+        if node.get("uniqueItems") is True:
+            self.emit(indent, "if not _unique(x, " + node_ref + "):")
+            self.emit(indent + 1, "return False")
+        if "contains" in node:
+            fn = self.function(node["contains"], pointer + "/contains")
+            self.emit(indent, "if not any(" + fn + "(v) for v in x):")
+            self.emit(indent + 1, "return False")
+
+    def stringKeywords(self, node, pointer, indent, node_ref):
+        if "minLength" in node:
+            self.emit(indent, "if len(x) < " + repr(node["minLength"]) + ":")
+            self.emit(indent + 1, "return False")
+        if "maxLength" in node:
+            self.emit(indent, "if len(x) > " + repr(node["maxLength"]) + ":")
+            self.emit(indent + 1, "return False")
+        if "pattern" in node:
+            regex = self.constant("R", "_re.compile(" + repr(node["pattern"]) + ")")
+            self.emit(indent, "if not " + regex + ".search(x):")
+            self.emit(indent + 1, "return False")
+
+    def numberKeywords(self, node, pointer, indent, node_ref):
+        for keyword, op in (("minimum", "<"), ("maximum", ">"), ("exclusiveMinimum", "<="), ("exclusiveMaximum", ">=")):
+            if keyword in node:
+                self.emit(indent, "if x " + op + " " + repr(node[keyword]) + ":")
+                self.emit(indent + 1, "return False")
+        if "multipleOf" in node:
+            self.emit(indent, "if _fails('multipleOf', " + node_ref + ", x):")
+            self.emit(indent + 1, "return False")
+
+
+def generateSource(schema, formats=False):
+    """
+    :param schema: resolved Draft 7 schema, every $ref local to it
+    :param formats: check "format" (through the validator's format checker)
+    :return: Python source defining check(instance) -> bool
+    """
+    return _Generator(schema, formats).generate()
+
+
+def _writeAtomic(path, data):
+    # write then rename, parallel workers may generate the same file
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path))
+    with os.fdopen(fd, "wb") as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+
+def _readPrivate(path):
+    # the cached source is executed, so only a file the current user wrote is trusted
+    with open(path, "rb") as f:
+        st = os.fstat(f.fileno())
+        if hasattr(os, "getuid") and (st.st_uid != os.getuid() or st.st_mode & (stat.S_IWGRP | stat.S_IWOTH)):
+            raise OSError(path + " is not a private file of this user")
+        return f.read().decode("utf-8")
+
+
+def _cachedCode(schema, formats, cache_dir):
+    path = os.path.join(cache_dir, "validator_" + schemaDigest(schema, formats)[:32] + ".py")
+    try:
+        source = _readPrivate(path)
+    except (OSError, UnicodeDecodeError):
+        source = generateSource(schema, formats)
+        try:
+            _writeAtomic(path, source.encode("utf-8"))
+        except OSError:
+            pass
+    return compile(source, path, "exec")
+
+
+def compileValidator(validator, cache_dir=None):
+    """
+    :param validator: jsonschema Draft7Validator for a resolved schema
+    :param cache_dir: private directory of generated sources (see schema_cache.getCacheDir), not cached when None
+    :return: FastValidator checking with the generated code
+    """
+    if type(validator) is not jsonschema.Draft7Validator:
+        raise UnsupportedSchema("only Draft 7 validators are compiled, not " + type(validator).__name__)
+    schema = validator.schema
+    formats = validator.format_checker is not None
+    if cache_dir:
+        code = _cachedCode(schema, formats, cache_dir)
+    else:
+        code = compile(generateSource(schema, formats), "<schema_codegen>", "exec")
+
+    keywords = jsonschema.Draft7Validator.VALIDATORS
+
+    def _fails(keyword, node, x):
+        return next(iter(keywords[keyword](validator, node[keyword], x, node)), None) is not None
+
+    def _unique(x, node):
+        if all(isinstance(v, str) for v in x):
+            return len(set(x)) == len(x)
+        return not _fails("uniqueItems", node, x)
+
+    namespace = {
+        "_Number": numbers.Number,
+        "_re": re,
+        "_node": lambda pointer: _pointerNode(schema, pointer),
+        "_fails": _fails,
+        "_unique": _unique,
+        "_valid": lambda x: True,
+        "_invalid": lambda x: False,
+    }
+    exec(code, namespace)
+    return FastValidator(validator, namespace["check"])
+
+
+class FastValidator:
+    """
+    Stands in for the jsonschema validator it wraps. Valid records are
+    accepted by the generated check alone, invalid ones get their errors
+    from the wrapped validator.
+    """
+
+    def __init__(self, validator, check):
+        self.validator = validator
+        self.check = check
+        self.schema = validator.schema
+
+    def is_valid(self, instance):
+        return self.check(instance)
+
+    def iter_errors(self, instance):
+        if self.check(instance):
+            return iter(())
+        return self.validator.iter_errors(instance)
+
+    def validate(self, instance):
+        for error in self.iter_errors(instance):
+            raise error
+
+    def __getattr__(self, name):
+        return getattr(self.validator, name)
@@ -0,0 +1,126 @@
+"""
+Benchmark of the empty-value pruning pass (clean_empty) in record_converter.py.
+
+Builds seeded v5 CNA containers shaped like large vendor records: many
+affected products with long version lists, several metrics entries and
+descriptions, with a share of empty strings, empty objects and
+{"lang": "en"} placeholders scattered through them. Each container is
+pruned by
+
+  legacy     the recursive dict rebuild that left lists untouched
+  recursive  the same recursion with lists cleaned too (reference result)
+  current    record_converter.clean_empty
+
+and the current result is checked against the reference.
+
+USAGE python bench_clean_empty.py [--records 50] [--products 40] [--versions 200] [--empty 0.1]
+"""
+import argparse
+import json
+import random
+import sys
+import time
+
+from bench_common import CONVERTER_DIR
+
+sys.path.insert(1, CONVERTER_DIR)
+import record_converter
+
+
+def legacyHasVal(v):
+    return (v != "" and v != {"lang":"en","value":""}
+        and v != {"lang":"en"} and v != [] and v!= {} and v!= [{"lang": "en", "value": ""}]
+        and v!= [{"lang": "en"}])
+
+
+def legacyCleanEmpty(d):
+    if isinstance(d, dict):
+        return {
+            k: v
+            for k, v in ((k, legacyCleanEmpty(v)) for k, v in d.items())
+            if legacyHasVal(v)
+        }
+    if isinstance(d, list):
+        x = [v for v in map(legacyCleanEmpty, d) if legacyHasVal(v)]
+    return d
+
+
+def recursiveCleanEmpty(d):
+    if isinstance(d, dict):
+        return {k: v for k, v in ((k, recursiveCleanEmpty(v)) for k, v in d.items()) if legacyHasVal(v)}
+    if isinstance(d, list):
+        return [v for v in map(recursiveCleanEmpty, d) if legacyHasVal(v)]
+    return d
+
+
+def makeContainer(r, products, versions, empty):
+    def maybe(value):
+        return "" if r.random() < empty else value
+
+    affected = []
+    for p in range(products):
+        vlist = []
+        for v in range(versions):
+            item = {"version": maybe(str(p) + "." + str(v)), "status": "affected", "versionType": maybe("custom")}
+            if r.random() < 0.3:
+                item["lessThan"] = maybe(str(p) + "." + str(v + 1))
+            if r.random() < 0.1:
+                item["changes"] = [{"at": maybe(str(v) + ".1"), "status": "unaffected"}, {}]
+            vlist.append(item)
+        affected.append({
+            "vendor": "vendor" + str(p % 7),
+            "product": maybe("product" + str(p)),
+            "versions": vlist,
+            "platforms": [maybe("linux"), ""] if r.random() < 0.5 else [],
+            "defaultStatus": "unknown"
+        })
+    metrics = []
+    for m in range(6):
+        metrics.append({
+            "cvssV3_1": {"version": "3.1", "vectorString": "CVSS:3.1/AV:N/AC:L/PR:N/UI:N/S:U/C:H/I:H/A:H",
+                         "baseScore": 9.8, "baseSeverity": maybe("CRITICAL"), "attackVector": "NETWORK"},
+            "other": {"type": "unknown", "content": {"text": maybe("n/a"), "extra": {}}},
+            "scenarios": [{"lang": "en", "value": ""}] if r.random() < 0.5 else [{"lang": "en", "value": "GENERAL"}]
+        })
+    return {
+        "title": maybe("title"),
+        "descriptions": [{"lang": "en", "value": maybe("description")}, {"lang": "en"}],
+        "affected": affected,
+        "metrics": metrics,
+        "problemTypes": [{"descriptions": [{"lang": "en", "description": maybe("CWE-79"), "type": "CWE"}]}, {"descriptions": []}],
+        "references": [{"url": "https://example.com/" + str(i), "name": maybe("ref"), "tags": [maybe("x_refsource_MISC")]} for i in range(300)],
+        "x_generator": {}
+    }
+
+
+def timeIt(fn, containers):
+    start = time.perf_counter()
+    results = [fn(c) for c in containers]
+    return time.perf_counter() - start, results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="benchmark clean_empty")
+    parser.add_argument("--records", type=int, default=50)
+    parser.add_argument("--products", type=int, default=40)
+    parser.add_argument("--versions", type=int, default=200)
+    parser.add_argument("--empty", type=float, default=0.1, help="share of values left empty")
+    parser.add_argument("--seed", type=int, default=4)
+    args = parser.parse_args()
+
+    r = random.Random(args.seed)
+    containers = [makeContainer(r, args.products, args.versions, args.empty) for i in range(args.records)]
+    nodes = sum(json.dumps(c).count(":") for c in containers)
+
+    for name, fn in [("legacy", legacyCleanEmpty), ("recursive", recursiveCleanEmpty), ("current", record_converter.clean_empty)]:
+        elapsed, results = timeIt(fn, containers)
+        if name == "recursive":
+            expected = results
+        print('{0:10} {1:8.3f}s  {2:8.1f}ms/record  {3:6.3f}us/value'.format(
+            name, elapsed, elapsed / args.records * 1000, elapsed / nodes * 1e6))
+    if json.dumps(results) != json.dumps(expected):
+        print("WARNING: clean_empty differs from the recursive reference")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+"""
+Shared setup for the converter benchmarks.
+
+cve4to5up.py reads its configuration from a settings module on the import
+path. importConverter() writes one into a work directory, pointing the
+IDR service at a local stub (see idr_stub.py) and the schemas at this
+checkout, and imports the converter from schema/support/CVE_4_to_5_converter.
+"""
+import importlib
+import os
+import sys
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+CONVERTER_DIR = os.path.normpath(os.path.join(BENCH_DIR, "..", "CVE_4_to_5_converter"))
+SCHEMA_FILE = os.path.normpath(os.path.join(BENCH_DIR, "..", "..", "CVE_JSON_5.0_schema.json"))
+
+SETTINGS_TEMPLATE = '''# written by benchmarks/bench_common.py
+AWG_IDR_ENDPOINT_HEALTHCHECK = "/health-check"
+AWG_SERVICE_TIMEOUT = 30
+AWG_IDR_SERVICE_URL = {idrUrl!r}
+AWG_USER_CNA_NAME = "bench"
+AWG_USER_KEY = "bench-key"
+AWG_USER_UUID = "bench-user"
+AWG_USER_NAME = "bench@example.com"
+AWG_USER_ORG_UUID = "bench-org"
+AWG_ORG_SHORT_NAME = "bench"
+v5schemafile = {schema!r}
+v5schemafile_published = {schema!r}
+'''
+
+
+def writeSettings(workdir, idrUrl="http://127.0.0.1:3999/api"):
+    path = os.path.join(workdir, "settings.py")
+    with open(path, "w") as f:
+        f.write(SETTINGS_TEMPLATE.format(idrUrl=idrUrl, schema=SCHEMA_FILE))
+    return path
+
+
+def importConverter(workdir, idrUrl="http://127.0.0.1:3999/api"):
+    """
+    :param workdir: directory for settings.py, created if missing
+    :param idrUrl: IDR service URL written to settings.py
+    :return: the cve4to5up module
+    """
+    os.makedirs(workdir, exist_ok=True)
+    writeSettings(workdir, idrUrl)
+    for p in (workdir, CONVERTER_DIR):
+        if p not in sys.path:
+            sys.path.insert(1, p)
+    return importlib.import_module("cve4to5up")
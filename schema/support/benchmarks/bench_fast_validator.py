@@ -0,0 +1,144 @@
+"""
+Benchmark of the code generated validator (Python3.x_Validator/schema_codegen.py)
+against jsonschema's Draft7Validator on CVE_JSON_5.0_schema.json.
+
+Builds seeded v5 records from schema/docs/advanced-example.json with
+varying numbers of affected products, versions and references, and breaks
+a share of them with one defect each (an unknown property, a missing
+required property, a value outside an enum, a pattern or type mismatch).
+Every record is validated by
+
+  jsonschema  Draft7Validator.iter_errors
+  generated   schema_cache.getValidator, the generated check with
+              jsonschema errors for the records it rejects
+
+and the errors (path, validator keyword, message) of both are compared.
+Also reports the time to generate the validator source and to load it
+from the cache.
+
+USAGE python bench_fast_validator.py [--records 500] [--invalid 0.1] [--products 10] [--versions 20]
+"""
+import argparse
+import copy
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+from bench_common import BENCH_DIR, SCHEMA_FILE
+
+sys.path.insert(1, os.path.join(BENCH_DIR, "..", "Python3.x_Validator"))
+import jsonschema
+import json_backend
+import schema_cache
+import schema_codegen
+
+EXAMPLE_FILE = os.path.normpath(os.path.join(BENCH_DIR, "..", "..", "docs", "advanced-example.json"))
+DEFECTS = ["extra", "missing", "enum", "pattern", "type"]
+
+
+def makeRecord(r, example, i, products, versions):
+    rec = copy.deepcopy(example)
+    rec["cveMetadata"]["cveId"] = "CVE-2021-" + str(10000 + i)
+    cna = rec["containers"]["cna"]
+    template = cna["affected"][0]
+    affected = []
+    for p in range(r.randint(1, products)):
+        a = copy.deepcopy(template)
+        a["product"] = "product" + str(p)
+        a["versions"] = [{"version": str(p) + "." + str(v), "status": r.choice(["affected", "unaffected", "unknown"]),
+                          "lessThan": str(p) + "." + str(v + 1), "versionType": "semver"}
+                         for v in range(r.randint(1, versions))]
+        affected.append(a)
+    cna["affected"] = affected
+    cna["references"] = [{"url": "https://example.org/advisory/" + str(i) + "/" + str(n), "tags": ["vendor-advisory"]}
+                         for n in range(r.randint(1, 30))]
+    return rec
+
+
+def breakRecord(r, rec):
+    defect = r.choice(DEFECTS)
+    cna = rec["containers"]["cna"]
+    if defect == "extra":
+        r.choice(cna["affected"])["vendorName"] = "x"
+    elif defect == "missing":
+        del r.choice(cna["references"])["url"]
+    elif defect == "enum":
+        versions = r.choice(cna["affected"])["versions"]
+        r.choice(versions)["status"] = "fixed"
+    elif defect == "pattern":
+        rec["cveMetadata"]["cveId"] = "CVE-21-1"
+    else:
+        cna["affected"][0]["platforms"] = "Windows"
+    return defect
+
+
+def errorList(validator, rec):
+    return [(e.json_path, e.validator, e.message) for e in sorted(validator.iter_errors(rec), key=lambda e: e.path)]
+
+
+def timeIt(validator, records):
+    start = time.perf_counter()
+    results = [errorList(validator, rec) for rec in records]
+    return time.perf_counter() - start, results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="benchmark the code generated validator")
+    parser.add_argument("--records", type=int, default=500)
+    parser.add_argument("--invalid", type=float, default=0.1, help="share of records with a defect")
+    parser.add_argument("--products", type=int, default=10)
+    parser.add_argument("--versions", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=25)
+    args = parser.parse_args()
+
+    example = json_backend.loadFile(EXAMPLE_FILE)
+    r = random.Random(args.seed)
+    valid = []
+    invalid = []
+    for i in range(args.records):
+        rec = makeRecord(r, example, i, args.products, args.versions)
+        if r.random() < args.invalid:
+            breakRecord(r, rec)
+            invalid.append(rec)
+        else:
+            valid.append(rec)
+
+    schema = schema_cache.loadSchema(SCHEMA_FILE)
+    start = time.perf_counter()
+    source = schema_codegen.generateSource(schema)
+    generateTime = time.perf_counter() - start
+    cacheDir = tempfile.mkdtemp(prefix="bench_fast_validator_")
+    try:
+        start = time.perf_counter()
+        schema_codegen.compileValidator(jsonschema.Draft7Validator(schema), cacheDir)
+        firstTime = time.perf_counter() - start
+        start = time.perf_counter()
+        schema_codegen.compileValidator(jsonschema.Draft7Validator(schema), cacheDir)
+        cachedTime = time.perf_counter() - start
+    finally:
+        shutil.rmtree(cacheDir)
+    print('generated {0} lines: generate {1:.1f}ms, generate and compile {2:.1f}ms, from the cache {3:.1f}ms'.format(
+        source.count("\n"), generateTime * 1000, firstTime * 1000, cachedTime * 1000))
+
+    plain = schema_cache.getValidator(SCHEMA_FILE, fast=False)
+    fast = schema_cache.getValidator(SCHEMA_FILE, fast=True)
+    mismatches = 0
+    for name, records in [("valid", valid), ("invalid", invalid)]:
+        if not records:
+            continue
+        plainTime, expected = timeIt(plain, records)
+        fastTime, results = timeIt(fast, records)
+        mismatches += sum(1 for a, b in zip(expected, results) if a != b)
+        print('{0:8} {1:6d} records  jsonschema {2:8.1f} records/sec  generated {3:9.1f} records/sec  {4:6.1f}x'.format(
+            name, len(records), len(records) / plainTime, len(records) / fastTime, plainTime / fastTime))
+    if sum(1 for rec in valid if not plain.is_valid(rec)):
+        print("WARNING: some records built as valid fail the schema")
+    if mismatches:
+        print("WARNING: " + str(mismatches) + " records with errors differing from jsonschema")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,180 @@
+"""
+Benchmark of the per-record history date derivation in cve4to5up.py.
+
+Writes a seeded synthetic cve_record_dates.json (5M rows by default) and
+times deriving datePublished, dateReserved, dateUpdated and dateRejected
+for a sample of CVE IDs three ways:
+
+  legacy     json.load into a dict of row dicts, strptime on every row per
+             lookup (the converter before history_store.py)
+  index      HistoryStore SQLite index, one query per record returning
+             pre-parsed CVEHistory columns
+  preloaded  HistoryStore.preload(), CVEHistory objects held in memory
+
+Each variant runs in its own process so load time and peak RSS are
+reported separately.
+
+USAGE python bench_history_dates.py [--rows N] [--sample N] [--workdir DIR] [--json FILE]
+"""
+import argparse
+import datetime
+import hashlib
+import json
+import multiprocessing
+import os
+import random
+import resource
+import sys
+import tempfile
+import time
+
+sys.path.insert(1, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "CVE_4_to_5_converter"))
+from history_store import HistoryStore, HTYPE_CODES, fromEpoch
+
+historyDateTimeFormat = '%Y-%m-%d %H:%M:%S.%f'
+MODIFIED = HTYPE_CODES["Modified"]
+REJECTED = HTYPE_CODES["Rejected"]
+
+
+def cveIdFor(i):
+    return "CVE-" + str(1999 + i % 24) + "-" + str(1000 + i // 24)
+
+
+def writeSyntheticHistory(path, rows, seed):
+    # roughly four history rows per CVE, like the production export
+    r = random.Random(seed)
+    cves = max(1, rows // 4)
+    with open(path, "w") as f:
+        f.write("[\n")
+        for n in range(rows):
+            i = r.randrange(cves)
+            row = {
+                "cve_identifier": cveIdFor(i),
+                "reserved_date": "20" + '{0:02d}'.format(r.randint(0, 22)) + "-0" + str(r.randint(1, 9)) + "-" + '{0:02d}'.format(r.randint(1, 28)),
+                "disclosure_date": None,
+                "populated_date": r.choice(["null", "20" + '{0:02d}'.format(r.randint(0, 22)) + "-08-08 05:00:00.000000"]),
+                "history_date": "20" + '{0:02d}'.format(r.randint(0, 22)) + "-12-" + '{0:02d}'.format(r.randint(1, 28)) + " 00:00:00.000000",
+                "HType": r.choice(["Modified", "Modified", "Modified", "Rejected", "Created"])
+            }
+            f.write(("," if n else "") + json.dumps(row) + "\n")
+        f.write("]\n")
+    return cves
+
+
+def legacyDates(recordHistory):
+    today = datetime.datetime.combine(datetime.date.today(), datetime.datetime.min.time())
+    pubDate = datetime.datetime.now()
+    resDate = datetime.datetime.now()
+    lastUpdated = datetime.datetime.min
+    firstRejected = today
+    firstModified = today
+    sawRejected = False
+    for h in recordHistory:
+        if h["populated_date"] != "null":
+            pubDate = min(datetime.datetime.strptime(h["populated_date"], historyDateTimeFormat), pubDate)
+    for h in recordHistory:
+        if h["reserved_date"] != "null":
+            resDate = min(datetime.datetime.strptime(h["reserved_date"], '%Y-%m-%d'), resDate)
+    for h in recordHistory:
+        if h["HType"] == "Modified" or h["HType"] == "Rejected":
+            lastUpdated = max(datetime.datetime.strptime(h["history_date"], historyDateTimeFormat), lastUpdated)
+    for h in recordHistory:
+        hdt = datetime.datetime.strptime(h["history_date"], historyDateTimeFormat)
+        if h["HType"] == "Rejected":
+            firstRejected = min(hdt, firstRejected)
+            sawRejected = True
+        if h["HType"] == "Modified":
+            firstModified = min(hdt, firstModified)
+    return (pubDate, resDate, lastUpdated, firstRejected if sawRejected else firstModified)
+
+
+def indexedDates(recordHistory):
+    today = datetime.datetime.combine(datetime.date.today(), datetime.datetime.min.time())
+    pubDate = datetime.datetime.now()
+    resDate = datetime.datetime.now()
+    populated = recordHistory.minPopulated()
+    if populated is not None:
+        pubDate = min(fromEpoch(populated), pubDate)
+    reserved = recordHistory.minReserved()
+    if reserved is not None:
+        resDate = min(fromEpoch(reserved), resDate)
+    latest = recordHistory.maxHistory((MODIFIED, REJECTED))
+    lastUpdated = fromEpoch(latest) if latest is not None else datetime.datetime.min
+    rejected = recordHistory.minHistory(REJECTED)
+    if rejected is None:
+        rejected = recordHistory.minHistory(MODIFIED)
+    firstRejected = min(fromEpoch(rejected), today) if rejected is not None else today
+    return (pubDate, resDate, lastUpdated, firstRejected)
+
+
+def runVariant(variant, historyPath, sampleIds):
+    start = time.perf_counter()
+    if variant == "legacy":
+        cveHistory = {}
+        with open(historyPath) as f:
+            for ch in json.load(f):
+                if not ch["cve_identifier"] in cveHistory:
+                    cveHistory[ch["cve_identifier"]] = []
+                cveHistory[ch["cve_identifier"]].append(ch)
+        lookup = lambda cveId: legacyDates(cveHistory.get(cveId, []))
+    else:
+        store = HistoryStore(historyPath)
+        if variant == "preloaded":
+            store.preload()
+        lookup = lambda cveId: indexedDates(store.record(cveId))
+    loadTime = time.perf_counter() - start
+
+    start = time.perf_counter()
+    results = [lookup(cveId) for cveId in sampleIds]
+    deriveTime = time.perf_counter() - start
+    return {
+        "variant": variant,
+        "load_seconds": round(loadTime, 3),
+        "us_per_record": round(deriveTime / len(sampleIds) * 1e6, 2),
+        "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        # published and reserved default to now(), so only the other two dates are compared
+        "checksum": hashlib.sha256(repr([r[2:] for r in results]).encode()).hexdigest()
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="benchmark CVE history date derivation")
+    parser.add_argument("--rows", type=int, default=5000000, help="synthetic history rows (default 5M)")
+    parser.add_argument("--sample", type=int, default=100000, help="CVE IDs to derive dates for")
+    parser.add_argument("--seed", type=int, default=4)
+    parser.add_argument("--workdir", default=None, help="keep the synthetic export and index here")
+    parser.add_argument("--variants", default="legacy,index,preloaded")
+    parser.add_argument("--json", default=None, help="also write the results to this file")
+    args = parser.parse_args()
+
+    workdir = args.workdir or tempfile.mkdtemp(prefix="bench_history_")
+    os.makedirs(workdir, exist_ok=True)
+    historyPath = os.path.join(workdir, "cve_record_dates.json")
+    cves = writeSyntheticHistory(historyPath, args.rows, args.seed)
+    # build the index up front so the index variant times lookups, not the one-off build
+    start = time.perf_counter()
+    HistoryStore(historyPath)
+    buildTime = time.perf_counter() - start
+    print("history rows=" + str(args.rows) + " cves=" + str(cves) + " index build=" + '{0:.2f}'.format(buildTime) + "s")
+
+    r = random.Random(args.seed)
+    sampleIds = [cveIdFor(r.randrange(cves)) for i in range(args.sample)]
+
+    results = []
+    ctx = multiprocessing.get_context("spawn")
+    for variant in args.variants.split(","):
+        with ctx.Pool(1) as pool:
+            result = pool.apply(runVariant, (variant, historyPath, sampleIds))
+        results.append(result)
+        print('{variant:10} load={load_seconds:8.3f}s  derive={us_per_record:8.2f}us/record  peak_rss={peak_rss_mb:8.1f}MB'.format(**result))
+
+    checksums = set(res.pop("checksum") for res in results)
+    if len(checksums) > 1:
+        print("WARNING: variants derived different dates")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"rows": args.rows, "sample": args.sample, "index_build_seconds": round(buildTime, 3), "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+"""
+Benchmark of IDR cache-miss lookups against the local IDR stub.
+
+Fetches the same set of CVE IDs one request at a time with a new
+connection per call (the converter before idr_client.py), and through
+IDRClient.fetchCVEIds() at several concurrency limits, with simulated
+service latency and an optional failure rate.
+
+USAGE python bench_idr_client.py [--ids 200] [--latency-ms 50] [--fail-rate 0.0] [--concurrency 1,8,32]
+"""
+import argparse
+import os
+import sys
+import time
+
+import requests
+
+sys.path.insert(1, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "CVE_4_to_5_converter"))
+from idr_client import IDRClient
+from idr_stub import startStub
+
+
+def main():
+    parser = argparse.ArgumentParser(description="benchmark IDR cache-miss lookups")
+    parser.add_argument("--ids", type=int, default=200)
+    parser.add_argument("--latency-ms", type=float, default=50.0)
+    parser.add_argument("--fail-rate", type=float, default=0.0)
+    parser.add_argument("--concurrency", default="1,8,32")
+    args = parser.parse_args()
+
+    server, state = startStub(0, latency=args.latency_ms / 1000.0, failRate=args.fail_rate)
+    baseUrl = "http://127.0.0.1:" + str(server.server_address[1]) + "/api"
+    cveIds = ["CVE-2021-" + str(10000 + i) for i in range(args.ids)]
+
+    if not args.fail_rate:
+        start = time.perf_counter()
+        for cveId in cveIds:
+            requests.get(baseUrl + "/cve-id/" + cveId, timeout=30).json()
+        elapsed = time.perf_counter() - start
+        print('{0:22} {1:8.2f}s  {2:8.1f} ids/s'.format("unpooled serial", elapsed, args.ids / elapsed))
+
+    for concurrency in [int(c) for c in args.concurrency.split(",")]:
+        client = IDRClient(baseUrl, {}, concurrency=concurrency, backoff=0.05, maxBackoff=1.0)
+        state.requests = state.failures = 0
+        start = time.perf_counter()
+        fetched = sum(1 for cveId, data, error in client.fetchCVEIds(cveIds) if data)
+        elapsed = time.perf_counter() - start
+        print('{0:22} {1:8.2f}s  {2:8.1f} ids/s  fetched={3} requests={4} failures={5}'.format(
+            "pooled concurrency=" + str(concurrency), elapsed, args.ids / elapsed, fetched, state.requests, state.failures))
+
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
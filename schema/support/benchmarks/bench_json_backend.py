@@ -0,0 +1,80 @@
+"""
+Benchmark of the JSON backend (Python3.x_Validator/json_backend.py) against
+the standard library calls it replaced.
+
+Writes seeded v5-shaped records (see bench_clean_empty.py) to a temporary
+directory, then times
+
+  load       json.load on a text file vs json_backend.loadFile
+  canonical  json.dumps(sort_keys=True, indent=4) vs json_backend.dumpCanonical
+  compact    json_backend.dumpCompact
+
+and checks that canonical output is byte-identical to the standard library.
+
+USAGE python bench_json_backend.py [--records 200] [--products 10] [--versions 50]
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+from bench_clean_empty import makeContainer
+from bench_common import BENCH_DIR
+
+sys.path.insert(1, os.path.join(BENCH_DIR, "..", "Python3.x_Validator"))
+import json_backend
+
+
+def stdlibLoad(path):
+    with open(path) as f:
+        return json.load(f)
+
+
+def timeIt(fn, items):
+    start = time.perf_counter()
+    results = [fn(i) for i in items]
+    return time.perf_counter() - start, results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="benchmark the JSON backend")
+    parser.add_argument("--records", type=int, default=200)
+    parser.add_argument("--products", type=int, default=10)
+    parser.add_argument("--versions", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=18)
+    args = parser.parse_args()
+
+    r = random.Random(args.seed)
+    records = []
+    for i in range(args.records):
+        c = makeContainer(r, args.products, args.versions, 0.05)
+        c["descriptions"].append({"lang": "de", "value": "Schwachstelle in Gerät " + str(i) + " – überlauf"})
+        records.append({"dataType": "CVE_RECORD", "dataVersion": "5.0", "containers": {"cna": c}})
+    workdir = tempfile.mkdtemp(prefix="bench_json_backend_")
+    paths = []
+    for i, rec in enumerate(records):
+        paths.append(os.path.join(workdir, str(i) + ".json"))
+        with open(paths[-1], "w") as f:
+            f.write(json.dumps(rec, sort_keys=True, indent=4))
+    size = sum(os.path.getsize(p) for p in paths)
+
+    print("backend: " + json_backend.BACKEND + ", " + str(args.records) + " records, " + '{0:.1f}'.format(size / 1e6) + " MB")
+    for name, fn, items in [
+            ("load stdlib", stdlibLoad, paths),
+            ("load", json_backend.loadFile, paths),
+            ("canonical stdlib", lambda o: json.dumps(o, sort_keys=True, indent=4).encode("ascii"), records),
+            ("canonical", json_backend.dumpCanonical, records),
+            ("compact", json_backend.dumpCompact, records)]:
+        elapsed, results = timeIt(fn, items)
+        if name == "canonical stdlib":
+            expected = results
+        elif name == "canonical" and results != expected:
+            print("WARNING: canonical output differs from json.dumps")
+        print('{0:18} {1:8.3f}s  {2:8.1f} MB/s'.format(name, elapsed, size / elapsed / 1e6))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""
+Micro-benchmark of v4 refsource -> v5 reference tag lookups.
+
+Builds seeded synthetic records with hundreds of references each, drawing
+refsources from ref_tag_map.json (in mixed case) plus some that have no
+mapping, and times tagging every reference with the linear casefold scan
+(the converter before the prebuilt index) and with the casefolded dict
+index built by getReferenceTagMap().
+
+USAGE python bench_reference_tags.py [--records 200] [--refs 500] [--unmapped 0.2] [--map FILE]
+"""
+import argparse
+import json
+import os
+import random
+import time
+
+DEFAULT_MAP = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "CVE_4_to_5_converter", "ref_tag_map.json")
+
+
+def linearLookup(referenceTagMap, v4Tag):
+    v4Test = v4Tag.casefold()
+    for tagMap in referenceTagMap["referenceMaps"]:
+        if v4Test == tagMap["v4"].casefold():
+            return tagMap["v5"]
+    return None
+
+
+def buildIndex(referenceTagMap):
+    index = {}
+    for tagMap in referenceTagMap["referenceMaps"]:
+        index.setdefault(tagMap["v4"].casefold(), tagMap["v5"])
+    return index
+
+
+def tagReferences(records, lookup):
+    # the tag assembly of the converter's reference loop
+    unmapped = {}
+    tagged = 0
+    for refs in records:
+        for refsource in refs:
+            tags = []
+            v5Tags = lookup(refsource)
+            if v5Tags:
+                for v5Tag in v5Tags:
+                    if v5Tag not in tags:
+                        tags.append(v5Tag)
+            else:
+                unmapped[refsource] = unmapped.get(refsource, 0) + 1
+            tags.append("x_refsource_" + refsource)
+            tagged += len(tags)
+    return tagged, unmapped
+
+
+def main():
+    parser = argparse.ArgumentParser(description="benchmark reference tag lookups")
+    parser.add_argument("--records", type=int, default=200)
+    parser.add_argument("--refs", type=int, default=500, help="references per record")
+    parser.add_argument("--unmapped", type=float, default=0.2, help="fraction of refsources with no mapping")
+    parser.add_argument("--seed", type=int, default=4)
+    parser.add_argument("--map", default=DEFAULT_MAP)
+    args = parser.parse_args()
+
+    with open(args.map) as f:
+        referenceTagMap = json.load(f)
+    r = random.Random(args.seed)
+    known = [m["v4"] for m in referenceTagMap["referenceMaps"]]
+    unknown = ["CONFIRM", "MISC", "VENDOR-ADVISORY-X", "GITHUB-ISSUE"]
+    records = []
+    for i in range(args.records):
+        refs = []
+        for j in range(args.refs):
+            if r.random() < args.unmapped:
+                refs.append(r.choice(unknown))
+            else:
+                v4 = r.choice(known)
+                refs.append(v4.lower() if r.random() < 0.1 else v4)
+        records.append(refs)
+    total = args.records * args.refs
+
+    start = time.perf_counter()
+    legacy = tagReferences(records, lambda tag: linearLookup(referenceTagMap, tag))
+    legacyTime = time.perf_counter() - start
+
+    start = time.perf_counter()
+    index = buildIndex(referenceTagMap)
+    buildTime = time.perf_counter() - start
+    start = time.perf_counter()
+    indexed = tagReferences(records, lambda tag: index.get(tag.casefold()))
+    indexTime = time.perf_counter() - start
+
+    if legacy != indexed:
+        print("WARNING: lookups disagree")
+    print("references=" + str(total) + " map entries=" + str(len(known)) + " index build=" + '{0:.1f}'.format(buildTime * 1e6) + "us")
+    print('{0:10} {1:8.3f}us/reference'.format("linear", legacyTime / total * 1e6))
+    print('{0:10} {1:8.3f}us/reference'.format("index", indexTime / total * 1e6))
+    print("unmapped refsources: " + ", ".join(k + "=" + str(v) for k, v in sorted(indexed[1].items())))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,242 @@
+"""
+End-to-end benchmark suite for the converter and the validators.
+
+Writes a seeded synthetic v4 corpus (see v4_corpus.py), starts the local
+IDR stub (idr_stub.py) and times
+
+  convert        cve4to5up.py -d over the corpus, as the nightly job runs it
+  validate       Draft 7 validation of every converted record against
+                 CVE_JSON_5.0_schema.json, in one process, with the generated
+                 validator unless CVE_SCHEMA_FAST_VALIDATOR=0
+  cmdline        tools/cmdlinejsonvalidator.py --schema over the converted records
+  d7validator    Python3.x_Validator/D7Validator.py, one process per record
+                 for a sample of records
+
+Every benchmark runs in its own process and reports records/sec and peak
+RSS, keeping the fastest of --repeat runs. Results are saved as JSON in the
+results directory and compared with the previous results file there (or
+--baseline); a drop in records/sec or a rise in peak RSS beyond
+--tolerance is reported as a regression.
+
+USAGE python bench_suite.py [--records 2000] [--seed 20] [--workers 1] [--repeat 1] [--only convert,validate]
+                            [--results-dir DIR] [--baseline FILE] [--tolerance 0.10] [--fail-on-regression]
+"""
+import argparse
+import datetime
+import glob
+import json
+import multiprocessing
+import os
+import platform
+import re
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+from bench_common import BENCH_DIR, CONVERTER_DIR, SCHEMA_FILE, writeSettings
+from idr_stub import startStub
+from v4_corpus import writeCorpus
+
+VALIDATOR_DIR = os.path.normpath(os.path.join(BENCH_DIR, "..", "Python3.x_Validator"))
+CMDLINE_VALIDATOR = os.path.normpath(os.path.join(BENCH_DIR, "..", "..", "..", "tools", "cmdlinejsonvalidator.py"))
+BENCHMARKS = ["convert", "validate", "cmdline", "d7validator"]
+
+
+def runCommand(cmd, cwd, logPath, env=None):
+    # (seconds, exit status, peak RSS in MB) of one child process
+    with open(logPath, "w") as log:
+        start = time.perf_counter()
+        proc = subprocess.Popen(cmd, cwd=cwd, env=env, stdout=log, stderr=subprocess.STDOUT)
+        pid, status, usage = os.wait4(proc.pid, 0)
+        elapsed = time.perf_counter() - start
+    proc.returncode = os.waitstatus_to_exitcode(status)
+    return elapsed, proc.returncode, usage.ru_maxrss / 1024
+
+
+def result(name, records, seconds, peakRSS, **extra):
+    r = {
+        "name": name,
+        "records": records,
+        "seconds": round(seconds, 3),
+        "records_per_sec": round(records / seconds, 1) if seconds else 0.0,
+        "peak_rss_mb": round(peakRSS, 1)
+    }
+    r.update(extra)
+    return r
+
+
+def benchConvert(workdir, records, workers):
+    env = dict(os.environ, PYTHONPATH=workdir)
+    cmd = [sys.executable, os.path.join(CONVERTER_DIR, "cve4to5up.py"), "-d", "cvelist", "-o", "out", "-w", str(workers)]
+    logPath = os.path.join(workdir, "convert.log")
+    seconds, status, peakRSS = runCommand(cmd, workdir, logPath, env)
+    # the converter reports the time spent converting, without start up and the job report
+    with open(logPath) as f:
+        m = re.search(r"^Processin time was: ([0-9.]+) seconds", f.read(), re.MULTILINE)
+    converting = float(m.group(1)) if m else None
+    return result("convert", records, seconds, peakRSS, exit=status, workers=workers,
+                  converting_records_per_sec=round(records / converting, 1) if converting else None)
+
+
+def validateRecords(paths, schemaPath):
+    # runs in a spawned process, so RSS is the validator's alone
+    sys.path.insert(1, VALIDATOR_DIR)
+    import json_backend
+    import schema_cache
+    start = time.perf_counter()
+    validator = schema_cache.getValidator(schemaPath)
+    invalid = 0
+    for path in paths:
+        for error in validator.iter_errors(json_backend.loadFile(path)):
+            invalid += 1
+            break
+    return time.perf_counter() - start, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, invalid
+
+
+def benchValidate(paths):
+    with multiprocessing.get_context("spawn").Pool(1) as pool:
+        seconds, peakRSS, invalid = pool.apply(validateRecords, (paths, SCHEMA_FILE))
+    return result("validate", len(paths), seconds, peakRSS, invalid=invalid)
+
+
+def benchCmdline(workdir, paths, workers):
+    cmd = [sys.executable, CMDLINE_VALIDATOR, "--schema", SCHEMA_FILE, "--workers", str(workers), "out"]
+    seconds, status, peakRSS = runCommand(cmd, workdir, os.path.join(workdir, "cmdline.log"))
+    return result("cmdline", len(paths), seconds, peakRSS, exit=status, workers=workers)
+
+
+def benchD7Validator(workdir, paths, sample):
+    # one process per record, so this mostly measures start up and schema loading
+    paths = paths[:sample]
+    seconds = 0.0
+    peakRSS = 0.0
+    for path in paths:
+        cmd = [sys.executable, os.path.join(VALIDATOR_DIR, "D7Validator.py"), path, SCHEMA_FILE]
+        s, status, rss = runCommand(cmd, workdir, os.path.join(workdir, "d7validator.log"))
+        seconds += s
+        peakRSS = max(peakRSS, rss)
+    return result("d7validator", len(paths), seconds, peakRSS)
+
+
+def fastest(repeat, bench, *args):
+    # best of repeat runs, peak RSS is the highest seen
+    runs = [bench(*args) for i in range(max(1, repeat))]
+    best = max(runs, key=lambda r: r["records_per_sec"])
+    best["peak_rss_mb"] = max(r["peak_rss_mb"] for r in runs)
+    best["runs"] = len(runs)
+    return best
+
+
+def gitCommit():
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], cwd=BENCH_DIR, capture_output=True, text=True).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def latestResults(resultsDir):
+    files = sorted(glob.glob(os.path.join(resultsDir, "*.json")))
+    return files[-1] if files else None
+
+
+def compare(results, baselinePath, tolerance):
+    """
+    :param results: results of this run
+    :param baselinePath: earlier results file
+    :param tolerance: allowed relative change, e.g. 0.10
+    :return: list of regression messages
+    """
+    with open(baselinePath) as f:
+        baseline = {r["name"]: r for r in json.load(f)["results"]}
+    regressions = []
+    print("")
+    print("Compared with " + baselinePath)
+    for r in results:
+        b = baseline.get(r["name"])
+        if not b or b["records"] != r["records"]:
+            print('{0:12} no comparable baseline'.format(r["name"]))
+            continue
+        rate = r["records_per_sec"] / b["records_per_sec"] - 1 if b["records_per_sec"] else 0.0
+        rss = r["peak_rss_mb"] / b["peak_rss_mb"] - 1 if b["peak_rss_mb"] else 0.0
+        print('{0:12} records/sec {1:+7.1%}  peak RSS {2:+7.1%}'.format(r["name"], rate, rss))
+        if rate < -tolerance:
+            regressions.append(r["name"] + ": records/sec " + '{0:.1f}'.format(b["records_per_sec"]) + " -> " + '{0:.1f}'.format(r["records_per_sec"]))
+        if rss > tolerance:
+            regressions.append(r["name"] + ": peak RSS " + '{0:.1f}'.format(b["peak_rss_mb"]) + "MB -> " + '{0:.1f}'.format(r["peak_rss_mb"]) + "MB")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="converter and validator benchmark suite")
+    parser.add_argument("--records", type=int, default=2000, help="synthetic v4 records")
+    parser.add_argument("--seed", type=int, default=20)
+    parser.add_argument("--workers", type=int, default=1, help="converter and cmdline validator processes")
+    parser.add_argument("--repeat", type=int, default=1, help="runs per benchmark, the fastest is kept")
+    parser.add_argument("--d7-sample", type=int, default=20, help="records run through D7Validator.py")
+    parser.add_argument("--only", default=",".join(BENCHMARKS), help="comma separated benchmarks to run")
+    parser.add_argument("--workdir", default=None, help="keep the corpus and outputs here")
+    parser.add_argument("--results-dir", default=os.path.join(BENCH_DIR, "results"))
+    parser.add_argument("--baseline", default=None, help="results file to compare with (default: the latest in --results-dir)")
+    parser.add_argument("--tolerance", type=float, default=0.10, help="relative change reported as a regression")
+    parser.add_argument("--fail-on-regression", action="store_true", help="exit with status 1 on a regression")
+    args = parser.parse_args()
+    selected = args.only.split(",")
+
+    workdir = args.workdir or tempfile.mkdtemp(prefix="bench_suite_")
+    os.makedirs(workdir, exist_ok=True)
+    start = time.perf_counter()
+    writeCorpus(workdir, args.records, args.seed)
+    print("corpus: " + str(args.records) + " records in " + workdir + " (" + '{0:.1f}'.format(time.perf_counter() - start) + "s)")
+
+    server, state = startStub()
+    writeSettings(workdir, "http://127.0.0.1:" + str(server.server_address[1]) + "/api")
+    results = []
+    try:
+        if "convert" in selected or not os.path.isdir(os.path.join(workdir, "out")):
+            # the validators need converted records
+            results.append(fastest(args.repeat, benchConvert, workdir, args.records, args.workers))
+        paths = sorted(glob.glob(os.path.join(workdir, "out", "**", "*.json"), recursive=True))
+        if "validate" in selected:
+            results.append(fastest(args.repeat, benchValidate, paths))
+        if "cmdline" in selected:
+            results.append(fastest(args.repeat, benchCmdline, workdir, paths, args.workers))
+        if "d7validator" in selected:
+            results.append(fastest(args.repeat, benchD7Validator, workdir, paths, args.d7_sample))
+    finally:
+        server.shutdown()
+
+    for r in results:
+        print('{name:12} {records:7d} records {seconds:9.3f}s {records_per_sec:10.1f} records/sec  peak RSS {peak_rss_mb:8.1f}MB'.format(**r))
+
+    baselinePath = args.baseline or latestResults(args.results_dir)
+    regressions = compare(results, baselinePath, args.tolerance) if baselinePath else []
+
+    os.makedirs(args.results_dir, exist_ok=True)
+    now = datetime.datetime.now(datetime.timezone.utc)
+    resultsPath = os.path.join(args.results_dir, now.strftime("%Y%m%dT%H%M%SZ") + ".json")
+    with open(resultsPath, "w") as f:
+        json.dump({
+            "created": now.isoformat(),
+            "commit": gitCommit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "records": args.records,
+            "seed": args.seed,
+            "workers": args.workers,
+            "idr_requests": state.requests,
+            "results": results
+        }, f, indent=2)
+    print("")
+    print("results written to " + resultsPath)
+
+    for message in regressions:
+        print("REGRESSION " + message)
+    if regressions and args.fail_on_regression:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
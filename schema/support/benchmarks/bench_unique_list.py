@@ -0,0 +1,99 @@
+"""
+Benchmark of the duplicate removal (uniqueList) in record_converter.py.
+
+The converter used to drop duplicate versions, changes, reference tags and
+references with a list membership scan (`if not x in y: y.append(x)`),
+quadratic in the list length. uniqueList keeps the same first-seen items
+through a set of hashable keys. Both are timed on seeded version lists,
+change lists, tags and references shaped like the converter's, with
+duplicates built with shuffled key order, and lists where the results
+differ are counted. The fixed cases are asserted in
+CVE_4_to_5_converter/test_unique_list.py.
+
+USAGE python bench_unique_list.py [--lists 200] [--length 500] [--duplicates 0.3]
+"""
+import argparse
+import json
+import random
+import sys
+import time
+
+from bench_common import CONVERTER_DIR
+
+sys.path.insert(1, CONVERTER_DIR)
+import record_converter
+from test_unique_list import legacyUnique
+
+def shuffled(r, value):
+    # equal value built with another key order, nested values copied
+    if isinstance(value, dict):
+        keys = list(value)
+        r.shuffle(keys)
+        return {k: shuffled(r, value[k]) for k in keys}
+    if isinstance(value, list):
+        return [shuffled(r, v) for v in value]
+    return value
+
+
+def makeItem(r, kind, n):
+    if kind == "versions":
+        item = {"version": str(n % 40) + "." + str(n % 7), "status": r.choice(["affected", "unaffected"]), "versionType": "custom"}
+        if n % 3 == 0:
+            item["lessThan"] = str(n % 40) + ".9"
+        if n % 5 == 0:
+            item["changes"] = [{"at": str(n % 40) + "." + str(c), "status": "unaffected"} for c in range(n % 3 + 1)]
+        return item
+    if kind == "changes":
+        return {"at": str(n % 50), "status": r.choice(["affected", "unaffected"])}
+    if kind == "tags":
+        return r.choice(["vendor-advisory", "x_refsource_MISC", "patch", "exploit", "mailing-list"]) + str(n % 3)
+    return {"url": "https://example.com/advisory/" + str(n % 200), "name": "ref" + str(n % 200),
+            "tags": ["x_refsource_" + r.choice(["MISC", "CONFIRM", "BID"])]}
+
+
+def makeList(r, kind, length, duplicates):
+    items = []
+    for n in range(length):
+        if items and r.random() < duplicates:
+            items.append(shuffled(r, r.choice(items)))
+        else:
+            items.append(makeItem(r, kind, r.randrange(length * 4)))
+    return items
+
+
+def same(expected, result):
+    return (expected == result and json.dumps(expected) == json.dumps(result)
+            and [id(x) for x in expected] == [id(x) for x in result])
+
+
+def timeIt(fn, lists):
+    start = time.perf_counter()
+    results = [fn(items) for items in lists]
+    return time.perf_counter() - start, results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="benchmark uniqueList")
+    parser.add_argument("--lists", type=int, default=200)
+    parser.add_argument("--length", type=int, default=500)
+    parser.add_argument("--duplicates", type=float, default=0.3, help="share of items repeating an earlier one")
+    parser.add_argument("--seed", type=int, default=12)
+    args = parser.parse_args()
+
+    failures = 0
+    r = random.Random(args.seed)
+    for kind in ["versions", "changes", "tags", "references"]:
+        lists = [makeList(r, kind, r.randint(1, args.length), args.duplicates) for i in range(args.lists)]
+        legacyTime, expected = timeIt(legacyUnique, lists)
+        currentTime, results = timeIt(record_converter.uniqueList, lists)
+        differing = sum(1 for a, b in zip(expected, results) if not same(a, b))
+        failures += differing
+        print('{0:11} {1:5d} lists  legacy {2:8.1f}ms  uniqueList {3:7.1f}ms  {4:6.1f}x  {5} differing'.format(
+            kind, len(lists), legacyTime * 1000, currentTime * 1000, legacyTime / currentTime, differing))
+
+    if failures:
+        print("WARNING: uniqueList differs from the list membership dedup for " + str(failures) + " lists")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+"""
+Local stand-in for the CVE Services (IDR) endpoints used by cve4to5up.py.
+
+Serves /health-check, /org, /org/<short_name>/users and /cve-id/<id>
+under /api with made-up but deterministic data. Latency and a failure
+rate can be added to check the retry and concurrency behaviour of the
+IDR client without touching the real service.
+
+Point AWG_IDR_SERVICE_URL in settings.py at http://127.0.0.1:<port>/api.
+
+USAGE python idr_stub.py [--port 3999] [--orgs 20] [--latency-ms 0] [--fail-rate 0.0] [--seed 4]
+"""
+import argparse
+import http.server
+import json
+import random
+import threading
+import time
+import uuid
+import zlib
+
+
+def stubUUID(name):
+    # deterministic version 4 UUID, CVE records only accept UUIDs as org and user IDs
+    return str(uuid.UUID(bytes=zlib.crc32(name.encode()).to_bytes(4, "big") * 4, version=4))
+
+
+class StubState:
+    def __init__(self, orgs=20, latency=0.0, failRate=0.0, seed=4):
+        self.orgs = [{"UUID": stubUUID("org-" + str(i)), "short_name": "cna" + str(i)} for i in range(orgs)]
+        self.latency = latency
+        self.failRate = failRate
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.failures = 0
+
+    def owningCNA(self, cveId):
+        return self.orgs[zlib.crc32(cveId.encode()) % len(self.orgs)]["UUID"]
+
+    def shouldFail(self):
+        with self.lock:
+            self.requests += 1
+            fail = self.failRate > 0 and self.random.random() < self.failRate
+            if fail:
+                self.failures += 1
+            return fail
+
+
+def makeHandler(state):
+    class Handler(http.server.BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        # headers and body go out in separate writes, do not let Nagle hold the body back
+        disable_nagle_algorithm = True
+
+        def log_message(self, *args):
+            pass
+
+        def reply(self, status, body):
+            data = json.dumps(body).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_GET(self):
+            if state.latency:
+                time.sleep(state.latency)
+            path = self.path.split("?")[0]
+            if state.shouldFail():
+                self.reply(503, {"message": "stub failure"})
+            elif path == "/api/health-check":
+                self.reply(200, {})
+            elif path == "/api/org":
+                self.reply(200, {"organizations": state.orgs})
+            elif path.startswith("/api/org/") and path.endswith("/users"):
+                shortName = path.split("/")[3]
+                self.reply(200, {"users": [{"username": "user@" + shortName, "UUID": stubUUID("user-" + shortName)}]})
+            elif path.startswith("/api/cve-id/"):
+                cveId = path.rsplit("/", 1)[1]
+                self.reply(200, {"cve_id": cveId, "owning_cna": state.owningCNA(cveId), "state": "PUBLISHED"})
+            else:
+                self.reply(404, {"message": "not found"})
+
+    return Handler
+
+
+def startStub(port=0, **kwargs):
+    """
+    :param port: port to listen on, 0 picks a free one
+    :return: (server, state), the server runs on a daemon thread until server.shutdown()
+    """
+    state = StubState(**kwargs)
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", port), makeHandler(state))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, state
+
+
+def main():
+    parser = argparse.ArgumentParser(description="local CVE Services stub")
+    parser.add_argument("--port", type=int, default=3999)
+    parser.add_argument("--orgs", type=int, default=20)
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--fail-rate", type=float, default=0.0, help="fraction of requests answered with 503")
+    parser.add_argument("--seed", type=int, default=4)
+    args = parser.parse_args()
+    state = StubState(args.orgs, args.latency_ms / 1000.0, args.fail_rate, args.seed)
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", args.port), makeHandler(state))
+    server.daemon_threads = True
+    print("IDR stub on http://127.0.0.1:" + str(args.port) + "/api")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,245 @@
+"""
+Seeded generator of synthetic CVE JSON 4.0 records for the benchmarks.
+
+The records are shaped like cvelist: mostly PUBLIC records with one vendor
+and product and a handful of versions, plus a long tail of vendor
+advisories with hundreds of affected versions and references. REJECT and
+RESERVED records, the impact variants the converter handles (CVSS 3.x
+objects, nested CVSS 2.0 lists, BM/TM vector parts, unparsable vectors and
+free-form "other" scoring), credits as lists and plain strings, and the
+optional community sections appear at roughly their cvelist rates.
+
+writeCorpus() lays the records out as cvelist does (<year>/<n>xxx/CVE-*.json)
+and writes the side files the converter reads from its working directory:
+cve_ids.json (owning CNAs matching idr_stub.py), cve_record_dates.json,
+user_map.csv and ref_tag_map.json.
+
+USAGE python v4_corpus.py <directory> [--records 10000] [--seed 20]
+"""
+import argparse
+import json
+import os
+import random
+import shutil
+
+from bench_common import CONVERTER_DIR
+from idr_stub import StubState
+
+YEARS = [1999, 2005, 2010, 2014, 2017, 2018, 2019, 2020, 2021, 2022]
+REFSOURCES = ["MISC", "CONFIRM", "BID", "SECTRACK", "XF", "FEDORA", "MLIST", "DEBIAN", "GENTOO", "SUSE",
+              "REDHAT", "UBUNTU", "EXPLOIT-DB", "OSVDB", "SECUNIA", "URL", "url", "VUPEN", "HP", "CERT-VN"]
+CVSS3_VECTORS = [
+    "CVSS:3.1/AV:N/AC:L/PR:N/UI:N/S:U/C:H/I:H/A:H",
+    "CVSS:3.1/AV:N/AC:L/PR:N/UI:R/S:C/C:L/I:L/A:N",
+    "CVSS:3.0/AV:L/AC:L/PR:L/UI:N/S:U/C:H/I:N/A:N",
+    "AV:N/AC:H/PR:L/UI:R/S:C/C:L/I:L/A:N",
+    "CVSS:3.0/AV:N/AC:L/PR:N/UI:N/S:U/C:N/I:N/A:H/E:P/RL:O/RC:C",
+    "CVSS:3.1/AV:A/AC:H/PR:H/UI:N/S:U/C:L/I:N/A:N/CR:H/MAV:N",
+]
+CVSS2_VECTORS = ["AV:N/AC:L/Au:N/C:P/I:P/A:P", "AV:L/AC:M/Au:S/C:C/I:N/A:N", "(AV:N/AC:M/Au:N/C:N/I:P/A:N)"]
+PROBLEMTYPES = ["CWE-79 Cross-site Scripting", "CWE-787", "Buffer overflow", "n/a", "cwe-120 Classic Buffer Overflow",
+                "Information Disclosure", "CWE-89: SQL Injection", "Denial of Service"]
+VERSION_OPERATORS = ["<", "<=", ">", ">=", "=", "!", "?", "!<", "?<", "!<="]
+WORDS = ["remote", "attackers", "arbitrary", "code", "crafted", "request", "vulnerability", "allows",
+         "authenticated", "users", "memory", "corruption", "via", "in", "the", "component", "before"]
+
+
+def cveIdFor(r, i):
+    # unique per index, spread over years like the cvelist tree
+    return "CVE-" + str(r.choice(YEARS)) + "-" + str(1000 + i)
+
+
+def sentence(r, words):
+    return " ".join(r.choice(WORDS) for i in range(words)).capitalize() + "."
+
+
+def makeVersions(r, productIndex):
+    # most products list a few versions, advisories for large product lines hundreds
+    count = r.choices([1, 2, 4, 12, 60, 400], [40, 20, 20, 12, 6, 2])[0]
+    versions = []
+    for k in range(count):
+        vd = {"version_value": str(productIndex) + "." + str(k // 10) + "." + str(k % 10)}
+        c = r.random()
+        if c < 0.35:
+            vd["version_affected"] = r.choice(VERSION_OPERATORS)
+        if c < 0.2:
+            vd["version_name"] = str(productIndex) + "." + str(k // 10)
+        if r.random() < 0.05:
+            vd["platform"] = r.choice(["x86", "x64", "arm64", "Windows", "Linux"])
+        if r.random() < 0.02:
+            vd["version_value"] = r.choice(["n/a", "All", " ", "unspecified"])
+        versions.append(vd)
+        if r.random() < 0.03:
+            # cvelist has plenty of repeated version entries
+            versions.append(dict(vd))
+    return versions
+
+
+def makeAffects(r):
+    vendors = []
+    for v in range(r.choices([1, 2, 6], [85, 12, 3])[0]):
+        products = []
+        for p in range(r.choices([1, 2, 4, 15], [70, 15, 10, 5])[0]):
+            products.append({"product_name": r.choice(["", "prod"]) + "product" + str(p), "version": {"version_data": makeVersions(r, p)}})
+        vendors.append({"vendor_name": "vendor" + str(r.randint(0, 300)), "product": {"product_data": products}})
+    return {"vendor": {"vendor_data": vendors}}
+
+
+def makeReferences(r, cveId):
+    refs = []
+    for k in range(r.choices([1, 2, 4, 8, 30, 250], [15, 25, 30, 20, 8, 2])[0]):
+        refsource = r.choice(REFSOURCES)
+        url = "https://" + refsource.lower() + ".example.com/advisories/" + cveId + "?ref=" + str(k)
+        if r.random() < 0.05:
+            url += "&q=a b|c"
+        refs.append({"url": url, "name": r.choice([url, "", refsource + "-" + str(k)]), "refsource": refsource})
+    return {"reference_data": refs}
+
+
+def makeImpact(r):
+    c = r.random()
+    if c < 0.35:
+        vector = r.choice(CVSS3_VECTORS)
+        return {"cvss": {"version": "3.1" if "3.1" in vector else "3.0", "vectorString": vector,
+                         "baseScore": r.choice([9.8, 7.5, 5.3, 4.3]), "baseSeverity": r.choice(["CRITICAL", "HIGH", "MEDIUM", "LOW"])}}
+    if c < 0.45:
+        return {"cvss": [[{"version": "2.0", "vectorString": r.choice(CVSS2_VECTORS), "baseScore": r.choice(["7.5", "4.3", "10.0"])}]]}
+    if c < 0.5:
+        return {"cvssv3": {"BM": {"AV": "N", "AC": "L", "PR": "N", "UI": "N", "S": "U", "C": "H", "I": "H", "A": "H", "SCORE": "9.8"},
+                           "TM": {"E": "P", "RL": "O", "RC": "C"}}}
+    if c < 0.53:
+        return {"cvss": {"version": "3.0", "vectorString": "see advisory", "baseScore": 5}}
+    if c < 0.58:
+        return [{"other": r.choice(["high", "critical", "Important", "moderate"])}]
+    return None
+
+
+def makeCredit(r):
+    c = r.random()
+    if c < 0.2:
+        return [{"lang": "eng", "value": "Reported by researcher" + str(r.randint(0, 999))}]
+    if c < 0.25:
+        return "Thanks to researcher" + str(r.randint(0, 999))
+    if c < 0.27:
+        return [[{"lang": "eng", "value": "Team " + str(r.randint(0, 9))}]]
+    return None
+
+
+def makeRecord(r, i):
+    """
+    :param r: random.Random, the corpus is reproducible for a given seed
+    :param i: record index, gives the CVE ID number
+    :return: (CVE ID, v4 record)
+    """
+    cveId = cveIdFor(r, i)
+    state = r.choices(["PUBLIC", "REJECT", "RESERVED"], [88, 9, 3])[0]
+    meta = {"ID": cveId, "ASSIGNER": r.choice(["cve@mitre.org", "secalert@redhat.com", "psirt@vendor.example"]), "STATE": state}
+    record = {"data_type": "CVE", "data_format": "MITRE", "data_version": "4.0", "CVE_data_meta": meta}
+    if state == "RESERVED":
+        return cveId, record
+    if state == "REJECT":
+        reason = r.choice(["DO NOT USE THIS CANDIDATE NUMBER. ConsultIDs: CVE-2017-0001. Reason: duplicate.",
+                           "DO NOT USE THIS CANDIDATE NUMBER. Reason: withdrawn by the CNA."])
+        record["description"] = {"description_data": [{"lang": "eng", "value": "** REJECT ** " + reason}]}
+        return cveId, record
+
+    if r.random() < 0.7:
+        meta["DATE_PUBLIC"] = r.choice([
+            "20" + '{0:02d}'.format(r.randint(5, 22)) + "-0" + str(r.randint(1, 9)) + "-" + '{0:02d}'.format(r.randint(1, 28)) + "T00:00:00.000Z",
+            "20" + '{0:02d}'.format(r.randint(5, 22)) + "-1" + str(r.randint(0, 2)) + "-" + '{0:02d}'.format(r.randint(1, 28)),
+            "March " + str(r.randint(1, 28)) + ", 2018"])
+    if r.random() < 0.4:
+        meta["TITLE"] = sentence(r, r.choice([4, 8, 12]))
+    if r.random() < 0.05:
+        meta["DATE_ASSIGNED"] = "2019-0" + str(r.randint(1, 9)) + "-01"
+    description = sentence(r, r.choice([12, 25, 40, 120]))
+    if r.random() < 0.03:
+        description = "** DISPUTED ** " + description
+    record["description"] = {"description_data": [{"lang": "eng", "value": description}]}
+    if r.random() < 0.02:
+        record["description"]["description_data"].append({"lang": "jpn", "value": sentence(r, 10)})
+    record["affects"] = makeAffects(r)
+    record["problemtype"] = {"problemtype_data": [{"description": [{"lang": "eng", "value": r.choice(PROBLEMTYPES)}]}]}
+    record["references"] = makeReferences(r, cveId)
+    impact = makeImpact(r)
+    if impact is not None:
+        record["impact"] = impact
+    credit = makeCredit(r)
+    if credit is not None:
+        record["credit"] = credit
+    if r.random() < 0.2:
+        record["source"] = {"discovery": r.choice(["EXTERNAL", "INTERNAL", "USER"]), "advisory": "ADV-" + str(i)}
+    if r.random() < 0.05:
+        record["timeline"] = [{"lang": "eng", "time": "2020-02-" + '{0:02d}'.format(r.randint(1, 28)), "value": "Disclosed"}]
+    if r.random() < 0.1:
+        record["solution"] = [{"lang": "eng", "value": "Upgrade to the fixed release."}]
+    if r.random() < 0.05:
+        record["work_around"] = [{"lang": "eng", "value": "Disable the component."}]
+    if r.random() < 0.05:
+        record["exploit"] = [{"lang": "eng", "value": "No known exploits."}]
+    if r.random() < 0.15:
+        record["generator"] = {"engine": "Vulnogram 0.0.9"}
+    if r.random() < 0.02:
+        record["x_advisoryEoL"] = True
+    return cveId, record
+
+
+def historyRows(r, cveId):
+    rows = []
+    for h in range(r.choice([1, 2, 3, 6])):
+        rows.append({
+            "cve_identifier": cveId,
+            "reserved_date": "20" + '{0:02d}'.format(r.randint(0, 21)) + "-0" + str(r.randint(1, 9)) + "-07",
+            "disclosure_date": None,
+            "populated_date": "2010-08-" + '{0:02d}'.format(r.randint(1, 28)) + " 05:00:00.000000",
+            "history_date": "2011-12-" + '{0:02d}'.format(r.randint(1, 28)) + " 00:00:00.000000",
+            "HType": r.choice(["Modified", "Modified", "Rejected", "Created"])
+        })
+    return rows
+
+
+def writeCorpus(workdir, records, seed=20, orgs=20):
+    """
+    :param workdir: converter working directory, the records go to workdir/cvelist
+    :param records: number of v4 records
+    :param seed: generator seed
+    :param orgs: number of CNAs, must match the IDR stub
+    :return: path of the cvelist directory
+    """
+    r = random.Random(seed)
+    stub = StubState(orgs)
+    cvelist = os.path.join(workdir, "cvelist")
+    with open(os.path.join(workdir, "cve_ids.json"), "w") as ids, \
+            open(os.path.join(workdir, "cve_record_dates.json"), "w") as history:
+        history.write("[\n")
+        first = True
+        for i in range(records):
+            cveId, record = makeRecord(r, i)
+            year, number = cveId.split("-")[1:]
+            path = os.path.join(cvelist, year, number[:-3] + "xxx")
+            os.makedirs(path, exist_ok=True)
+            with open(os.path.join(path, cveId + ".json"), "w") as f:
+                json.dump(record, f, indent=2)
+            ids.write(json.dumps({"cve_id": cveId, "owning_cna": stub.owningCNA(cveId), "state": "PUBLISHED"}) + "\n")
+            for row in historyRows(r, cveId):
+                history.write(("" if first else ",") + json.dumps(row) + "\n")
+                first = False
+        history.write("]\n")
+    with open(os.path.join(workdir, "user_map.csv"), "w") as f:
+        f.write("cve@mitre.org,mitre\n")
+    shutil.copy(os.path.join(CONVERTER_DIR, "ref_tag_map.json"), workdir)
+    return cvelist
+
+
+def main():
+    parser = argparse.ArgumentParser(description="write a synthetic v4 corpus")
+    parser.add_argument("directory")
+    parser.add_argument("--records", type=int, default=10000)
+    parser.add_argument("--seed", type=int, default=20)
+    args = parser.parse_args()
+    os.makedirs(args.directory, exist_ok=True)
+    print(writeCorpus(args.directory, args.records, args.seed))
+
+
+if __name__ == "__main__":
+    main()
@@ -7,8 +7,9 @@
 ### Usage ###
 
 # To run this script you must have the following:
-#	Python 2.7
-#	Python modules json and jsonschema installed on your machine.
+#	Python 3
+#	Python modules json and jsonschema installed on your machine (orjson is used if installed).
+#	schema/support/Python3.x_Validator/schema_cache.py and json_backend.py from this repository.
 
 # Simply run following command in terminal to validate json file against schema:
 
@@ -17,6 +18,17 @@
 # Where example will be the name of your JSON file and jsonschema is the schema 
 # you wish to compare the json file against.
 
+# To validate many records at once, pass the schema with --schema followed by any
+# number of JSON files, directories (searched recursively for *.json) or quoted
+# glob patterns. A path of - reads a newline-delimited list of paths from stdin:
+
+# ./cmdlinejsonvalidator.py --schema jsonschema.json --workers 8 cvelist/ extra/*.json
+# find cvelist -name '*.json' | ./cmdlinejsonvalidator.py --schema jsonschema.json -
+
+# Batch mode compiles the schema once per worker process and writes one JSON
+# result line per file to stdout, followed by a JSON summary line. The exit
+# status is 1 if any file failed to parse or validate.
+
 # ***NOTE***
 # If you do not place the script in same directory as the jsonschema file and 
 # json file you will need to use absolute/relative path names to the files as
@@ -24,46 +36,152 @@
 
 ###################################################################################
 ###################################################################################
+import glob
+import multiprocessing
+import os
 import sys
 import json
+import time
 import jsonschema
-from jsonschema import validate
-from jsonschema import Draft4Validator
+
+sys.path.insert(1, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "schema", "support", "Python3.x_Validator"))
+import json_backend
+import schema_cache
 
 
 def jsonvalidation(json_doc_path, json_schema_path):
-    with open(json_schema_path, 'r') as fp:
-        schema_doc = json.load(fp)
-
-    # Open the file for reading
-    with open(json_doc_path, 'r') as fp:
-        try:
-            json_doc = json.load(fp)
-        except ValueError as err:
-            sys.stderr.write("Failed to parse JSON : \n")
-            sys.stderr.write("  " + str(err) + "\n")
-            raise SystemExit
+    schema_doc = schema_cache.loadSchema(json_schema_path)
 
+    # read the file as bytes, parsed by orjson when it is installed
     try:
-        validate(json_doc, schema_doc)
+        json_doc = json_backend.loadFile(json_doc_path)
+    except ValueError as err:
+        sys.stderr.write("Failed to parse JSON : \n")
+        sys.stderr.write("  " + str(err) + "\n")
+        raise SystemExit
+
+    # a single pass both decides validity and lists the errors
+    v = schema_cache.getValidator(json_schema_path, jsonschema.validators.validator_for(schema_doc))
+    errors = sorted(v.iter_errors(json_doc), key=lambda e: e.path)
+    if not errors:
         sys.stdout.write("Record passed validation \n")
-    except jsonschema.exceptions.ValidationError as incorrect:
-        v = Draft4Validator(schema_doc)
-        errors = sorted(v.iter_errors(json_doc), key=lambda e: e.path)
-        for error in errors:
-            sys.stderr.write("Record did not pass: \n")
-            sys.stderr.write(str(error.message) + "\n")
+    for error in errors:
+        sys.stderr.write("Record did not pass: \n")
+        sys.stderr.write(str(error.message) + "\n")
+
+
+def expand_paths(paths):
+    """
+    :param paths: files, directories, glob patterns, or - for a path list on stdin
+    :return: generator of JSON file paths in the order given
+    """
+    for p in paths:
+        if p == '-':
+            for line in sys.stdin:
+                line = line.strip()
+                if line:
+                    yield line
+        elif os.path.isdir(p):
+            for subdir, dirs, files in os.walk(p):
+                dirs.sort()
+                for f in sorted(files):
+                    if f.lower().endswith(".json"):
+                        yield os.path.join(subdir, f)
+        elif glob.has_magic(p):
+            for g in sorted(glob.glob(p, recursive=True)):
+                if os.path.isfile(g):
+                    yield g
+        else:
+            yield p
+
+
+_batch_schema_path = None
+
+
+def _init_batch_worker(json_schema_path):
+    global _batch_schema_path
+    _batch_schema_path = json_schema_path
+    schema_doc = schema_cache.loadSchema(json_schema_path)
+    schema_cache.getValidator(json_schema_path, jsonschema.validators.validator_for(schema_doc))
+
+
+def validate_file(json_doc_path):
+    """
+    :param json_doc_path: path to the JSON document to validate
+    :return: result object with the file name, validity and any errors
+    """
+    result = {"file": json_doc_path, "valid": False, "errors": []}
+    try:
+        json_doc = json_backend.loadFile(json_doc_path)
+    except (OSError, ValueError) as err:
+        result["parseError"] = str(err)
+        return result
+
+    schema_doc = schema_cache.loadSchema(_batch_schema_path)
+    v = schema_cache.getValidator(_batch_schema_path, jsonschema.validators.validator_for(schema_doc))
+    for error in sorted(v.iter_errors(json_doc), key=lambda e: e.path):
+        result["errors"].append({
+            "path": error.json_path,
+            "validator": error.validator,
+            "message": error.message
+        })
+    result["valid"] = not result["errors"]
+    return result
+
+
+def batchvalidation(paths, json_schema_path, workers=None):
+    """
+    :param paths: files, directories, glob patterns, or - for a path list on stdin
+    :param json_schema_path: path to the schema, compiled once per worker
+    :param workers: number of worker processes, defaults to the CPU count
+    :return: summary counts
+    """
+    summary = {"files": 0, "valid": 0, "invalid": 0, "unreadable": 0}
+    start = time.perf_counter()
+    workers = workers or os.cpu_count() or 1
+    pool = None
+    if workers > 1:
+        pool = multiprocessing.Pool(workers, initializer=_init_batch_worker, initargs=(json_schema_path,))
+        results = pool.imap(validate_file, expand_paths(paths), chunksize=64)
+    else:
+        _init_batch_worker(json_schema_path)
+        results = map(validate_file, expand_paths(paths))
+
+    for result in results:
+        summary["files"] += 1
+        if "parseError" in result:
+            summary["unreadable"] += 1
+        elif result["valid"]:
+            summary["valid"] += 1
+        else:
+            summary["invalid"] += 1
+        sys.stdout.write(json.dumps(result) + "\n")
+
+    if pool:
+        pool.close()
+        pool.join()
+    summary["seconds"] = round(time.perf_counter() - start, 3)
+    sys.stdout.write(json.dumps({"summary": summary}) + "\n")
+    return summary
 
 
 def main():
     import argparse
 
     parser = argparse.ArgumentParser(description='validate a JSON file')
-    parser.add_argument('jsondoc', type=str, help='path/to/doc.json')
-    parser.add_argument('schema', type=str, help='path/to/schema.json')
+    parser.add_argument('paths', type=str, nargs='*', help='path/to/doc.json path/to/schema.json, or with --schema any number of files, directories, globs or - for stdin')
+    parser.add_argument('--schema', type=str, help='path/to/schema.json, enables batch mode')
+    parser.add_argument('--workers', '-j', type=int, default=None, help='batch mode worker processes (default: CPU count)')
     args = parser.parse_args()
 
-    jsonvalidation(args.jsondoc, args.schema)
+    if args.schema:
+        summary = batchvalidation(args.paths or ['-'], args.schema, args.workers)
+        if summary["invalid"] or summary["unreadable"]:
+            sys.exit(1)
+    elif len(args.paths) == 2:
+        jsonvalidation(args.paths[0], args.paths[1])
+    else:
+        parser.error('expected path/to/doc.json path/to/schema.json, or --schema with paths to validate')
 
 
 if __name__ == '__main__':